@@ -1,20 +1,51 @@
-from flask import Flask, send_from_directory
+from flask import Flask, request, session
 from flask_cors import CORS
 from app.config import Config
 from app.database import db
+from app.utils.json_provider import ORJSONProvider
+from app.utils.compresion import comprimir_respuesta
+from app.utils.estaticos import ArchivosEstaticos
+from app.utils.cache import cache_respuestas
+from app.utils.limites import (limitar_peticiones, ConcurrenciaAgotada, respuesta_concurrencia_agotada,
+                               respuesta_hash_saturado)
+from app.utils.contrasenas import HashSaturado
+from app.utils.registro import configurar_registro
+from app.utils.errores import manejar_excepcion
 from flask_session import Session
+import logging
 import os
+import time
+
+logger = logging.getLogger(__name__)
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
     
+    # Logs JSON con request_id (antes que los demás before_request, para que
+    # también se registren las peticiones que cortan ellos) y 500 uniformes
+    configurar_registro(app)
+    app.register_error_handler(Exception, manejar_excepcion)
+    
+    # JSON con orjson y compresión de respuestas grandes
+    app.json = ORJSONProvider(app)
+    app.after_request(comprimir_respuesta)
+    
     # Inicializar base de datos
     db.init_app(app)
     
     # Inicializar sesiones
     Session(app)
     
+    # Caché de respuestas de lectura (@cached)
+    cache_respuestas.init_app(app)
+    
+    # Límite de peticiones por usuario y 503 cuando no hay cupo para PDFs/reportes
+    # o el pool de contraseñas está saturado
+    app.before_request(limitar_peticiones)
+    app.register_error_handler(ConcurrenciaAgotada, respuesta_concurrencia_agotada)
+    app.register_error_handler(HashSaturado, respuesta_hash_saturado)
+    
     # Configurar CORS con soporte de credenciales
     CORS(app, 
          origins=Config.CORS_ORIGINS,
@@ -22,6 +53,15 @@ def create_app():
          allow_headers=['Content-Type', 'Authorization'],
          methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'OPTIONS'])
     
+    # Recordar la última escritura del usuario para leer sus propios cambios
+    # de la primaria y no de la réplica (ver lectura_replica)
+    @app.after_request
+    def registrar_escritura(response):
+        if (request.method in ('POST', 'PUT', 'PATCH', 'DELETE')
+                and response.status_code < 400 and session.get('user_id')):
+            session['ultima_escritura'] = time.time()
+        return response
+    
     # ⚠️ IMPORTANTE: Registrar blueprints ANTES de la ruta catch-all
     from app.routes.auth import auth_bp
     from app.routes.clientes import clientes_bp
@@ -29,6 +69,8 @@ def create_app():
     from app.routes.pedidos import pedidos_bp
     from app.routes.devoluciones import devoluciones_bp
     from app.routes.usuarios import usuarios_bp
+    from app.routes.sincronizacion import sincronizacion_bp
+    from app.routes.salud import salud_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(clientes_bp, url_prefix='/api/clientes')
@@ -36,9 +78,21 @@ def create_app():
     app.register_blueprint(pedidos_bp, url_prefix='/api/pedidos')
     app.register_blueprint(devoluciones_bp, url_prefix='/api/devoluciones')
     app.register_blueprint(usuarios_bp, url_prefix='/api/usuarios')
+    app.register_blueprint(sincronizacion_bp, url_prefix='/api/sincronizacion')
+    
+    # /api/_health, /api/_ready (balanceador) y /api/_pool (admin)
+    app.register_blueprint(salud_bp, url_prefix='/api')
     
-    # Servir archivos estáticos del frontend (DESPUÉS de las rutas API)
+    # Comandos de consola (flask jobs ..., flask estaticos ...)
+    from app.commands import jobs_cli, estaticos_cli
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(estaticos_cli)
+    
+    # Servir archivos estáticos del frontend (DESPUÉS de las rutas API);
+    # usa frontend/dist si se generó con flask estaticos compilar
     frontend_folder = os.path.join(os.path.dirname(os.path.dirname(__file__)), '..', 'frontend')
+    app.config['FRONTEND_FOLDER'] = os.path.abspath(frontend_folder)
+    estaticos = ArchivosEstaticos(app.config['FRONTEND_FOLDER'])
     
     @app.route('/', defaults={'path': ''})
     @app.route('/<path:path>')
@@ -47,15 +101,9 @@ def create_app():
         if path.startswith('api/'):
             return {'error': 'Ruta API no encontrada'}, 404
         
-        # Servir archivo estático si existe
-        if path != "" and os.path.exists(os.path.join(frontend_folder, path)):
-            return send_from_directory(frontend_folder, path)
-        
-        # Por defecto servir index.html
-        return send_from_directory(frontend_folder, 'index.html')
+        # Archivo estático si existe; por defecto index.html
+        return estaticos.enviar(path)
     
-    print("\n" + "="*60)
-    print("✅ SERVIDOR INICIADO CORRECTAMENTE")
-    print("="*60)
+    logger.info('Aplicación iniciada')
     
     return app
\ No newline at end of file
@@ -0,0 +1,395 @@
+"""
+Tareas programadas de mantenimiento. Ejecutar desde backend/, por ejemplo con
+cron cada noche:
+
+    0 2 * * * cd /ruta/backend && flask --app run jobs nocturno
+
+Cada tarea avanza por lotes y confirma cada lote junto con su avance en la tabla
+ejecuciones_tareas: si se interrumpe, la siguiente ejecución continúa después del
+último lote completado (--desde-cero para empezar de nuevo). Los tiempos de cada
+lote se muestran en consola y quedan registrados (flask jobs historial).
+"""
+import os
+import time
+from datetime import timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import text
+
+from app.database import db, get_bolivia_time
+from app.models.archivo import archivar_pedidos, TABLAS_ARCHIVO
+from app.models.cliente import Cliente
+from app.models.idempotencia import ClaveIdempotencia
+from app.models.pedido import Pedido
+from app.models.resumen_cliente import ResumenCliente
+from app.models.tarea import EjecucionTarea
+from app.models.venta_diaria import VentaDiaria
+from app.utils.cache import cache_compartido, cache_pdf, cache_respuestas
+
+jobs_cli = AppGroup('jobs', help='Tareas programadas de mantenimiento')
+
+# Tablas con más escrituras
+TABLAS_VACUUM = [
+    'detalle_pedidos',
+    'pedidos',
+    'detalle_devoluciones',
+    'devoluciones',
+    'productos',
+    'clientes',
+    'resumen_clientes',
+    'ventas_diarias',
+    'claves_idempotencia',
+    'pedidos_archivo',
+    'detalle_pedidos_archivo'
+]
+
+# Tablas que una consulta del mes actual no debería recorrer completas
+TABLAS_PEDIDOS = ['pedidos', 'detalle_pedidos'] + TABLAS_ARCHIVO
+
+# Por debajo de estas filas un Seq Scan es razonable y no se considera un fallo
+UMBRAL_FILAS_SEQ_SCAN = 10000
+
+opcion_desde_cero = click.option(
+    '--desde-cero', is_flag=True,
+    help='Ignorar el avance de una ejecución anterior sin terminar'
+)
+
+
+def ejecutar_tarea(tarea, lotes, procesar, desde_cero=False):
+    """
+    Ejecutar una tarea por lotes registrando avance y tiempos
+
+    Args:
+        tarea: Nombre de la tarea
+        lotes: Lista ordenada de tuplas (cursor, argumento); el cursor identifica el lote
+        procesar: Función que recibe el argumento de un lote y devuelve las filas procesadas
+        desde_cero: No reanudar una ejecución anterior sin terminar
+
+    Returns:
+        EjecucionTarea finalizada
+    """
+    # Crea las tablas nuevas (ejecuciones_tareas, ventas_diarias...) en bases existentes
+    db.create_all()
+    ejecucion = EjecucionTarea.iniciar(tarea, reanudar=not desde_cero)
+
+    pendientes = lotes
+    cursores = [cursor for cursor, _ in lotes]
+    if ejecucion.cursor in cursores:
+        pendientes = lotes[cursores.index(ejecucion.cursor) + 1:]
+        click.echo(f"↻ {tarea}: reanudando después del lote {ejecucion.cursor}")
+
+    click.echo(f"▶ {tarea}: {len(pendientes)} lote(s)")
+    for cursor, argumento in pendientes:
+        inicio = time.perf_counter()
+        try:
+            filas = procesar(argumento) or 0
+            duracion_ms = (time.perf_counter() - inicio) * 1000
+            # El avance se confirma en la misma transacción que el trabajo del lote
+            ejecucion.avanzar(cursor, filas, duracion_ms)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            ejecucion.finalizar('error', str(e))
+            raise click.ClickException(f"{tarea}: error en el lote {cursor}: {e}")
+
+        click.echo(f"  {tarea} lote={cursor} filas={filas} ms={duracion_ms:.0f}")
+
+    ejecucion.finalizar('completado')
+    click.echo(
+        f"✅ {tarea}: {ejecucion.filas_procesadas} filas en {ejecucion.lotes_completados} "
+        f"lote(s), {ejecucion.duracion_ms / 1000:.1f} s"
+    )
+    return ejecucion
+
+
+def _lotes_de_dias(desde, hasta, dias_lote):
+    """Dividir [desde, hasta] en rangos [inicio, fin) de dias_lote días"""
+    lotes = []
+    inicio = desde
+    while inicio <= hasta:
+        fin = min(inicio + timedelta(days=dias_lote), hasta + timedelta(days=1))
+        lotes.append((inicio.isoformat(), (inicio, fin)))
+        inicio = fin
+    return lotes
+
+
+def _inicio_mes(fecha, meses_atras=0):
+    """Primer día del mes, meses_atras meses antes de la fecha"""
+    indice = fecha.year * 12 + fecha.month - 1 - meses_atras
+    return fecha.replace(year=indice // 12, month=indice % 12 + 1, day=1)
+
+
+@jobs_cli.command('archivar')
+@click.option('--meses', type=int, help='Antigüedad mínima en meses (por defecto PEDIDOS_MESES_ARCHIVO)')
+@opcion_desde_cero
+def archivar(meses, desde_cero):
+    """Mover pedidos entregados o cancelados antiguos a las tablas de archivo, un mes por lote"""
+    meses = meses or current_app.config['PEDIDOS_MESES_ARCHIVO']
+    corte = _inicio_mes(get_bolivia_time().date(), meses)
+
+    primero = db.session.query(db.func.min(Pedido.fecha_pedido)).scalar()
+    lotes = []
+    if primero and primero.date() < corte:
+        inicio = _inicio_mes(primero.date())
+        while inicio < corte:
+            fin = _inicio_mes(inicio + timedelta(days=31))
+            lotes.append((inicio.isoformat(), (inicio, fin)))
+            inicio = fin
+
+    ejecutar_tarea('archivar', lotes, lambda rango: archivar_pedidos(*rango), desde_cero)
+    # Las estadísticas de pedidos cacheadas ya no incluyen lo archivado
+    cache_respuestas.invalidar('pedidos', 'productos')
+
+
+def _nodos_plan(nodo):
+    yield nodo
+    for hijo in nodo.get('Plans', []):
+        yield from _nodos_plan(hijo)
+
+
+def consultas_mes_actual():
+    """Consultas sobre el historial acotadas al mes actual, como {nombre: (sql, params)}"""
+    from app.models.archivo import SQL_PEDIDOS_RANGO, SQL_LINEAS_RANGO
+    from app.models.resumen_cliente import SQL_RESUMEN
+    from app.utils.analitica import SQL_SERIE, SQL_ESTADOS_PEDIDOS, TOTAL_PEDIDO
+
+    hoy = get_bolivia_time().date()
+    desde = _inicio_mes(hoy)
+    hasta = hoy + timedelta(days=1)
+    cliente_id = db.session.query(db.func.max(Pedido.cliente_id)).scalar() or 0
+
+    return {
+        'serie_mes_actual': (
+            SQL_SERIE.format(filtros='', total=TOTAL_PEDIDO),
+            {'granularidad': 'day', 'desde': desde, 'hasta': hasta}
+        ),
+        'estadisticas_mes_actual': (
+            SQL_ESTADOS_PEDIDOS.format(filtros='AND fecha_pedido >= :desde AND fecha_pedido < :hasta'),
+            {'desde': desde, 'hasta': hasta}
+        ),
+        'resumen_dia_pedidos': (SQL_PEDIDOS_RANGO.text, {'desde': hoy, 'hasta': hasta}),
+        'resumen_dia_lineas': (SQL_LINEAS_RANGO.text, {'desde': hoy, 'hasta': hasta}),
+        'resumen_cliente': (SQL_RESUMEN.text, {'cliente_id': cliente_id})
+    }
+
+
+def lecturas_plan(sql, params):
+    """Tablas de pedidos (activas y de archivo) que lee el plan de la consulta, como [(tabla, tipo de nodo)]"""
+    plan = db.session.execute(text(f'EXPLAIN (FORMAT JSON) {sql}'), params).scalar()
+    return [
+        (nodo['Relation Name'], nodo['Node Type'])
+        for nodo in _nodos_plan(plan[0]['Plan'])
+        if nodo.get('Relation Name') in TABLAS_PEDIDOS
+    ]
+
+
+@jobs_cli.command('verificar-archivo')
+def verificar_archivo():
+    """Verificar con EXPLAIN que las consultas del mes actual no recorren el historial"""
+    db.create_all()
+
+    filas_por_tabla = dict(db.session.execute(
+        text('SELECT relname, reltuples::bigint FROM pg_class WHERE relname = ANY(:tablas)'),
+        {'tablas': TABLAS_PEDIDOS}
+    ).all())
+
+    fallos = []
+    for nombre, (sql, params) in consultas_mes_actual().items():
+        for tabla, tipo in lecturas_plan(sql, params):
+            completa = tipo == 'Seq Scan' and filas_por_tabla.get(tabla, 0) > UMBRAL_FILAS_SEQ_SCAN
+            if completa:
+                fallos.append(f'{nombre}: {tipo} en {tabla}')
+            click.echo(f"  {'❌' if completa else '✓'} {nombre}: {tipo} en {tabla}")
+
+    if fallos:
+        raise click.ClickException('Consultas que recorren tablas completas: ' + '; '.join(fallos))
+    click.echo('✅ Las consultas del mes actual solo leen por índice el historial y el archivo')
+
+
+@jobs_cli.command('rollups')
+@click.option('--dias', type=int, help='Recalcular solo los últimos N días (por defecto todo el historial)')
+@click.option('--dias-lote', default=31, show_default=True, help='Días por lote')
+@click.option('--clientes-lote', default=1000, show_default=True, help='Clientes por lote')
+@opcion_desde_cero
+def rollups(dias, dias_lote, clientes_lote, desde_cero):
+    """Reconstruir las tablas ventas_diarias y resumen_clientes"""
+    hoy = get_bolivia_time().date()
+    if dias:
+        desde = hoy - timedelta(days=dias - 1)
+    else:
+        primero = db.session.query(db.func.min(Pedido.fecha_pedido)).scalar()
+        desde = primero.date() if primero else hoy
+
+    ejecutar_tarea(
+        'rollup_ventas_diarias',
+        _lotes_de_dias(desde, hoy, dias_lote),
+        lambda rango: VentaDiaria.reconstruir(*rango),
+        desde_cero
+    )
+
+    maximo = db.session.query(db.func.max(Cliente.id)).scalar() or 0
+    ejecutar_tarea(
+        'rollup_resumen_clientes',
+        [(str(inicio), (inicio, inicio + clientes_lote - 1)) for inicio in range(1, maximo + 1, clientes_lote)],
+        lambda rango: ResumenCliente.reconstruir(*rango),
+        desde_cero
+    )
+
+
+@jobs_cli.command('vacuum')
+@click.option('--solo-analyze', is_flag=True, help='Solo actualizar estadísticas (ANALYZE)')
+@opcion_desde_cero
+def vacuum(solo_analyze, desde_cero):
+    """VACUUM ANALYZE de las tablas con más escrituras, una por lote"""
+    comando = 'ANALYZE' if solo_analyze else 'VACUUM (ANALYZE)'
+
+    def procesar(tabla):
+        # VACUUM no puede ejecutarse dentro de una transacción
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conexion:
+            conexion.execute(text(f'{comando} {tabla}'))
+            filas = conexion.execute(
+                text('SELECT reltuples::bigint FROM pg_class WHERE relname = :tabla'),
+                {'tabla': tabla}
+            ).scalar()
+        return max(filas or 0, 0)
+
+    ejecutar_tarea('vacuum', [(tabla, tabla) for tabla in TABLAS_VACUUM], procesar, desde_cero)
+
+
+@jobs_cli.command('sesiones')
+@click.option('--lote', default=500, show_default=True, help='Archivos por lote')
+@opcion_desde_cero
+def sesiones(lote, desde_cero):
+    """Eliminar los archivos de sesión vencidos"""
+    directorio = current_app.config.get('SESSION_FILE_DIR') or os.path.join(os.getcwd(), 'flask_session')
+    if not os.path.isdir(directorio):
+        click.echo(f"⚠️  No existe el directorio de sesiones {directorio}")
+        return
+
+    # La sesión se reescribe en cada petición: vence PERMANENT_SESSION_LIFETIME
+    # después de su última modificación
+    limite = time.time() - current_app.permanent_session_lifetime.total_seconds()
+    archivos = sorted(nombre for nombre in os.listdir(directorio) if not nombre.startswith('__wz_cache'))
+
+    def procesar(nombres):
+        eliminados = 0
+        for nombre in nombres:
+            ruta = os.path.join(directorio, nombre)
+            try:
+                if os.path.getmtime(ruta) < limite:
+                    os.remove(ruta)
+                    eliminados += 1
+            except FileNotFoundError:
+                pass
+        return eliminados
+
+    lotes = [(archivos[i:i + lote][-1], archivos[i:i + lote]) for i in range(0, len(archivos), lote)]
+    ejecutar_tarea('sesiones', lotes, procesar, desde_cero)
+
+
+@jobs_cli.command('idempotencia')
+@opcion_desde_cero
+def idempotencia(desde_cero):
+    """Eliminar las respuestas guardadas por Idempotency-Key más antiguas que IDEMPOTENCIA_HORAS"""
+    limite = get_bolivia_time() - timedelta(hours=current_app.config['IDEMPOTENCIA_HORAS'])
+    ejecutar_tarea('idempotencia', [(limite.isoformat(), limite)], ClaveIdempotencia.purgar, desde_cero)
+
+
+@jobs_cli.command('pronosticos')
+@opcion_desde_cero
+def pronosticos(desde_cero):
+    """Recalcular pronósticos de demanda y sugerencias de reposición"""
+    from app.utils.pronostico import recalcular_sugerencias
+
+    hoy = get_bolivia_time().date()
+    ejecutar_tarea('pronosticos', [(hoy.isoformat(), hoy)], recalcular_sugerencias, desde_cero)
+
+
+@jobs_cli.command('analitica')
+@click.option('--meses', type=int, multiple=True, default=[12], show_default=True,
+              help='Periodo en meses a precalcular (se puede repetir)')
+@opcion_desde_cero
+def analitica(meses, desde_cero):
+    """Precalcular la analítica RFM de clientes del día en la caché compartida"""
+    from app.utils.analitica import calcular_rfm
+
+    hoy = get_bolivia_time().date()
+
+    def procesar(periodo):
+        resultado = calcular_rfm(hoy, periodo)
+        cache_compartido.guardar(('clientes_analitica', hoy, periodo), resultado, ttl=24 * 3600)
+        return len(resultado)
+
+    ejecutar_tarea('analitica', [(f'{hoy.isoformat()}/{m}', m) for m in meses], procesar, desde_cero)
+
+
+@jobs_cli.command('pdfs')
+@click.option('--dias', default=7, show_default=True, help='Días cerrados hacia atrás')
+@opcion_desde_cero
+def pdfs(dias, desde_cero):
+    """Generar en la caché de PDFs los resúmenes de los últimos días cerrados"""
+    from app.routes.pedidos import pdf_resumen_dia
+
+    hoy = get_bolivia_time().date()
+
+    def procesar(fecha):
+        if cache_pdf.contiene(('resumen_dia', fecha)):
+            return 0
+        pdf_resumen_dia(fecha)
+        return 1
+
+    fechas = [hoy - timedelta(days=n) for n in range(dias, 0, -1)]
+    ejecutar_tarea('pdfs', [(fecha.isoformat(), fecha) for fecha in fechas], procesar, desde_cero)
+
+
+@jobs_cli.command('nocturno')
+@opcion_desde_cero
+@click.pass_context
+def nocturno(ctx, desde_cero):
+    """Ejecutar todas las tareas de mantenimiento en orden"""
+    inicio = time.perf_counter()
+    fallidas = []
+
+    for comando in (archivar, rollups, vacuum, sesiones, idempotencia, pronosticos, analitica, pdfs):
+        try:
+            ctx.invoke(comando, desde_cero=desde_cero)
+        except click.ClickException as e:
+            click.echo(f"❌ {e.format_message()}", err=True)
+            fallidas.append(comando.name)
+
+    click.echo(f"🏁 Mantenimiento nocturno terminado en {time.perf_counter() - inicio:.1f} s")
+    if fallidas:
+        raise click.ClickException(f"Tareas con error: {', '.join(fallidas)}")
+
+
+@jobs_cli.command('historial')
+@click.option('--limite', default=20, show_default=True, help='Ejecuciones a mostrar')
+def historial(limite):
+    """Mostrar las últimas ejecuciones con su avance y duración"""
+    ejecuciones = EjecucionTarea.query.order_by(EjecucionTarea.id.desc()).limit(limite).all()
+
+    for ejecucion in ejecuciones:
+        datos = ejecucion.to_dict()
+        linea = (
+            f"{datos['fecha_inicio']}  {datos['tarea']:<24} {datos['estado']:<11} "
+            f"lotes={datos['lotes_completados']} filas={datos['filas_procesadas']} "
+            f"{datos['duracion_ms'] / 1000:.1f} s"
+        )
+        if datos['mensaje']:
+            linea += f"  {datos['mensaje']}"
+        click.echo(linea)
+
+
+estaticos_cli = AppGroup('estaticos', help='Archivos del frontend')
+
+
+@estaticos_cli.command('compilar')
+def compilar_estaticos():
+    """Generar frontend/dist con huellas en JS/CSS y variantes .gz/.br (borrarlo para desarrollar)"""
+    from app.utils.estaticos import compilar
+
+    inicio = time.perf_counter()
+    manifiesto = compilar(current_app.config['FRONTEND_FOLDER'])
+    click.echo(f"✅ {len(manifiesto)} archivos con huella en frontend/dist ({time.perf_counter() - inicio:.1f} s)")
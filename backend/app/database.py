@@ -1,8 +1,36 @@
+from flask import g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.elements import TextClause
 from datetime import datetime
+import logging
 import pytz
 
-db = SQLAlchemy()
+logger = logging.getLogger(__name__)
+
+
+def _es_lectura(clause):
+    """Indica si la sentencia es solo de lectura (SELECT de ORM o SQL textual SELECT/WITH)"""
+    if clause is None:
+        return False
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip().upper().startswith(('SELECT', 'WITH'))
+    return getattr(clause, 'is_select', False)
+
+
+class SesionEnrutada(Session):
+    """
+    Sesión que envía las lecturas a la réplica (bind 'replica') en los endpoints
+    marcados con @lectura_replica; escrituras y flush siempre van a la primaria
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context() and g.get('leer_de_replica') and _es_lectura(clause):
+            return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': SesionEnrutada})
 
 def init_db(app):
     """Inicializar base de datos"""
@@ -10,7 +38,7 @@ def init_db(app):
     
     with app.app_context():
         db.create_all()
-        print("✅ Base de datos inicializada correctamente")
+        logger.info("Base de datos inicializada correctamente")
 
 def get_bolivia_time():
     """Obtener hora actual de Bolivia"""
@@ -1,15 +1,26 @@
 from app.models.usuario import Usuario
-from app.models.cliente import Cliente
-from app.models.producto import Producto
+from app.models.cliente import Cliente, UbicacionCliente
+from app.models.producto import Producto, SugerenciaReposicion
 from app.models.pedido import Pedido, DetallePedido
 from app.models.devolucion import Devolucion, DetalleDevolucion
+from app.models.resumen_cliente import ResumenCliente
+from app.models.venta_diaria import VentaDiaria
+from app.models.tarea import EjecucionTarea
+from app.models.idempotencia import ClaveIdempotencia
+from app.models import archivo  # Tablas y vistas de pedidos archivados
 
 __all__ = [
     'Usuario',
     'Cliente', 
+    'UbicacionCliente',
     'Producto',
+    'SugerenciaReposicion',
     'Pedido',
     'DetallePedido',
     'Devolucion',
-    'DetalleDevolucion'
+    'DetalleDevolucion',
+    'ResumenCliente',
+    'VentaDiaria',
+    'EjecucionTarea',
+    'ClaveIdempotencia'
 ]
\ No newline at end of file
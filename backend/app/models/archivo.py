@@ -0,0 +1,231 @@
+from sqlalchemy import event, text
+from app.database import db
+
+# Los pedidos cerrados antiguos se mueven a tablas de archivo con la misma
+# estructura (flask jobs archivar). El ORM sigue trabajando solo con pedidos y
+# detalle_pedidos: lo que modifica pedidos, el listado paginado, picking y rutas
+# solo ven pedidos activos (los archivados están entregados o cancelados y no
+# se editan). Las lecturas que abarcan todo el historial (detalle de un pedido,
+# historial del cliente, estadísticas, más vendidos, resumen del día, series y
+# analítica) usan las vistas *_historicos, que unen ambas tablas. La vista de
+# líneas une pedido y detalle dentro de cada rama para que los filtros por
+# fecha lleguen a los índices de las dos tablas y el archivo no se recorra en
+# las consultas recientes.
+DDL_ARCHIVO = [
+    "CREATE TABLE IF NOT EXISTS pedidos_archivo (LIKE pedidos INCLUDING DEFAULTS)",
+    "CREATE TABLE IF NOT EXISTS detalle_pedidos_archivo (LIKE detalle_pedidos INCLUDING DEFAULTS)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_pedidos_archivo_id ON pedidos_archivo (id)",
+    "CREATE INDEX IF NOT EXISTS ix_pedidos_archivo_fecha_pedido ON pedidos_archivo (fecha_pedido)",
+    "CREATE INDEX IF NOT EXISTS ix_pedidos_archivo_cliente_id ON pedidos_archivo (cliente_id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_detalle_pedidos_archivo_id ON detalle_pedidos_archivo (id)",
+    "CREATE INDEX IF NOT EXISTS ix_detalle_pedidos_archivo_pedido_id ON detalle_pedidos_archivo (pedido_id)",
+    "CREATE INDEX IF NOT EXISTS ix_detalle_pedidos_archivo_producto_id ON detalle_pedidos_archivo (producto_id)",
+    # Índices de las tablas activas en bases creadas antes de declararlos en los modelos
+    "CREATE INDEX IF NOT EXISTS ix_pedidos_fecha_pedido ON pedidos (fecha_pedido)",
+    "CREATE INDEX IF NOT EXISTS ix_pedidos_cliente_id ON pedidos (cliente_id)",
+    "CREATE INDEX IF NOT EXISTS ix_detalle_pedidos_pedido_id ON detalle_pedidos (pedido_id)",
+    """
+    CREATE OR REPLACE VIEW pedidos_historicos AS
+        SELECT p.*, FALSE AS archivado FROM pedidos p
+        UNION ALL
+        SELECT a.*, TRUE AS archivado FROM pedidos_archivo a
+    """,
+    """
+    CREATE OR REPLACE VIEW lineas_pedidos_historicas AS
+        SELECT p.id AS pedido_id, p.cliente_id, p.fecha_pedido, p.estado,
+               d.producto_id, d.cantidad, d.subtotal, d.id AS detalle_id,
+               p.subtotal AS pedido_subtotal, p.total AS pedido_total
+        FROM pedidos p
+        JOIN detalle_pedidos d ON d.pedido_id = p.id
+        UNION ALL
+        SELECT p.id, p.cliente_id, p.fecha_pedido, p.estado,
+               d.producto_id, d.cantidad, d.subtotal, d.id,
+               p.subtotal, p.total
+        FROM pedidos_archivo p
+        JOIN detalle_pedidos_archivo d ON d.pedido_id = p.id
+    """
+]
+
+# Mover los pedidos cerrados de un rango de fechas con sus detalles. Los pedidos
+# referenciados por devoluciones se quedan en la tabla activa (claves foráneas)
+SQL_ARCHIVAR = text("""
+    WITH seleccion AS (
+        SELECT p.id
+        FROM pedidos p
+        WHERE p.fecha_pedido >= :desde
+          AND p.fecha_pedido < :hasta
+          AND p.estado IN ('entregado', 'cancelado')
+          AND NOT EXISTS (
+              SELECT 1 FROM devoluciones d
+              WHERE d.pedido_id = p.id OR d.pedido_compensacion_id = p.id
+          )
+        FOR UPDATE
+    ),
+    detalles AS (
+        DELETE FROM detalle_pedidos d
+        USING seleccion s
+        WHERE d.pedido_id = s.id
+        RETURNING d.*
+    ),
+    copia_detalles AS (
+        INSERT INTO detalle_pedidos_archivo SELECT * FROM detalles
+    ),
+    movidos AS (
+        DELETE FROM pedidos p
+        USING seleccion s
+        WHERE p.id = s.id
+        RETURNING p.*
+    )
+    INSERT INTO pedidos_archivo SELECT * FROM movidos
+""")
+
+# Líneas de pedido y cantidad pedida de un producto, activas y archivadas. Las tablas
+# de archivo no tienen claves foráneas: antes de eliminar un producto hay que revisarlas
+SQL_VENTAS_PRODUCTO = text("""
+    SELECT COUNT(*) AS veces_vendido, COALESCE(SUM(cantidad), 0) AS total_vendido
+    FROM lineas_pedidos_historicas
+    WHERE producto_id = :producto_id
+""")
+
+# Pedidos activos y archivados con los campos de Pedido.to_dict() más 'archivado';
+# fechas y montos ya formateados como en las proyecciones de los listados
+SQL_PEDIDOS_HISTORICOS = """
+    SELECT
+        p.id, p.numero_pedido, p.cliente_id, c.nombre AS cliente_nombre,
+        p.usuario_id, u.nombre AS usuario_nombre,
+        TO_CHAR(p.fecha_pedido, 'DD/MM/YYYY HH24:MI') AS fecha_pedido,
+        p.subtotal::float8 AS subtotal, p.descuento::float8 AS descuento, p.total::float8 AS total,
+        p.estado, p.observaciones,
+        TO_CHAR(p.fecha_entrega, 'DD/MM/YYYY') AS fecha_entrega,
+        p.archivado
+    FROM pedidos_historicos p
+    LEFT JOIN clientes c ON c.id = p.cliente_id
+    LEFT JOIN usuarios u ON u.id = p.usuario_id
+    WHERE {filtros}
+    ORDER BY p.fecha_pedido DESC, p.id DESC
+    {limite}
+"""
+
+# Detalles de un pedido archivado con los campos de DetallePedido.to_dict()
+SQL_DETALLES_ARCHIVADOS = text("""
+    SELECT
+        d.id, d.producto_id, pr.nombre AS producto_nombre, pr.codigo AS producto_codigo,
+        pr.unidad_medida, d.cantidad::float8 AS cantidad,
+        d.precio_unitario::float8 AS precio_unitario, d.subtotal::float8 AS subtotal
+    FROM detalle_pedidos_archivo d
+    LEFT JOIN productos pr ON pr.id = d.producto_id
+    WHERE d.pedido_id = :pedido_id
+    ORDER BY d.id
+""")
+
+# Pedidos de un rango de fechas y sus líneas con el producto (activos y archivados)
+SQL_PEDIDOS_RANGO = text("""
+    SELECT p.id, p.cliente_id, c.nombre AS cliente_nombre, p.total
+    FROM pedidos_historicos p
+    JOIN clientes c ON c.id = p.cliente_id
+    WHERE p.fecha_pedido >= :desde AND p.fecha_pedido < :hasta
+    ORDER BY p.cliente_id, p.fecha_pedido
+""")
+
+SQL_LINEAS_RANGO = text("""
+    SELECT l.pedido_id, pr.nombre, pr.unidad_medida, l.cantidad
+    FROM lineas_pedidos_historicas l
+    JOIN productos pr ON pr.id = l.producto_id
+    WHERE l.fecha_pedido >= :desde AND l.fecha_pedido < :hasta
+    ORDER BY l.pedido_id, l.detalle_id
+""")
+
+TABLAS_ARCHIVO = ['pedidos_archivo', 'detalle_pedidos_archivo']
+
+
+@event.listens_for(db.metadata, 'after_create')
+def crear_archivo(target, connection, **kwargs):
+    """Crear tablas de archivo, índices y vistas después de db.create_all()"""
+    for sentencia in DDL_ARCHIVO:
+        connection.execute(text(sentencia))
+
+
+def archivar_pedidos(desde, hasta):
+    """
+    Mover a las tablas de archivo los pedidos cerrados del rango [desde, hasta) (no hace commit)
+
+    Returns:
+        Número de pedidos movidos
+    """
+    return db.session.execute(SQL_ARCHIVAR, {'desde': desde, 'hasta': hasta}).rowcount
+
+
+def ventas_producto(producto_id):
+    """Líneas de pedido (activas y archivadas) con el producto y cantidad total pedida"""
+    fila = db.session.execute(SQL_VENTAS_PRODUCTO, {'producto_id': producto_id}).one()
+    return {'veces_vendido': fila.veces_vendido, 'total_vendido': float(fila.total_vendido)}
+
+
+def pedidos_historicos(cliente_id=None, estado=None, pedido_id=None, limite=None):
+    """
+    Pedidos activos y archivados como diccionarios (formato de Pedido.to_dict()),
+    más recientes primero
+
+    Args:
+        cliente_id: Filtrar por cliente (opcional)
+        estado: Filtrar por estado (opcional)
+        pedido_id: Un solo pedido (opcional)
+        limite: Máximo de pedidos (opcional)
+    """
+    filtros = ['TRUE']
+    params = {}
+
+    if cliente_id:
+        filtros.append('p.cliente_id = :cliente_id')
+        params['cliente_id'] = cliente_id
+
+    if estado:
+        filtros.append('p.estado = :estado')
+        params['estado'] = estado
+
+    if pedido_id:
+        filtros.append('p.id = :pedido_id')
+        params['pedido_id'] = pedido_id
+
+    if limite is not None:
+        params['limite'] = limite
+
+    sql = SQL_PEDIDOS_HISTORICOS.format(
+        filtros=' AND '.join(filtros),
+        limite='LIMIT :limite' if limite is not None else ''
+    )
+    return [dict(fila) for fila in db.session.execute(text(sql), params).mappings()]
+
+
+def pedido_archivado(pedido_id):
+    """Pedido archivado con sus detalles (formato de to_dict(include_detalles=True)) o None"""
+    pedidos = pedidos_historicos(pedido_id=pedido_id)
+    if not pedidos or not pedidos[0]['archivado']:
+        return None
+
+    pedido = pedidos[0]
+    pedido['detalles'] = [dict(fila) for fila in db.session.execute(
+        SQL_DETALLES_ARCHIVADOS, {'pedido_id': pedido_id}
+    ).mappings()]
+    return pedido
+
+
+def pedidos_con_lineas(desde, hasta):
+    """
+    Pedidos activos y archivados del rango [desde, hasta) ordenados por cliente,
+    cada uno con la lista 'productos' (nombre, cantidad, unidad_medida)
+    """
+    params = {'desde': desde, 'hasta': hasta}
+
+    lineas = {}
+    for fila in db.session.execute(SQL_LINEAS_RANGO, params):
+        lineas.setdefault(fila.pedido_id, []).append({
+            'nombre': fila.nombre,
+            'cantidad': float(fila.cantidad),
+            'unidad_medida': fila.unidad_medida
+        })
+
+    return [
+        {**fila, 'total': float(fila['total']), 'productos': lineas.get(fila['id'], [])}
+        for fila in db.session.execute(SQL_PEDIDOS_RANGO, params).mappings()
+    ]
@@ -1,4 +1,5 @@
 from app.database import db, get_bolivia_time
+from app.utils.serializacion import columnas, fecha
 
 class Cliente(db.Model):
     __tablename__ = 'clientes'
@@ -16,6 +17,20 @@ class Cliente(db.Model):
     pedidos = db.relationship('Pedido', backref='cliente', lazy=True)
     devoluciones = db.relationship('Devolucion', backref='cliente', lazy=True)
     
+    @staticmethod
+    def consulta_listado():
+        """Consulta por columnas con los mismos campos de to_dict() (sin estadísticas)"""
+        return db.session.query(*columnas(
+            id=Cliente.id,
+            nombre=Cliente.nombre,
+            celular=Cliente.celular,
+            direccion=Cliente.direccion,
+            zona=Cliente.zona,
+            ciudad=Cliente.ciudad,
+            activo=Cliente.activo,
+            fecha_registro=fecha(Cliente.fecha_registro)
+        )).select_from(Cliente)
+    
     def to_dict(self, include_stats=False):
         """Convertir a diccionario"""
         data = {
@@ -30,10 +45,32 @@ class Cliente(db.Model):
         }
         
         if include_stats:
-            data['total_pedidos'] = len(self.pedidos)
-            data['total_devoluciones'] = len(self.devoluciones)
+            from app.models.resumen_cliente import ResumenCliente
+            resumen = ResumenCliente.obtener(self.id)
+            data['total_pedidos'] = resumen['total_pedidos']
+            data['total_devoluciones'] = resumen['total_devoluciones']
         
         return data
     
     def __repr__(self):
-        return f'<Cliente {self.nombre}>'
\ No newline at end of file
+        return f'<Cliente {self.nombre}>'
+
+class UbicacionCliente(db.Model):
+    """Coordenadas de entrega de un cliente (usadas por el planificador de rutas)"""
+    __tablename__ = 'ubicaciones_clientes'
+    
+    cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id', ondelete='CASCADE'), primary_key=True)
+    latitud = db.Column(db.Numeric(9, 6), nullable=False)
+    longitud = db.Column(db.Numeric(9, 6), nullable=False)
+    fecha_actualizacion = db.Column(db.DateTime, default=get_bolivia_time, onupdate=get_bolivia_time)
+    
+    def to_dict(self):
+        """Convertir a diccionario"""
+        return {
+            'cliente_id': self.cliente_id,
+            'latitud': float(self.latitud),
+            'longitud': float(self.longitud)
+        }
+    
+    def __repr__(self):
+        return f'<UbicacionCliente {self.cliente_id}>'
@@ -1,3 +1,4 @@
+from sqlalchemy.orm import joinedload, selectinload
 from app.database import db, get_bolivia_time
 
 class Devolucion(db.Model):
@@ -39,6 +40,24 @@ class Devolucion(db.Model):
         
         return f'DEV-{fecha_str}-{nuevo_numero:03d}'
     
+    @staticmethod
+    def opciones_carga(include_detalles=False):
+        """Opciones de eager loading para serializar con to_dict() sin consultas por fila"""
+        opciones = [
+            joinedload(Devolucion.pedido_original),
+            joinedload(Devolucion.cliente),
+            joinedload(Devolucion.usuario)
+        ]
+        
+        if include_detalles:
+            # Una sola consulta adicional trae todos los detalles con sus productos
+            opciones.append(selectinload(Devolucion.detalles).options(
+                joinedload(DetalleDevolucion.producto),
+                joinedload(DetalleDevolucion.producto_reemplazo)
+            ))
+        
+        return opciones
+    
     def marcar_compensado(self, pedido_compensacion_id):
         """Marcar devolución como compensada"""
         self.estado = 'compensado'
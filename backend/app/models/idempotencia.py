@@ -0,0 +1,126 @@
+from datetime import timedelta
+
+from flask import current_app
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database import db, get_bolivia_time
+
+
+class ClaveIdempotencia(db.Model):
+    """Respuesta guardada de una petición de creación con encabezado Idempotency-Key"""
+    __tablename__ = 'claves_idempotencia'
+
+    # Las claves son por usuario: la clave primaria es el índice de la búsqueda
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='CASCADE'), primary_key=True)
+    clave = db.Column(db.String(100), primary_key=True)
+    endpoint = db.Column(db.String(100), nullable=False)
+    hash_peticion = db.Column(db.String(64), nullable=False)  # sha256 del cuerpo
+    codigo_estado = db.Column(db.Integer)  # NULL mientras la petición original está en curso
+    respuesta = db.Column(db.Text)
+    fecha_creacion = db.Column(db.DateTime, default=get_bolivia_time, index=True)
+
+    @staticmethod
+    def limite_reserva():
+        """
+        Las reservas sin respuesta creadas antes de este momento se consideran
+        abandonadas (el proceso terminó antes de confirmar la petición original)
+        """
+        return get_bolivia_time() - timedelta(seconds=current_app.config['IDEMPOTENCIA_RESERVA_SEGUNDOS'])
+
+    @staticmethod
+    def _tomar(**valores):
+        """
+        Insertar la clave o, si tiene una reserva abandonada, reemplazarla, en una
+        sola sentencia: de dos peticiones simultáneas solo una obtiene la fila
+
+        Returns:
+            fecha_creacion de la fila tomada (identifica la reserva) o None si la
+            clave ya está en uso
+        """
+        tabla = ClaveIdempotencia.__table__
+        sentencia = insert(tabla).values(**valores, fecha_creacion=get_bolivia_time())
+        return db.session.execute(
+            sentencia.on_conflict_do_update(
+                index_elements=[tabla.c.usuario_id, tabla.c.clave],
+                set_={columna: sentencia.excluded[columna] for columna in (
+                    'endpoint', 'hash_peticion', 'codigo_estado', 'respuesta', 'fecha_creacion'
+                )},
+                where=db.and_(
+                    tabla.c.codigo_estado.is_(None),
+                    tabla.c.fecha_creacion < ClaveIdempotencia.limite_reserva()
+                )
+            ).returning(tabla.c.fecha_creacion)
+        ).scalar()
+
+    @staticmethod
+    def reservar(usuario_id, clave, endpoint, hash_peticion):
+        """
+        Registrar la clave antes de ejecutar la petición (la reserva se confirma
+        enseguida para que los reintentos simultáneos la vean)
+
+        Returns:
+            (existente, reserva): existente es la ClaveIdempotencia ya usada, o
+            None si la clave quedó reservada; reserva identifica la reserva para
+            guardar_respuesta y liberar
+        """
+        existente = db.session.get(ClaveIdempotencia, (usuario_id, clave))
+        if existente and existente.codigo_estado is not None:
+            return existente, None
+
+        reserva = ClaveIdempotencia._tomar(usuario_id=usuario_id, clave=clave,
+                                           endpoint=endpoint, hash_peticion=hash_peticion)
+        db.session.commit()
+
+        if reserva:
+            return None, reserva
+        return db.session.get(ClaveIdempotencia, (usuario_id, clave), populate_existing=True), None
+
+    @staticmethod
+    def registrar(usuario_id, clave, endpoint, hash_peticion, codigo_estado, respuesta):
+        """
+        Registrar clave y respuesta en la transacción en curso, sin reserva previa
+        (operaciones sincronizadas en lote; no hace commit)
+
+        Returns:
+            False si la clave ya está en uso
+        """
+        return ClaveIdempotencia._tomar(usuario_id=usuario_id, clave=clave, endpoint=endpoint,
+                                        hash_peticion=hash_peticion, codigo_estado=codigo_estado,
+                                        respuesta=respuesta) is not None
+
+    @staticmethod
+    def guardar_respuesta(usuario_id, clave, reserva, codigo_estado, respuesta):
+        """
+        Guardar la respuesta de la petición original para contestar los reintentos,
+        en la misma transacción que la escritura de la petición (no hace commit)
+
+        Returns:
+            False si la reserva ya no es nuestra (se consideró abandonada y la tomó
+            un reintento): la transacción debe deshacerse
+        """
+        return ClaveIdempotencia.query.filter_by(
+            usuario_id=usuario_id, clave=clave, fecha_creacion=reserva, codigo_estado=None
+        ).update({
+            'codigo_estado': codigo_estado,
+            'respuesta': respuesta
+        }, synchronize_session=False) == 1
+
+    @staticmethod
+    def liberar(usuario_id, clave, reserva):
+        """Eliminar la reserva de una petición que falló para que pueda reintentarse"""
+        ClaveIdempotencia.query.filter_by(
+            usuario_id=usuario_id, clave=clave, fecha_creacion=reserva, codigo_estado=None
+        ).delete(synchronize_session=False)
+        db.session.commit()
+
+    @staticmethod
+    def purgar(antes_de):
+        """Eliminar las claves creadas antes de la fecha dada"""
+        eliminadas = ClaveIdempotencia.query.filter(
+            ClaveIdempotencia.fecha_creacion < antes_de
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return eliminadas
+
+    def __repr__(self):
+        return f'<ClaveIdempotencia {self.usuario_id}:{self.clave}>'
@@ -1,4 +1,6 @@
+from sqlalchemy.orm import joinedload, selectinload
 from app.database import db, get_bolivia_time
+from app.utils.serializacion import columnas, fecha, fecha_hora, monto
 from datetime import datetime
 
 class Pedido(db.Model):
@@ -6,9 +8,9 @@ class Pedido(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     numero_pedido = db.Column(db.String(20), unique=True, nullable=False)
-    cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id'), nullable=False)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id'), nullable=False, index=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
-    fecha_pedido = db.Column(db.DateTime, default=get_bolivia_time)
+    fecha_pedido = db.Column(db.DateTime, default=get_bolivia_time, index=True)
     subtotal = db.Column(db.Numeric(10, 2), default=0)
     descuento = db.Column(db.Numeric(10, 2), default=0)
     total = db.Column(db.Numeric(10, 2), nullable=False)
@@ -39,6 +41,45 @@ class Pedido(db.Model):
         
         return f'PED-{fecha_str}-{nuevo_numero:03d}'
     
+    @staticmethod
+    def opciones_carga(include_detalles=False):
+        """Opciones de eager loading para serializar con to_dict() sin consultas por fila"""
+        opciones = [
+            joinedload(Pedido.cliente),
+            joinedload(Pedido.usuario)
+        ]
+        
+        if include_detalles:
+            opciones.append(selectinload(Pedido.detalles).joinedload(DetallePedido.producto))
+        
+        return opciones
+    
+    @staticmethod
+    def consulta_listado():
+        """Consulta por columnas con los mismos campos de to_dict() (sin detalles)"""
+        from app.models.cliente import Cliente
+        from app.models.usuario import Usuario
+        
+        return db.session.query(*columnas(
+            id=Pedido.id,
+            numero_pedido=Pedido.numero_pedido,
+            cliente_id=Pedido.cliente_id,
+            cliente_nombre=Cliente.nombre,
+            usuario_id=Pedido.usuario_id,
+            usuario_nombre=Usuario.nombre,
+            fecha_pedido=fecha_hora(Pedido.fecha_pedido),
+            subtotal=monto(Pedido.subtotal),
+            descuento=monto(Pedido.descuento),
+            total=monto(Pedido.total),
+            estado=Pedido.estado,
+            observaciones=Pedido.observaciones,
+            fecha_entrega=fecha(Pedido.fecha_entrega)
+        )).select_from(Pedido).outerjoin(
+            Cliente, Cliente.id == Pedido.cliente_id
+        ).outerjoin(
+            Usuario, Usuario.id == Pedido.usuario_id
+        )
+    
     def calcular_totales(self):
         """Calcular subtotal y total del pedido"""
         self.subtotal = sum(detalle.subtotal for detalle in self.detalles)
@@ -75,7 +116,7 @@ class DetallePedido(db.Model):
     __tablename__ = 'detalle_pedidos'
     
     id = db.Column(db.Integer, primary_key=True)
-    pedido_id = db.Column(db.Integer, db.ForeignKey('pedidos.id'), nullable=False)
+    pedido_id = db.Column(db.Integer, db.ForeignKey('pedidos.id'), nullable=False, index=True)
     producto_id = db.Column(db.Integer, db.ForeignKey('productos.id'), nullable=False)
     cantidad = db.Column(db.Numeric(10, 2), nullable=False)
     precio_unitario = db.Column(db.Numeric(10, 2), nullable=False)
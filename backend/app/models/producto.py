@@ -1,4 +1,6 @@
+from sqlalchemy import case
 from app.database import db, get_bolivia_time
+from app.utils.serializacion import columnas, fecha, monto
 
 class Producto(db.Model):
     __tablename__ = 'productos'
@@ -20,6 +22,23 @@ class Producto(db.Model):
                                           foreign_keys='DetalleDevolucion.producto_id',
                                           backref='producto', lazy=True)
     
+    @staticmethod
+    def consulta_listado():
+        """Consulta por columnas con los mismos campos de to_dict()"""
+        return db.session.query(*columnas(
+            id=Producto.id,
+            codigo=Producto.codigo,
+            nombre=Producto.nombre,
+            descripcion=Producto.descripcion,
+            unidad_medida=Producto.unidad_medida,
+            precio_venta=monto(Producto.precio_venta),
+            activo=Producto.activo,
+            fecha_creacion=fecha(Producto.fecha_creacion),
+            stock_actual=Producto.stock_actual,
+            stock_minimo=Producto.stock_minimo,
+            stock_bajo=Producto.stock_actual <= Producto.stock_minimo
+        )).select_from(Producto)
+    
     def to_dict(self, include_stock=True):
         """Convertir a diccionario"""
         data = {
@@ -47,5 +66,42 @@ class Producto(db.Model):
         elif operacion == 'sumar':
             self.stock_actual += cantidad
     
+    @staticmethod
+    def ajustar_stock(deltas):
+        """
+        Sumar a stock_actual la variación de cada producto en un solo UPDATE
+
+        Args:
+            deltas: Diccionario {producto_id: unidades a sumar (negativo para restar)}
+        """
+        if not deltas:
+            return
+        
+        Producto.query.filter(Producto.id.in_(deltas)).update(
+            {Producto.stock_actual: Producto.stock_actual + case(deltas, value=Producto.id, else_=0)},
+            synchronize_session=False
+        )
+        # Los productos ya cargados en la sesión vuelven a leer el stock
+        for producto in db.session.identity_map.values():
+            if isinstance(producto, Producto) and producto.id in deltas:
+                db.session.expire(producto, ['stock_actual'])
+    
+    def __repr__(self):
+        return f'<Producto {self.nombre}>'
+
+class SugerenciaReposicion(db.Model):
+    """Pronóstico de demanda y punto de reposición sugerido por producto"""
+    __tablename__ = 'sugerencias_reposicion'
+    
+    producto_id = db.Column(db.Integer, db.ForeignKey('productos.id', ondelete='CASCADE'), primary_key=True)
+    demanda_diaria = db.Column(db.Numeric(12, 3), nullable=False, default=0)
+    promedio_movil = db.Column(db.Numeric(12, 3), nullable=False, default=0)
+    desviacion = db.Column(db.Numeric(12, 3), nullable=False, default=0)
+    stock_minimo_sugerido = db.Column(db.Integer, nullable=False, default=0)
+    dias_historial = db.Column(db.Integer, nullable=False)
+    fecha_calculo = db.Column(db.DateTime, default=get_bolivia_time)
+    
+    producto = db.relationship('Producto', backref=db.backref('sugerencia_reposicion', uselist=False))
+    
     def __repr__(self):
-        return f'<Producto {self.nombre}>'
\ No newline at end of file
+        return f'<SugerenciaReposicion {self.producto_id}>'
@@ -0,0 +1,144 @@
+from flask import current_app
+from sqlalchemy import text
+from app.database import db, get_bolivia_time
+
+# Estadísticas de un cliente en una sola consulta agregada (incluye pedidos archivados;
+# el último pedido se toma solo de la tabla activa)
+SQL_RESUMEN = text("""
+    SELECT
+        COUNT(p.id) AS total_pedidos,
+        COALESCE(SUM(p.total) FILTER (WHERE p.estado = 'entregado'), 0) AS total_vendido,
+        (SELECT COUNT(*) FROM devoluciones d WHERE d.cliente_id = :cliente_id) AS total_devoluciones,
+        (ARRAY_AGG(p.id ORDER BY p.fecha_pedido DESC, p.id DESC) FILTER (WHERE NOT p.archivado))[1] AS ultimo_pedido_id,
+        MAX(p.fecha_pedido) AS fecha_ultimo_pedido
+    FROM pedidos_historicos p
+    WHERE p.cliente_id = :cliente_id
+""")
+
+# Recalcular la tabla resumen_clientes; {filtro} se aplica a los ids de cliente
+# (todos, un rango o uno solo) tanto en clientes como en las subconsultas
+SQL_RECONSTRUIR = """
+    INSERT INTO resumen_clientes (
+        cliente_id, total_pedidos, total_vendido, total_devoluciones,
+        ultimo_pedido_id, fecha_ultimo_pedido, fecha_actualizacion
+    )
+    SELECT
+        c.id,
+        COALESCE(p.total_pedidos, 0),
+        COALESCE(p.total_vendido, 0),
+        COALESCE(d.total_devoluciones, 0),
+        p.ultimo_pedido_id,
+        p.fecha_ultimo_pedido,
+        :ahora
+    FROM clientes c
+    LEFT JOIN (
+        SELECT
+            cliente_id,
+            COUNT(*) AS total_pedidos,
+            SUM(total) FILTER (WHERE estado = 'entregado') AS total_vendido,
+            (ARRAY_AGG(id ORDER BY fecha_pedido DESC, id DESC) FILTER (WHERE NOT archivado))[1] AS ultimo_pedido_id,
+            MAX(fecha_pedido) AS fecha_ultimo_pedido
+        FROM pedidos_historicos
+        WHERE cliente_id {filtro}
+        GROUP BY cliente_id
+    ) p ON p.cliente_id = c.id
+    LEFT JOIN (
+        SELECT cliente_id, COUNT(*) AS total_devoluciones
+        FROM devoluciones
+        WHERE cliente_id {filtro}
+        GROUP BY cliente_id
+    ) d ON d.cliente_id = c.id
+    WHERE c.id {filtro}
+    ON CONFLICT (cliente_id) DO UPDATE SET
+        total_pedidos = EXCLUDED.total_pedidos,
+        total_vendido = EXCLUDED.total_vendido,
+        total_devoluciones = EXCLUDED.total_devoluciones,
+        ultimo_pedido_id = EXCLUDED.ultimo_pedido_id,
+        fecha_ultimo_pedido = EXCLUDED.fecha_ultimo_pedido,
+        fecha_actualizacion = EXCLUDED.fecha_actualizacion
+"""
+
+
+class ResumenCliente(db.Model):
+    """Estadísticas precalculadas por cliente (opcional, ver CLIENTES_RESUMEN_MATERIALIZADO)"""
+    __tablename__ = 'resumen_clientes'
+
+    cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id', ondelete='CASCADE'), primary_key=True)
+    total_pedidos = db.Column(db.Integer, nullable=False, default=0)
+    total_vendido = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    total_devoluciones = db.Column(db.Integer, nullable=False, default=0)
+    ultimo_pedido_id = db.Column(db.Integer, db.ForeignKey('pedidos.id', ondelete='SET NULL'))
+    fecha_ultimo_pedido = db.Column(db.DateTime)
+    fecha_actualizacion = db.Column(db.DateTime, default=get_bolivia_time)
+
+    @staticmethod
+    def materializado():
+        """Indica si las estadísticas se leen de la tabla resumen_clientes"""
+        return current_app.config.get('CLIENTES_RESUMEN_MATERIALIZADO', False)
+
+    @staticmethod
+    def calcular(cliente_id):
+        """Calcular las estadísticas de un cliente directamente sobre pedidos y devoluciones"""
+        fila = db.session.execute(SQL_RESUMEN, {'cliente_id': cliente_id}).mappings().one()
+        return ResumenCliente._formatear(fila)
+
+    @staticmethod
+    def obtener(cliente_id):
+        """Obtener las estadísticas de un cliente (de la tabla resumen si está habilitada)"""
+        if ResumenCliente.materializado():
+            resumen = db.session.get(ResumenCliente, cliente_id)
+            if resumen:
+                return resumen.to_dict()
+
+        return ResumenCliente.calcular(cliente_id)
+
+    @staticmethod
+    def actualizar(cliente_id):
+        """Recalcular el resumen de un cliente tras escribir pedidos o devoluciones"""
+        if not ResumenCliente.materializado():
+            return
+
+        # El SQL textual no hace autoflush: sin esto no vería los pedidos
+        # agregados, eliminados o modificados en la sesión
+        db.session.flush()
+        db.session.execute(
+            text(SQL_RECONSTRUIR.format(filtro='= :cliente_id')),
+            {'cliente_id': cliente_id, 'ahora': get_bolivia_time()}
+        )
+
+    @staticmethod
+    def reconstruir(desde_id=None, hasta_id=None):
+        """Recalcular el resumen de todos los clientes (o de un rango de ids) en una sola sentencia"""
+        if desde_id is None:
+            filtro, params = 'IS NOT NULL', {}
+        else:
+            filtro, params = 'BETWEEN :desde_id AND :hasta_id', {'desde_id': desde_id, 'hasta_id': hasta_id}
+
+        resultado = db.session.execute(
+            text(SQL_RECONSTRUIR.format(filtro=filtro)),
+            {**params, 'ahora': get_bolivia_time()}
+        )
+        return resultado.rowcount
+
+    @staticmethod
+    def _formatear(fila):
+        return {
+            'total_pedidos': fila['total_pedidos'],
+            'total_devoluciones': fila['total_devoluciones'],
+            'total_vendido': float(fila['total_vendido']),
+            'ultimo_pedido_id': fila['ultimo_pedido_id'],
+            'fecha_ultimo_pedido': fila['fecha_ultimo_pedido'].strftime('%d/%m/%Y %H:%M') if fila['fecha_ultimo_pedido'] else None
+        }
+
+    def to_dict(self):
+        """Convertir a diccionario"""
+        return ResumenCliente._formatear({
+            'total_pedidos': self.total_pedidos,
+            'total_devoluciones': self.total_devoluciones,
+            'total_vendido': self.total_vendido,
+            'ultimo_pedido_id': self.ultimo_pedido_id,
+            'fecha_ultimo_pedido': self.fecha_ultimo_pedido
+        })
+
+    def __repr__(self):
+        return f'<ResumenCliente {self.cliente_id}>'
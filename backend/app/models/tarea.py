@@ -0,0 +1,65 @@
+from app.database import db, get_bolivia_time
+
+
+class EjecucionTarea(db.Model):
+    """Avance y tiempos de las tareas programadas (flask jobs ...)"""
+    __tablename__ = 'ejecuciones_tareas'
+
+    id = db.Column(db.Integer, primary_key=True)
+    tarea = db.Column(db.String(50), nullable=False, index=True)
+    estado = db.Column(db.String(20), nullable=False, default='en_curso')  # en_curso, completado, error
+    cursor = db.Column(db.String(255))  # Último lote completado
+    lotes_completados = db.Column(db.Integer, nullable=False, default=0)
+    filas_procesadas = db.Column(db.Integer, nullable=False, default=0)
+    duracion_ms = db.Column(db.Integer, nullable=False, default=0)
+    mensaje = db.Column(db.Text)
+    fecha_inicio = db.Column(db.DateTime, default=get_bolivia_time)
+    fecha_fin = db.Column(db.DateTime)
+
+    @staticmethod
+    def iniciar(tarea, reanudar=True):
+        """Retomar la última ejecución sin terminar de la tarea o crear una nueva"""
+        ultima = EjecucionTarea.query.filter_by(tarea=tarea).order_by(EjecucionTarea.id.desc()).first()
+
+        if reanudar and ultima and ultima.estado != 'completado':
+            ultima.estado = 'en_curso'
+            ultima.mensaje = None
+            ejecucion = ultima
+        else:
+            ejecucion = EjecucionTarea(tarea=tarea)
+            db.session.add(ejecucion)
+
+        db.session.commit()
+        return ejecucion
+
+    def avanzar(self, cursor, filas, duracion_ms):
+        """Registrar un lote completado (se confirma junto con el trabajo del lote)"""
+        self.cursor = cursor
+        self.lotes_completados += 1
+        self.filas_procesadas += filas or 0
+        self.duracion_ms += int(duracion_ms)
+
+    def finalizar(self, estado, mensaje=None):
+        """Cerrar la ejecución"""
+        self.estado = estado
+        self.mensaje = mensaje
+        self.fecha_fin = get_bolivia_time()
+        db.session.commit()
+
+    def to_dict(self):
+        """Convertir a diccionario"""
+        return {
+            'id': self.id,
+            'tarea': self.tarea,
+            'estado': self.estado,
+            'cursor': self.cursor,
+            'lotes_completados': self.lotes_completados,
+            'filas_procesadas': self.filas_procesadas,
+            'duracion_ms': self.duracion_ms,
+            'mensaje': self.mensaje,
+            'fecha_inicio': self.fecha_inicio.strftime('%d/%m/%Y %H:%M:%S') if self.fecha_inicio else None,
+            'fecha_fin': self.fecha_fin.strftime('%d/%m/%Y %H:%M:%S') if self.fecha_fin else None
+        }
+
+    def __repr__(self):
+        return f'<EjecucionTarea {self.tarea} {self.estado}>'
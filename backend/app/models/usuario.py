@@ -1,5 +1,5 @@
 from app.database import db, get_bolivia_time
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils.contrasenas import en_pool, generar_hash, verificar, necesita_rehash, coste
 
 class Usuario(db.Model):
     __tablename__ = 'usuarios'
@@ -17,12 +17,20 @@ class Usuario(db.Model):
     devoluciones = db.relationship('Devolucion', backref='usuario', lazy='dynamic')
     
     def set_password(self, password):
-        """Hashear la contraseña"""
-        self.password_hash = generate_password_hash(password)
+        """Hashear la contraseña (bcrypt, en el pool de hash)"""
+        self.password_hash = en_pool(generar_hash, password, coste())
     
     def check_password(self, password):
-        """Verificar la contraseña"""
-        return check_password_hash(self.password_hash, password)
+        """
+        Verificar la contraseña en el pool de hash. Si el hash usa otro algoritmo
+        o coste se reemplaza por uno nuevo (se guarda con el próximo commit)
+        """
+        if not en_pool(verificar, self.password_hash, password):
+            return False
+        
+        if necesita_rehash(self.password_hash):
+            self.set_password(password)
+        return True
     
     @property
     def nombre_completo(self):
@@ -0,0 +1,76 @@
+from datetime import timedelta
+from flask import current_app
+from sqlalchemy import text
+from app.database import db, get_bolivia_time
+
+# Recalcular los totales diarios de un rango de fechas [desde, hasta). El total
+# de cada pedido (con su descuento) se suma una vez, como en SQL_SERIE
+SQL_BORRAR = text("DELETE FROM ventas_diarias WHERE dia >= :desde AND dia < :hasta")
+
+SQL_RECONSTRUIR = text("""
+    INSERT INTO ventas_diarias (dia, pedidos, total, cantidad, fecha_actualizacion)
+    SELECT
+        DATE(p.fecha_pedido) AS dia,
+        COUNT(*),
+        SUM(p.total),
+        SUM(p.cantidad),
+        :ahora
+    FROM (
+        SELECT l.pedido_id, l.fecha_pedido, MAX(l.pedido_total) AS total, SUM(l.cantidad) AS cantidad
+        FROM lineas_pedidos_historicas l
+        WHERE l.estado <> 'cancelado'
+          AND l.fecha_pedido >= :desde
+          AND l.fecha_pedido < :hasta
+        GROUP BY l.pedido_id, l.fecha_pedido
+    ) p
+    GROUP BY DATE(p.fecha_pedido)
+""")
+
+
+class VentaDiaria(db.Model):
+    """Totales de ventas por día (opcional, ver VENTAS_DIARIAS_MATERIALIZADO)"""
+    __tablename__ = 'ventas_diarias'
+
+    dia = db.Column(db.Date, primary_key=True)
+    pedidos = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    cantidad = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    fecha_actualizacion = db.Column(db.DateTime, default=get_bolivia_time)
+
+    @staticmethod
+    def materializado():
+        """Indica si las series de ventas se leen de la tabla ventas_diarias"""
+        return current_app.config.get('VENTAS_DIARIAS_MATERIALIZADO', False)
+
+    @staticmethod
+    def reconstruir(desde, hasta):
+        """
+        Recalcular los días del rango [desde, hasta) (no hace commit)
+
+        Returns:
+            Número de días con ventas en el rango
+        """
+        params = {'desde': desde, 'hasta': hasta, 'ahora': get_bolivia_time()}
+        db.session.execute(SQL_BORRAR, params)
+        return db.session.execute(SQL_RECONSTRUIR, params).rowcount
+
+    @staticmethod
+    def actualizar(fecha):
+        """Recalcular el día de un pedido tras escribirlo"""
+        if not VentaDiaria.materializado():
+            return
+
+        db.session.flush()
+        VentaDiaria.reconstruir(fecha, fecha + timedelta(days=1))
+
+    def to_dict(self):
+        """Convertir a diccionario"""
+        return {
+            'dia': self.dia.strftime('%Y-%m-%d'),
+            'pedidos': self.pedidos,
+            'total': float(self.total),
+            'cantidad': float(self.cantidad)
+        }
+
+    def __repr__(self):
+        return f'<VentaDiaria {self.dia}>'
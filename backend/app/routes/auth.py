@@ -1,44 +1,83 @@
-from flask import Blueprint, request, jsonify, session
+import logging
+import math
+
+from flask import Blueprint, request, jsonify, session, current_app
 from app.database import db
 from app.models.usuario import Usuario
+from app.utils.contrasenas import HashSaturado, verificacion_ficticia
+from app.utils.limites import CuboTokens, respuesta_hash_saturado
+from app.utils.errores import error_interno
 
 auth_bp = Blueprint('auth', __name__)
 
+logger = logging.getLogger(__name__)
+
+
+def cubos_login():
+    """Cubos de intentos de login por IP y por cuenta (uno por app, según la configuración)"""
+    cubos = current_app.extensions.get('cubos_login')
+    if cubos is None:
+        config = current_app.config
+        cubos = current_app.extensions['cubos_login'] = {
+            'ip': CuboTokens(config['LOGIN_INTENTOS_IP'], config['LOGIN_RECARGA_IP']),
+            'cuenta': CuboTokens(config['LOGIN_INTENTOS_CUENTA'], config['LOGIN_RECARGA_CUENTA'])
+        }
+    return cubos
+
+
+def demasiados_intentos(espera):
+    """Respuesta 429 con Retry-After"""
+    response = jsonify({'error': 'Demasiados intentos de inicio de sesión. Intente más tarde'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(math.ceil(espera))
+    return response
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """Login de usuario"""
     try:
         data = request.get_json()
         
-        print(f"📥 Datos recibidos: {data}")  # Debug
-        
         if not data:
             return jsonify({'error': 'No se recibieron datos'}), 400
         
         email = data.get('email')
         password = data.get('password')
         
-        print(f"👤 Email: {email}, Password: {'***' if password else 'None'}")  # Debug
-        
         if not email or not password:
             return jsonify({'error': 'Complete todos los campos'}), 400
         
+        # Límite de intentos: cada intento gasta de la IP; los fallidos, de la cuenta
+        cubos = cubos_login()
+        cuenta = email.strip().lower()
+        espera = cubos['ip'].consumir(request.remote_addr) or cubos['cuenta'].disponible(cuenta)
+        if espera:
+            logger.warning('Login bloqueado por exceso de intentos', extra={'cuenta': cuenta})
+            return demasiados_intentos(espera)
+        
         # Buscar usuario
         usuario = Usuario.query.filter_by(email=email).first()
         
         if not usuario:
-            print(f"❌ Usuario no encontrado: {email}")
+            logger.info('Login fallido: usuario no encontrado', extra={'cuenta': cuenta})
+            verificacion_ficticia(password)
+            cubos['cuenta'].consumir(cuenta)
             return jsonify({'error': 'Credenciales incorrectas'}), 401
         
         if not usuario.activo:
-            print(f"❌ Usuario inactivo: {email}")
+            logger.info('Login fallido: usuario inactivo', extra={'cuenta': cuenta})
             return jsonify({'error': 'Usuario desactivado'}), 401
         
         # Verificar contraseña
         if not usuario.check_password(password):
-            print(f"❌ Contraseña incorrecta para: {email}")
+            logger.info('Login fallido: contraseña incorrecta', extra={'cuenta': cuenta})
+            cubos['cuenta'].consumir(cuenta)
             return jsonify({'error': 'Credenciales incorrectas'}), 401
         
+        # Guardar el hash rehecho si cambió el algoritmo o el coste
+        cubos['cuenta'].reiniciar(cuenta)
+        db.session.commit()
+        
         # Guardar en sesión
         session.clear()
         session['user_id'] = usuario.id
@@ -46,31 +85,29 @@ def login():
         session['user_role'] = usuario.rol
         session.permanent = True
         
-        print(f"✅ Login exitoso: {usuario.email}")
-        print(f"📝 Sesión creada: {dict(session)}")
+        logger.info('Login exitoso')
         
         return jsonify({
             'mensaje': 'Login exitoso',
             'usuario': usuario.to_dict()
         }), 200
         
-    except Exception as e:
-        print(f"❌ Error en login: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': f'Error en el servidor: {str(e)}'}), 500
+    except HashSaturado:
+        logger.warning('Login rechazado: verificación de contraseñas saturada')
+        return respuesta_hash_saturado(None)
+    except Exception:
+        return error_interno('Error en el servidor')
 
 
 @auth_bp.route('/logout', methods=['POST'])
 def logout():
     """Logout de usuario"""
     try:
-        print(f"🚪 Cerrando sesión: {session.get('user_id')}")
+        logger.info('Cierre de sesión')
         session.clear()
         return jsonify({'mensaje': 'Sesión cerrada exitosamente'}), 200
-    except Exception as e:
-        print(f"❌ Error en logout: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+    except Exception:
+        return error_interno('Error al cerrar sesión')
 
 
 @auth_bp.route('/validar', methods=['GET'])
@@ -79,28 +116,23 @@ def validar_sesion():
     try:
         user_id = session.get('user_id')
         
-        print(f"🔍 Validando sesión: {dict(session)}")
-        
         if not user_id:
-            print("❌ No hay user_id en sesión")
             return jsonify({'valido': False}), 200
         
         usuario = Usuario.query.get(user_id)
         
         if not usuario or not usuario.activo:
-            print(f"❌ Usuario no encontrado o inactivo: {user_id}")
+            logger.info('Sesión de usuario inexistente o inactivo')
             session.clear()
             return jsonify({'valido': False}), 200
         
-        print(f"✅ Sesión válida para: {usuario.email}")
-        
         return jsonify({
             'valido': True,
             'usuario': usuario.to_dict()
         }), 200
         
-    except Exception as e:
-        print(f"❌ Error validando sesión: {str(e)}")
+    except Exception:
+        logger.exception('Error validando sesión')
         return jsonify({'valido': False}), 200
 
 
@@ -123,5 +155,5 @@ def obtener_perfil():
             'usuario': usuario.to_dict()
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+    except Exception:
+        return error_interno('Error al obtener perfil')
\ No newline at end of file
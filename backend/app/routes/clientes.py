@@ -1,11 +1,20 @@
 from flask import Blueprint, request, jsonify, session
-from app.database import db
-from app.models.cliente import Cliente
+from app.database import db, get_bolivia_time
+from app.models.cliente import Cliente, UbicacionCliente
 from app.models.pedido import Pedido
 from app.models.devolucion import Devolucion
-from app.utils.decorators import login_required
+from app.models.resumen_cliente import ResumenCliente
+from app.models.archivo import pedidos_historicos
+from app.utils.decorators import login_required, lectura_replica, cached, concurrencia_limitada
+from app.utils.limites import por_pagina
+from app.utils.errores import error_interno
+from app.utils.consultas import listado_clientes, paginar
+from app.utils.analitica import calcular_rfm, SEGMENTOS
+from app.utils.cache import cache, cache_compartido, invalidacion_por_escritura
+from app.utils.serializacion import a_diccionarios
 
 clientes_bp = Blueprint('clientes', __name__)
+clientes_bp.after_request(invalidacion_por_escritura('clientes'))
 
 @clientes_bp.route('/', methods=['GET'])
 @login_required
@@ -18,47 +27,27 @@ def listar_clientes():
         zona = request.args.get('zona')
         ciudad = request.args.get('ciudad')
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        
-        query = Cliente.query
-        
-        # Filtro por activo
-        if activo is not None:
-            query = query.filter_by(activo=activo.lower() == 'true')
-        
-        # Filtro por zona
-        if zona:
-            query = query.filter_by(zona=zona)
-        
-        # Filtro por ciudad
-        if ciudad:
-            query = query.filter_by(ciudad=ciudad)
-        
-        # Búsqueda por nombre, celular o dirección
-        if buscar:
-            query = query.filter(
-                db.or_(
-                    Cliente.nombre.ilike(f'%{buscar}%'),
-                    Cliente.celular.ilike(f'%{buscar}%'),
-                    Cliente.direccion.ilike(f'%{buscar}%')
-                )
-            )
-        
-        # Paginación
-        clientes_paginados = query.order_by(Cliente.nombre).paginate(
-            page=page, per_page=per_page, error_out=False
+        per_page = por_pagina()
+        
+        # Filtros por activo, zona y ciudad; búsqueda por nombre, celular o dirección
+        consulta = listado_clientes(
+            activo=activo.lower() == 'true' if activo is not None else None,
+            zona=zona,
+            ciudad=ciudad,
+            buscar=buscar
         )
+        clientes_paginados = paginar(consulta, page, per_page)
         
         return jsonify({
-            'clientes': [cliente.to_dict() for cliente in clientes_paginados.items],
+            'clientes': a_diccionarios(clientes_paginados.items),
             'total': clientes_paginados.total,
             'pagina_actual': page,
             'total_paginas': clientes_paginados.pages,
             'por_pagina': per_page
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al listar clientes: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al listar clientes')
 
 
 @clientes_bp.route('/todos', methods=['GET'])
@@ -66,15 +55,17 @@ def listar_clientes():
 def listar_todos_clientes():
     """Listar todos los clientes activos sin paginación (para selectores)"""
     try:
-        clientes = Cliente.query.filter_by(activo=True).order_by(Cliente.nombre).all()
+        clientes = db.session.query(
+            Cliente.id, Cliente.nombre, Cliente.celular
+        ).filter(Cliente.activo == True).order_by(Cliente.nombre).all()
         
         return jsonify({
-            'clientes': [{'id': c.id, 'nombre': c.nombre, 'celular': c.celular} for c in clientes],
+            'clientes': a_diccionarios(clientes),
             'total': len(clientes)
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al listar clientes: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al listar clientes')
 
 
 @clientes_bp.route('/<int:id>', methods=['GET'])
@@ -82,34 +73,31 @@ def listar_todos_clientes():
 def obtener_cliente(id):
     """Obtener un cliente por ID con sus estadísticas"""
     try:
-        cliente = Cliente.query.get(id)
+        cliente = db.session.get(Cliente, id)
         
         if not cliente:
             return jsonify({'error': 'Cliente no encontrado'}), 404
         
-        # Obtener estadísticas
-        total_pedidos = Pedido.query.filter_by(cliente_id=id).count()
-        total_devoluciones = Devolucion.query.filter_by(cliente_id=id).count()
-        
-        # Calcular total vendido
-        pedidos = Pedido.query.filter_by(cliente_id=id, estado='entregado').all()
-        total_vendido = sum(float(p.total) for p in pedidos)
+        # Obtener estadísticas en una sola consulta agregada
+        resumen = ResumenCliente.obtener(id)
         
         # Último pedido
-        ultimo_pedido = Pedido.query.filter_by(cliente_id=id).order_by(Pedido.fecha_pedido.desc()).first()
+        ultimo_pedido = None
+        if resumen['ultimo_pedido_id']:
+            ultimo_pedido = Pedido.query.options(*Pedido.opciones_carga()).get(resumen['ultimo_pedido_id'])
         
         return jsonify({
             'cliente': cliente.to_dict(),
             'estadisticas': {
-                'total_pedidos': total_pedidos,
-                'total_devoluciones': total_devoluciones,
-                'total_vendido': total_vendido,
+                'total_pedidos': resumen['total_pedidos'],
+                'total_devoluciones': resumen['total_devoluciones'],
+                'total_vendido': resumen['total_vendido'],
                 'ultimo_pedido': ultimo_pedido.to_dict() if ultimo_pedido else None
             }
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al obtener cliente: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al obtener cliente')
 
 
 @clientes_bp.route('/', methods=['POST'])
@@ -159,9 +147,9 @@ def crear_cliente():
             'cliente': nuevo_cliente.to_dict()
         }), 201
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al crear cliente: {str(e)}'}), 500
+        return error_interno('Error al crear cliente')
 
 
 @clientes_bp.route('/<int:id>', methods=['PUT'])
@@ -169,7 +157,7 @@ def crear_cliente():
 def actualizar_cliente(id):
     """Actualizar un cliente"""
     try:
-        cliente = Cliente.query.get(id)
+        cliente = db.session.get(Cliente, id)
         
         if not cliente:
             return jsonify({'error': 'Cliente no encontrado'}), 404
@@ -219,9 +207,9 @@ def actualizar_cliente(id):
             'cliente': cliente.to_dict()
         }), 200
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al actualizar cliente: {str(e)}'}), 500
+        return error_interno('Error al actualizar cliente')
 
 
 @clientes_bp.route('/<int:id>/toggle-activo', methods=['PATCH'])
@@ -229,7 +217,7 @@ def actualizar_cliente(id):
 def toggle_activo_cliente(id):
     """Activar/Desactivar un cliente"""
     try:
-        cliente = Cliente.query.get(id)
+        cliente = db.session.get(Cliente, id)
         
         if not cliente:
             return jsonify({'error': 'Cliente no encontrado'}), 404
@@ -244,9 +232,9 @@ def toggle_activo_cliente(id):
             'cliente': cliente.to_dict()
         }), 200
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al cambiar estado: {str(e)}'}), 500
+        return error_interno('Error al cambiar estado')
 
 
 @clientes_bp.route('/<int:id>', methods=['DELETE'])
@@ -254,18 +242,19 @@ def toggle_activo_cliente(id):
 def eliminar_cliente(id):
     """Eliminar un cliente"""
     try:
-        cliente = Cliente.query.get(id)
+        cliente = db.session.get(Cliente, id)
         
         if not cliente:
             return jsonify({'error': 'Cliente no encontrado'}), 404
         
-        # Verificar si tiene pedidos o devoluciones
-        if len(cliente.pedidos) > 0 or len(cliente.devoluciones) > 0:
+        # Verificar si tiene pedidos (activos o archivados) o devoluciones
+        resumen = ResumenCliente.calcular(id)
+        if resumen['total_pedidos'] > 0 or resumen['total_devoluciones'] > 0:
             return jsonify({
                 'error': 'No se puede eliminar el cliente porque tiene pedidos o devoluciones registradas',
                 'sugerencia': 'Considere desactivar el cliente en lugar de eliminarlo',
-                'pedidos': len(cliente.pedidos),
-                'devoluciones': len(cliente.devoluciones)
+                'pedidos': resumen['total_pedidos'],
+                'devoluciones': resumen['total_devoluciones']
             }), 400
         
         db.session.delete(cliente)
@@ -275,17 +264,59 @@ def eliminar_cliente(id):
             'mensaje': 'Cliente eliminado exitosamente'
         }), 200
         
-    except Exception as e:
+    except Exception:
+        db.session.rollback()
+        return error_interno('Error al eliminar cliente')
+
+
+@clientes_bp.route('/<int:id>/ubicacion', methods=['PUT'])
+@login_required
+def actualizar_ubicacion_cliente(id):
+    """Registrar las coordenadas de entrega de un cliente"""
+    try:
+        cliente = db.session.get(Cliente, id)
+        
+        if not cliente:
+            return jsonify({'error': 'Cliente no encontrado'}), 404
+        
+        data = request.get_json()
+        
+        try:
+            latitud = float(data['latitud'])
+            longitud = float(data['longitud'])
+        except (TypeError, KeyError, ValueError):
+            return jsonify({'error': 'Latitud y longitud son requeridas'}), 400
+        
+        if not -90 <= latitud <= 90 or not -180 <= longitud <= 180:
+            return jsonify({'error': 'Coordenadas fuera de rango'}), 400
+        
+        ubicacion = db.session.get(UbicacionCliente, id)
+        if ubicacion:
+            ubicacion.latitud = latitud
+            ubicacion.longitud = longitud
+        else:
+            ubicacion = UbicacionCliente(cliente_id=id, latitud=latitud, longitud=longitud)
+            db.session.add(ubicacion)
+        
+        db.session.commit()
+        
+        return jsonify({
+            'mensaje': 'Ubicación actualizada exitosamente',
+            'ubicacion': ubicacion.to_dict()
+        }), 200
+        
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al eliminar cliente: {str(e)}'}), 500
+        return error_interno('Error al actualizar ubicación')
 
 
 @clientes_bp.route('/<int:id>/historial-pedidos', methods=['GET'])
 @login_required
+@lectura_replica
 def historial_pedidos_cliente(id):
     """Obtener historial de pedidos de un cliente"""
     try:
-        cliente = Cliente.query.get(id)
+        cliente = db.session.get(Cliente, id)
         
         if not cliente:
             return jsonify({'error': 'Cliente no encontrado'}), 404
@@ -294,29 +325,26 @@ def historial_pedidos_cliente(id):
         estado = request.args.get('estado')
         limite = request.args.get('limite', 10, type=int)
         
-        query = Pedido.query.filter_by(cliente_id=id)
-        
-        if estado:
-            query = query.filter_by(estado=estado)
-        
-        pedidos = query.order_by(Pedido.fecha_pedido.desc()).limit(limite).all()
+        # Incluye los pedidos archivados (con 'archivado': true)
+        pedidos = pedidos_historicos(cliente_id=id, estado=estado, limite=limite)
         
         return jsonify({
             'cliente': cliente.to_dict(),
-            'pedidos': [pedido.to_dict() for pedido in pedidos],
+            'pedidos': pedidos,
             'total': len(pedidos)
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al obtener historial: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al obtener historial')
 
 
 @clientes_bp.route('/<int:id>/historial-devoluciones', methods=['GET'])
 @login_required
+@lectura_replica
 def historial_devoluciones_cliente(id):
     """Obtener historial de devoluciones de un cliente"""
     try:
-        cliente = Cliente.query.get(id)
+        cliente = db.session.get(Cliente, id)
         
         if not cliente:
             return jsonify({'error': 'Cliente no encontrado'}), 404
@@ -325,7 +353,9 @@ def historial_devoluciones_cliente(id):
         estado = request.args.get('estado')
         limite = request.args.get('limite', 10, type=int)
         
-        query = Devolucion.query.filter_by(cliente_id=id)
+        query = Devolucion.query.options(
+            *Devolucion.opciones_carga(include_detalles=True)
+        ).filter_by(cliente_id=id)
         
         if estado:
             query = query.filter_by(estado=estado)
@@ -338,12 +368,13 @@ def historial_devoluciones_cliente(id):
             'total': len(devoluciones)
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al obtener historial: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al obtener historial')
 
 
 @clientes_bp.route('/zonas', methods=['GET'])
 @login_required
+@cached(tags=['clientes'], ttl=300)
 def listar_zonas():
     """Listar todas las zonas registradas"""
     try:
@@ -356,12 +387,13 @@ def listar_zonas():
             'zonas': [z[0] for z in zonas]
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al listar zonas: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al listar zonas')
 
 
 @clientes_bp.route('/ciudades', methods=['GET'])
 @login_required
+@cached(tags=['clientes'], ttl=300)
 def listar_ciudades():
     """Listar todas las ciudades registradas"""
     try:
@@ -374,12 +406,14 @@ def listar_ciudades():
             'ciudades': [c[0] for c in ciudades]
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al listar ciudades: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al listar ciudades')
     
 
 @clientes_bp.route('/estadisticas', methods=['GET'])
 @login_required
+@cached(tags=['clientes'], ttl=60)
+@lectura_replica
 def estadisticas_clientes():
     """Obtener estadísticas de clientes"""
     try:
@@ -393,5 +427,80 @@ def estadisticas_clientes():
             'inactivos': clientes_inactivos
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al obtener estadísticas: {str(e)}'}), 500
\ No newline at end of file
+    except Exception:
+        return error_interno('Error al obtener estadísticas')
+
+
+@clientes_bp.route('/analitica', methods=['GET'])
+@login_required
+@lectura_replica
+@concurrencia_limitada('reportes')
+def analitica_clientes():
+    """Ranking de clientes con puntajes RFM y variación mensual"""
+    try:
+        meses = request.args.get('meses', 12, type=int)
+        zona = request.args.get('zona')
+        segmento = request.args.get('segmento')
+        orden = request.args.get('orden', 'ranking')
+        page = request.args.get('page', 1, type=int)
+        per_page = por_pagina()
+        
+        if meses < 1 or meses > 60:
+            return jsonify({'error': 'El periodo debe estar entre 1 y 60 meses'}), 400
+        
+        if segmento and segmento not in SEGMENTOS:
+            return jsonify({
+                'error': 'Segmento inválido',
+                'segmentos_validos': SEGMENTOS
+            }), 400
+        
+        ordenes_validos = {
+            'ranking': lambda c: c['ranking'],
+            'recencia': lambda c: -c['recencia_dias'],
+            'frecuencia': lambda c: -c['frecuencia'],
+            'variacion': lambda c: c['variacion_mensual'] if c['variacion_mensual'] is not None else float('inf')
+        }
+        if orden not in ordenes_validos:
+            return jsonify({
+                'error': 'Orden inválido',
+                'ordenes_validos': list(ordenes_validos)
+            }), 400
+        
+        # Se calcula una vez por día y periodo (o de noche con flask jobs analitica);
+        # los filtros se aplican sobre el resultado
+        hoy = get_bolivia_time().date()
+        clave = ('clientes_analitica', hoy, meses)
+        analitica = cache.obtener(clave)
+        if analitica is None:
+            analitica = cache_compartido.obtener(clave)
+            if analitica is None:
+                analitica = calcular_rfm(hoy, meses)
+                cache_compartido.guardar(clave, analitica, ttl=24 * 3600)
+            cache.guardar(clave, analitica, ttl=24 * 3600)
+        
+        if zona:
+            analitica = [c for c in analitica if c['zona'] == zona]
+        
+        if segmento:
+            analitica = [c for c in analitica if c['segmento'] == segmento]
+        
+        if orden != 'ranking':
+            analitica = sorted(analitica, key=ordenes_validos[orden])
+        
+        # Paginación
+        page = max(page, 1)
+        total = len(analitica)
+        inicio = (page - 1) * per_page
+        
+        return jsonify({
+            'clientes': analitica[inicio:inicio + per_page],
+            'total': total,
+            'pagina_actual': page,
+            'total_paginas': (total + per_page - 1) // per_page,
+            'por_pagina': per_page,
+            'fecha_calculo': hoy.strftime('%d/%m/%Y'),
+            'periodo_meses': meses
+        }), 200
+        
+    except Exception:
+        return error_interno('Error al obtener analítica')
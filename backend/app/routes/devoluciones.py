@@ -5,10 +5,16 @@ from app.models.devolucion import Devolucion, DetalleDevolucion
 from app.models.pedido import Pedido
 from app.models.cliente import Cliente
 from app.models.producto import Producto
-from app.utils.decorators import login_required
-from app.utils.pdf_generator import PDFGenerator
+from app.models.resumen_cliente import ResumenCliente
+from app.utils.decorators import login_required, lectura_replica, idempotente, respuesta_idempotente, cached, concurrencia_limitada
+from app.utils.limites import por_pagina
+from app.utils.cache import invalidacion_por_escritura
+from app.utils.lineas import sincronizar_lineas
+from app.utils.errores import ErrorValidacion, error_interno
+from app.utils.consultas import listado_devoluciones, paginar, productos_por_id
 
 devoluciones_bp = Blueprint('devoluciones', __name__)
+devoluciones_bp.after_request(invalidacion_por_escritura('devoluciones', 'productos'))
 
 @devoluciones_bp.route('/', methods=['GET'])
 @login_required
@@ -23,27 +29,13 @@ def listar_devoluciones():
         motivo = request.args.get('motivo')
         buscar = request.args.get('buscar', '').strip()
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        
-        query = Devolucion.query
-        
-        # Filtro por cliente
-        if cliente_id:
-            query = query.filter_by(cliente_id=cliente_id)
-        
-        # Filtro por estado
-        if estado:
-            query = query.filter_by(estado=estado)
-        
-        # Filtro por motivo
-        if motivo:
-            query = query.filter_by(motivo=motivo)
+        per_page = por_pagina()
         
         # Filtro por rango de fechas
+        fecha_desde_obj = fecha_hasta_obj = None
         if fecha_desde:
             try:
                 fecha_desde_obj = datetime.strptime(fecha_desde, '%Y-%m-%d')
-                query = query.filter(Devolucion.fecha_devolucion >= fecha_desde_obj)
             except ValueError:
                 return jsonify({'error': 'Formato de fecha_desde inválido. Use YYYY-MM-DD'}), 400
         
@@ -51,23 +43,13 @@ def listar_devoluciones():
             try:
                 fecha_hasta_obj = datetime.strptime(fecha_hasta, '%Y-%m-%d')
                 fecha_hasta_obj = fecha_hasta_obj.replace(hour=23, minute=59, second=59)
-                query = query.filter(Devolucion.fecha_devolucion <= fecha_hasta_obj)
             except ValueError:
                 return jsonify({'error': 'Formato de fecha_hasta inválido. Use YYYY-MM-DD'}), 400
         
-        # Búsqueda por número de devolución o nombre de cliente
-        if buscar:
-            query = query.join(Cliente).filter(
-                db.or_(
-                    Devolucion.numero_devolucion.ilike(f'%{buscar}%'),
-                    Cliente.nombre.ilike(f'%{buscar}%')
-                )
-            )
-        
-        # Paginación
-        devoluciones_paginadas = query.order_by(Devolucion.fecha_devolucion.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        # Filtros por cliente, estado y motivo; búsqueda por número de
+        # devolución o nombre de cliente
+        consulta = listado_devoluciones(cliente_id, estado, motivo, fecha_desde_obj, fecha_hasta_obj, buscar)
+        devoluciones_paginadas = paginar(consulta, page, per_page, entidades=True)
         
         return jsonify({
             'devoluciones': [devolucion.to_dict() for devolucion in devoluciones_paginadas.items],
@@ -77,8 +59,8 @@ def listar_devoluciones():
             'por_pagina': per_page
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al listar devoluciones: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al listar devoluciones')
 
 
 @devoluciones_bp.route('/pendientes', methods=['GET'])
@@ -88,7 +70,9 @@ def listar_devoluciones_pendientes():
     try:
         cliente_id = request.args.get('cliente_id', type=int)
         
-        query = Devolucion.query.filter_by(estado='pendiente')
+        query = Devolucion.query.options(
+            *Devolucion.opciones_carga(include_detalles=True)
+        ).filter_by(estado='pendiente')
         
         if cliente_id:
             query = query.filter_by(cliente_id=cliente_id)
@@ -100,8 +84,8 @@ def listar_devoluciones_pendientes():
             'total': len(devoluciones)
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al listar devoluciones pendientes: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al listar devoluciones pendientes')
 
 
 @devoluciones_bp.route('/<int:id>', methods=['GET'])
@@ -109,7 +93,9 @@ def listar_devoluciones_pendientes():
 def obtener_devolucion(id):
     """Obtener una devolución por ID con todos sus detalles"""
     try:
-        devolucion = Devolucion.query.get(id)
+        devolucion = Devolucion.query.options(
+            *Devolucion.opciones_carga(include_detalles=True)
+        ).get(id)
         
         if not devolucion:
             return jsonify({'error': 'Devolución no encontrada'}), 404
@@ -118,121 +104,139 @@ def obtener_devolucion(id):
             'devolucion': devolucion.to_dict(include_detalles=True)
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al obtener devolución: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al obtener devolución')
+
+
+def registrar_devolucion(data, usuario_id):
+    """
+    Crear la devolución con sus detalles y devolver los productos al stock,
+    sin confirmar la transacción
+
+    Returns:
+        Devolucion creada (ya con id)
+
+    Raises:
+        ErrorValidacion: Cliente, motivo, pedido o productos inválidos
+    """
+    if not data or not data.get('cliente_id') or not data.get('motivo') or not data.get('detalles'):
+        raise ErrorValidacion('Cliente, motivo y detalles son requeridos')
+    
+    # Validar que el cliente existe
+    cliente = db.session.get(Cliente, data['cliente_id'])
+    if not cliente:
+        raise ErrorValidacion('Cliente no encontrado', 404)
+    
+    if not cliente.activo:
+        raise ErrorValidacion('El cliente está desactivado')
+    
+    # Validar motivo
+    motivos_validos = ['vencido', 'mal_estado', 'error_entrega', 'otro']
+    if data['motivo'] not in motivos_validos:
+        raise ErrorValidacion('Motivo inválido', motivos_validos=motivos_validos)
+    
+    # Si se proporciona pedido_id, validar que existe
+    pedido_id = data.get('pedido_id')
+    if pedido_id:
+        pedido = db.session.get(Pedido, pedido_id)
+        if not pedido:
+            raise ErrorValidacion('Pedido no encontrado', 404)
+        
+        if pedido.cliente_id != data['cliente_id']:
+            raise ErrorValidacion('El pedido no pertenece a este cliente')
+    
+    # Generar número de devolución
+    numero_devolucion = Devolucion.generar_numero_devolucion()
+    
+    # Crear devolución
+    nueva_devolucion = Devolucion(
+        numero_devolucion=numero_devolucion,
+        pedido_id=pedido_id,
+        cliente_id=data['cliente_id'],
+        usuario_id=usuario_id,
+        motivo=data['motivo'],
+        descripcion_motivo=data.get('descripcion_motivo'),
+        observaciones=data.get('observaciones')
+    )
+    
+    db.session.add(nueva_devolucion)
+    db.session.flush()
+    
+    # Una sola consulta para productos y reemplazos; los get() del ciclo los toman del mapa de identidad
+    productos_por_id(
+        [detalle_data['producto_id'] for detalle_data in data['detalles']]
+        + [detalle_data['producto_reemplazo_id'] for detalle_data in data['detalles']
+           if detalle_data.get('producto_reemplazo_id')]
+    )
+    
+    # Agregar detalles
+    for detalle_data in data['detalles']:
+        # Validar producto
+        producto = db.session.get(Producto, detalle_data['producto_id'])
+        if not producto:
+            raise ErrorValidacion(f'Producto con ID {detalle_data["producto_id"]} no encontrado', 404,
+                                  producto_id=detalle_data['producto_id'])
+        
+        # Validar cantidad
+        try:
+            cantidad = float(detalle_data['cantidad'])
+            if cantidad <= 0:
+                raise ValueError()
+        except:
+            raise ErrorValidacion('La cantidad debe ser mayor a 0')
+        
+        # Validar producto de reemplazo si existe
+        producto_reemplazo_id = detalle_data.get('producto_reemplazo_id')
+        if producto_reemplazo_id:
+            producto_reemplazo = db.session.get(Producto, producto_reemplazo_id)
+            if not producto_reemplazo:
+                raise ErrorValidacion(f'Producto de reemplazo con ID {producto_reemplazo_id} no encontrado', 404,
+                                      producto_id=producto_reemplazo_id)
+            
+            if not producto_reemplazo.activo:
+                raise ErrorValidacion(f'El producto de reemplazo {producto_reemplazo.nombre} está desactivado',
+                                      producto_id=producto_reemplazo.id)
+        
+        # Crear detalle
+        detalle = DetalleDevolucion(
+            devolucion_id=nueva_devolucion.id,
+            producto_id=producto.id,
+            cantidad=cantidad,
+            producto_reemplazo_id=producto_reemplazo_id,
+            observacion=detalle_data.get('observacion')
+        )
+        
+        db.session.add(detalle)
+        
+        # Retornar producto al stock
+        producto.actualizar_stock(int(cantidad), 'sumar')
+    
+    ResumenCliente.actualizar(nueva_devolucion.cliente_id)
+    return nueva_devolucion
 
 
 @devoluciones_bp.route('/', methods=['POST'])
 @login_required
+@idempotente
 def crear_devolucion():
     """Crear una nueva devolución"""
     try:
-        user_id = session.get('user_id')
-        data = request.get_json()
-        
-        if not data or not data.get('cliente_id') or not data.get('motivo') or not data.get('detalles'):
-            return jsonify({'error': 'Cliente, motivo y detalles son requeridos'}), 400
-        
-        # Validar que el cliente existe
-        cliente = Cliente.query.get(data['cliente_id'])
-        if not cliente:
-            return jsonify({'error': 'Cliente no encontrado'}), 404
-        
-        if not cliente.activo:
-            return jsonify({'error': 'El cliente está desactivado'}), 400
-        
-        # Validar motivo
-        motivos_validos = ['vencido', 'mal_estado', 'error_entrega', 'otro']
-        if data['motivo'] not in motivos_validos:
-            return jsonify({
-                'error': 'Motivo inválido',
-                'motivos_validos': motivos_validos
-            }), 400
-        
-        # Validar que hay detalles
-        if not data['detalles'] or len(data['detalles']) == 0:
-            return jsonify({'error': 'Debe agregar al menos un producto a la devolución'}), 400
-        
-        # Si se proporciona pedido_id, validar que existe
-        pedido_id = data.get('pedido_id')
-        if pedido_id:
-            pedido = Pedido.query.get(pedido_id)
-            if not pedido:
-                return jsonify({'error': 'Pedido no encontrado'}), 404
-            
-            if pedido.cliente_id != data['cliente_id']:
-                return jsonify({'error': 'El pedido no pertenece a este cliente'}), 400
-        
-        # Generar número de devolución
-        numero_devolucion = Devolucion.generar_numero_devolucion()
-        
-        # Crear devolución
-        nueva_devolucion = Devolucion(
-            numero_devolucion=numero_devolucion,
-            pedido_id=pedido_id,
-            cliente_id=data['cliente_id'],
-            usuario_id=user_id,
-            motivo=data['motivo'],
-            descripcion_motivo=data.get('descripcion_motivo'),
-            observaciones=data.get('observaciones')
-        )
-        
-        db.session.add(nueva_devolucion)
-        db.session.flush()
-        
-        # Agregar detalles
-        for detalle_data in data['detalles']:
-            # Validar producto
-            producto = Producto.query.get(detalle_data['producto_id'])
-            if not producto:
-                db.session.rollback()
-                return jsonify({'error': f'Producto con ID {detalle_data["producto_id"]} no encontrado'}), 404
-            
-            # Validar cantidad
-            try:
-                cantidad = float(detalle_data['cantidad'])
-                if cantidad <= 0:
-                    raise ValueError()
-            except:
-                db.session.rollback()
-                return jsonify({'error': 'La cantidad debe ser mayor a 0'}), 400
-            
-            # Validar producto de reemplazo si existe
-            producto_reemplazo_id = detalle_data.get('producto_reemplazo_id')
-            if producto_reemplazo_id:
-                producto_reemplazo = Producto.query.get(producto_reemplazo_id)
-                if not producto_reemplazo:
-                    db.session.rollback()
-                    return jsonify({'error': f'Producto de reemplazo con ID {producto_reemplazo_id} no encontrado'}), 404
-                
-                if not producto_reemplazo.activo:
-                    db.session.rollback()
-                    return jsonify({'error': f'El producto de reemplazo {producto_reemplazo.nombre} está desactivado'}), 400
-            
-            # Crear detalle
-            detalle = DetalleDevolucion(
-                devolucion_id=nueva_devolucion.id,
-                producto_id=producto.id,
-                cantidad=cantidad,
-                producto_reemplazo_id=producto_reemplazo_id,
-                observacion=detalle_data.get('observacion')
-            )
-            
-            db.session.add(detalle)
-            
-            # Retornar producto al stock
-            producto.actualizar_stock(int(cantidad), 'sumar')
-        
-        db.session.commit()
-        
-        return jsonify({
+        nueva_devolucion = registrar_devolucion(request.get_json(), session.get('user_id'))
+        cuerpo = {
             'mensaje': 'Devolución registrada exitosamente',
             'devolucion': nueva_devolucion.to_dict(include_detalles=True)
-        }), 201
+        }
+        respuesta_idempotente(cuerpo, 201)
+        db.session.commit()
         
-    except Exception as e:
+        return jsonify(cuerpo), 201
+        
+    except ErrorValidacion as e:
+        db.session.rollback()
+        return jsonify(e.to_dict()), e.codigo
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al crear devolución: {str(e)}'}), 500
+        return error_interno('Error al crear devolución')
 
 
 @devoluciones_bp.route('/<int:id>', methods=['PUT'])
@@ -240,7 +244,7 @@ def crear_devolucion():
 def actualizar_devolucion(id):
     """Actualizar una devolución (solo si está pendiente)"""
     try:
-        devolucion = Devolucion.query.get(id)
+        devolucion = db.session.get(Devolucion, id)
         
         if not devolucion:
             return jsonify({'error': 'Devolución no encontrada'}), 404
@@ -268,39 +272,36 @@ def actualizar_devolucion(id):
         
         # Si se actualizan los detalles
         if 'detalles' in data:
-            # Restaurar stock de productos eliminados
-            for detalle in devolucion.detalles:
-                producto = Producto.query.get(detalle.producto_id)
-                producto.actualizar_stock(int(detalle.cantidad), 'restar')
-            
-            # Eliminar detalles antiguos
-            DetalleDevolucion.query.filter_by(devolucion_id=id).delete()
+            # Validar productos y reemplazos con una sola consulta
+            producto_ids = {detalle_data['producto_id'] for detalle_data in data['detalles']}
+            producto_ids |= {detalle_data['producto_reemplazo_id'] for detalle_data in data['detalles']
+                             if detalle_data.get('producto_reemplazo_id')}
+            productos = productos_por_id(producto_ids)
             
-            # Agregar nuevos detalles
+            lineas = []
             for detalle_data in data['detalles']:
-                producto = Producto.query.get(detalle_data['producto_id'])
+                producto = productos.get(detalle_data['producto_id'])
                 if not producto:
                     db.session.rollback()
                     return jsonify({'error': f'Producto con ID {detalle_data["producto_id"]} no encontrado'}), 404
                 
                 producto_reemplazo_id = detalle_data.get('producto_reemplazo_id')
                 if producto_reemplazo_id:
-                    producto_reemplazo = Producto.query.get(producto_reemplazo_id)
+                    producto_reemplazo = productos.get(producto_reemplazo_id)
                     if not producto_reemplazo or not producto_reemplazo.activo:
                         db.session.rollback()
                         return jsonify({'error': 'Producto de reemplazo inválido'}), 400
                 
-                detalle = DetalleDevolucion(
-                    devolucion_id=devolucion.id,
-                    producto_id=producto.id,
-                    cantidad=detalle_data['cantidad'],
-                    producto_reemplazo_id=producto_reemplazo_id,
-                    observacion=detalle_data.get('observacion')
-                )
-                db.session.add(detalle)
-                
-                # Retornar al stock
-                producto.actualizar_stock(int(detalle_data['cantidad']), 'sumar')
+                lineas.append({
+                    'producto_id': producto.id,
+                    'cantidad': float(detalle_data['cantidad']),
+                    'producto_reemplazo_id': producto_reemplazo_id,
+                    'observacion': detalle_data.get('observacion')
+                })
+            
+            # Solo se escriben las líneas que cambiaron; lo devuelto vuelve al stock
+            deltas = sincronizar_lineas(devolucion.detalles, lineas, lambda datos: DetalleDevolucion(**datos))
+            Producto.ajustar_stock(deltas)
         
         db.session.commit()
         
@@ -309,9 +310,9 @@ def actualizar_devolucion(id):
             'devolucion': devolucion.to_dict(include_detalles=True)
         }), 200
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al actualizar devolución: {str(e)}'}), 500
+        return error_interno('Error al actualizar devolución')
 
 
 @devoluciones_bp.route('/<int:id>/marcar-compensado', methods=['PATCH'])
@@ -319,7 +320,7 @@ def actualizar_devolucion(id):
 def marcar_compensado(id):
     """Marcar una devolución como compensada"""
     try:
-        devolucion = Devolucion.query.get(id)
+        devolucion = db.session.get(Devolucion, id)
         
         if not devolucion:
             return jsonify({'error': 'Devolución no encontrada'}), 404
@@ -335,7 +336,7 @@ def marcar_compensado(id):
         pedido_compensacion_id = data['pedido_compensacion_id']
         
         # Validar que el pedido existe
-        pedido_compensacion = Pedido.query.get(pedido_compensacion_id)
+        pedido_compensacion = db.session.get(Pedido, pedido_compensacion_id)
         if not pedido_compensacion:
             return jsonify({'error': 'Pedido de compensación no encontrado'}), 404
         
@@ -353,9 +354,9 @@ def marcar_compensado(id):
             'devolucion': devolucion.to_dict(include_detalles=True)
         }), 200
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al marcar como compensado: {str(e)}'}), 500
+        return error_interno('Error al marcar como compensado')
 
 
 @devoluciones_bp.route('/<int:id>', methods=['DELETE'])
@@ -363,7 +364,7 @@ def marcar_compensado(id):
 def eliminar_devolucion(id):
     """Eliminar una devolución (solo si está pendiente)"""
     try:
-        devolucion = Devolucion.query.get(id)
+        devolucion = db.session.get(Devolucion, id)
         
         if not devolucion:
             return jsonify({'error': 'Devolución no encontrada'}), 404
@@ -373,19 +374,20 @@ def eliminar_devolucion(id):
         
         # Descontar del stock los productos devueltos
         for detalle in devolucion.detalles:
-            producto = Producto.query.get(detalle.producto_id)
+            producto = db.session.get(Producto, detalle.producto_id)
             producto.actualizar_stock(int(detalle.cantidad), 'restar')
         
         db.session.delete(devolucion)
+        ResumenCliente.actualizar(devolucion.cliente_id)
         db.session.commit()
         
         return jsonify({
             'mensaje': 'Devolución eliminada exitosamente'
         }), 200
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al eliminar devolución: {str(e)}'}), 500
+        return error_interno('Error al eliminar devolución')
 
 
 @devoluciones_bp.route('/motivos', methods=['GET'])
@@ -404,12 +406,14 @@ def listar_motivos():
             'motivos': motivos
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al listar motivos: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al listar motivos')
 
 
 @devoluciones_bp.route('/estadisticas', methods=['GET'])
 @login_required
+@cached(tags=['devoluciones'], ttl=60)
+@lectura_replica
 def estadisticas_devoluciones():
     """Obtener estadísticas de devoluciones"""
     try:
@@ -452,8 +456,8 @@ def estadisticas_devoluciones():
             }
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al obtener estadísticas: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al obtener estadísticas')
 
 
 @devoluciones_bp.route('/cliente/<int:cliente_id>/pendientes-alerta', methods=['GET'])
@@ -461,12 +465,14 @@ def estadisticas_devoluciones():
 def alerta_devoluciones_pendientes(cliente_id):
     """Verificar si un cliente tiene devoluciones pendientes"""
     try:
-        cliente = Cliente.query.get(cliente_id)
+        cliente = db.session.get(Cliente, cliente_id)
         
         if not cliente:
             return jsonify({'error': 'Cliente no encontrado'}), 404
         
-        devoluciones_pendientes = Devolucion.query.filter_by(
+        devoluciones_pendientes = Devolucion.query.options(
+            *Devolucion.opciones_carga(include_detalles=True)
+        ).filter_by(
             cliente_id=cliente_id,
             estado='pendiente'
         ).all()
@@ -479,20 +485,25 @@ def alerta_devoluciones_pendientes(cliente_id):
             'devoluciones': [dev.to_dict(include_detalles=True) for dev in devoluciones_pendientes] if tiene_pendientes else []
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al verificar devoluciones: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al verificar devoluciones')
 
 
 @devoluciones_bp.route('/<int:id>/pdf', methods=['GET'])
 @login_required
+@lectura_replica
+@concurrencia_limitada('pdf')
 def generar_pdf_devolucion(id):
     """Generar PDF de una devolución"""
     try:
-        devolucion = Devolucion.query.get(id)
+        devolucion = Devolucion.query.options(
+            *Devolucion.opciones_carga(include_detalles=True)
+        ).get(id)
         
         if not devolucion:
             return jsonify({'error': 'Devolución no encontrada'}), 404
         
+        from app.utils.pdf_generator import PDFGenerator
         pdf_gen = PDFGenerator()
         buffer = pdf_gen.generar_devolucion(devolucion.to_dict(include_detalles=True))
         
@@ -503,5 +514,5 @@ def generar_pdf_devolucion(id):
             download_name=f'devolucion_{devolucion.numero_devolucion}.pdf'
         )
         
-    except Exception as e:
-        return jsonify({'error': f'Error al generar PDF: {str(e)}'}), 500
\ No newline at end of file
+    except Exception:
+        return error_interno('Error al generar PDF')
\ No newline at end of file
@@ -1,15 +1,157 @@
-from flask import Blueprint, request, jsonify, session, send_file
-from datetime import datetime, date
+from flask import Blueprint, request, jsonify, session, send_file, current_app, g
+from datetime import datetime, date, timedelta
+from io import BytesIO
 from app.database import db, get_bolivia_time
 from app.models.pedido import Pedido, DetallePedido
-from app.models.cliente import Cliente
+from app.models.cliente import Cliente, UbicacionCliente
 from app.models.producto import Producto
 from app.models.usuario import Usuario
 from app.models.devolucion import Devolucion
-from app.utils.decorators import login_required
-from app.utils.pdf_generator import PDFGenerator
+from app.models.resumen_cliente import ResumenCliente
+from app.models.venta_diaria import VentaDiaria
+from app.models.archivo import pedido_archivado, pedidos_con_lineas
+from app.utils.decorators import login_required, admin_required, lectura_replica, idempotente, respuesta_idempotente, cached, concurrencia_limitada
+from app.utils.limites import por_pagina, cupo_concurrencia, ConcurrenciaAgotada
+from app.utils.analitica import serie_ventas, resumen_estados_pedidos, GRANULARIDADES
+from app.utils.cache import cache_pdf, invalidacion_por_escritura
+from app.utils.coalescencia import coalescedor
+from app.utils.rutas import planificar_rutas
+from app.utils.serializacion import a_diccionarios
+from app.utils.lineas import sincronizar_lineas
+from app.utils.errores import ErrorValidacion, error_interno
+from app.utils.consultas import listado_pedidos, paginar, productos_por_id
 
 pedidos_bp = Blueprint('pedidos', __name__)
+pedidos_bp.after_request(invalidacion_por_escritura('pedidos', 'productos'))
+
+
+def invalidar_caches_fecha(fecha):
+    """Invalidar el PDF del resumen del día de la fecha dada"""
+    if isinstance(fecha, datetime):
+        fecha = fecha.date()
+    cache_pdf.eliminar(('resumen_dia', fecha))
+
+
+def datos_resumen_dia(fecha):
+    """Pedidos del día (también los archivados) agrupados por cliente"""
+    pedidos = pedidos_con_lineas(fecha, fecha + timedelta(days=1))
+    
+    # Agrupar por cliente
+    por_cliente = {}
+    total_general = 0
+    
+    for pedido in pedidos:
+        cliente_existente = por_cliente.get(pedido['cliente_id'])
+        if cliente_existente:
+            cliente_existente['productos'].extend(pedido['productos'])
+            cliente_existente['total'] += pedido['total']
+        else:
+            por_cliente[pedido['cliente_id']] = {
+                'cliente_id': pedido['cliente_id'],
+                'cliente_nombre': pedido['cliente_nombre'],
+                'productos': pedido['productos'],
+                'total': pedido['total']
+            }
+        
+        total_general += pedido['total']
+    
+    return {
+        'fecha': fecha.strftime('%d/%m/%Y'),
+        'resumen': list(por_cliente.values()),
+        'total_pedidos': len(pedidos),
+        'total_clientes': len(por_cliente),
+        'total_general': total_general
+    }
+
+
+def pdf_resumen_dia(fecha):
+    """
+    Contenido del PDF del resumen del día. Los días ya cerrados se guardan en
+    caché RESUMEN_PDF_HORAS o hasta que se modifica un pedido de esa fecha (ver
+    invalidar_caches_fecha). Los generados desde la réplica no se guardan: pueden
+    no incluir todavía la última escritura y quedarían en caché después de ella
+    """
+    clave = ('resumen_dia', fecha)
+    cerrado = fecha < get_bolivia_time().date()
+    
+    if cerrado:
+        contenido = cache_pdf.obtener(clave)
+        if contenido is not None:
+            return contenido
+    
+    # El cupo se toma solo al generar: los PDFs en caché no esperan
+    from app.utils.pdf_generator import PDFGenerator
+    with cupo_concurrencia('pdf'):
+        contenido = PDFGenerator().generar_resumen_dia(datos_resumen_dia(fecha)).getvalue()
+    
+    if cerrado and not g.get('leer_de_replica'):
+        cache_pdf.guardar(clave, contenido, ttl=current_app.config['RESUMEN_PDF_HORAS'] * 3600)
+    return contenido
+
+
+def filtro_pedidos_a_entregar(fecha):
+    """Pedidos pendientes a entregar en la fecha (o registrados ese día si no tienen fecha de entrega)"""
+    return db.and_(
+        Pedido.estado == 'pendiente',
+        db.or_(
+            Pedido.fecha_entrega == fecha,
+            db.and_(Pedido.fecha_entrega.is_(None), db.func.date(Pedido.fecha_pedido) == fecha)
+        )
+    )
+
+
+def _fecha_parametro():
+    """Leer el parámetro fecha (YYYY-MM-DD); por defecto hoy. None si es inválido"""
+    fecha_param = request.args.get('fecha')
+    if not fecha_param:
+        return get_bolivia_time().date()
+    try:
+        return datetime.strptime(fecha_param, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def _datos_picking(fecha, zona=None):
+    """Cantidades a preparar por producto en una sola consulta agrupada"""
+    query = db.session.query(
+        Producto.id,
+        Producto.codigo,
+        Producto.nombre,
+        Producto.unidad_medida,
+        Producto.stock_actual,
+        db.func.sum(DetallePedido.cantidad).label('cantidad'),
+        db.func.count(db.distinct(Pedido.id)).label('pedidos')
+    ).join(
+        DetallePedido, DetallePedido.producto_id == Producto.id
+    ).join(
+        Pedido, Pedido.id == DetallePedido.pedido_id
+    ).filter(filtro_pedidos_a_entregar(fecha))
+    
+    if zona:
+        query = query.join(Cliente, Cliente.id == Pedido.cliente_id).filter(Cliente.zona == zona)
+    
+    filas = query.group_by(Producto.id).order_by(Producto.codigo, Producto.nombre).all()
+    
+    productos = [{
+        'producto_id': fila.id,
+        'codigo': fila.codigo,
+        'nombre': fila.nombre,
+        'unidad_medida': fila.unidad_medida,
+        'cantidad': float(fila.cantidad),
+        'pedidos': fila.pedidos,
+        'stock_actual': fila.stock_actual,
+        # El stock ya se descontó al registrar los pedidos: solo falta si quedó negativo
+        'faltante': max(-(fila.stock_actual or 0), 0)
+    } for fila in filas]
+    
+    return {
+        'fecha': fecha.strftime('%d/%m/%Y'),
+        'zona': zona,
+        'productos': productos,
+        'total_productos': len(productos),
+        'productos_con_faltante': sum(1 for p in productos if p['faltante'] > 0)
+    }
+
 
 @pedidos_bp.route('/', methods=['GET'])
 @login_required
@@ -23,23 +165,13 @@ def listar_pedidos():
         fecha_hasta = request.args.get('fecha_hasta')
         buscar = request.args.get('buscar', '').strip()
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        
-        query = Pedido.query
-        
-        # Filtro por cliente
-        if cliente_id:
-            query = query.filter_by(cliente_id=cliente_id)
-        
-        # Filtro por estado
-        if estado:
-            query = query.filter_by(estado=estado)
+        per_page = por_pagina()
         
         # Filtro por rango de fechas
+        fecha_desde_obj = fecha_hasta_obj = None
         if fecha_desde:
             try:
                 fecha_desde_obj = datetime.strptime(fecha_desde, '%Y-%m-%d')
-                query = query.filter(Pedido.fecha_pedido >= fecha_desde_obj)
             except ValueError:
                 return jsonify({'error': 'Formato de fecha_desde inválido. Use YYYY-MM-DD'}), 400
         
@@ -47,150 +179,179 @@ def listar_pedidos():
             try:
                 fecha_hasta_obj = datetime.strptime(fecha_hasta, '%Y-%m-%d')
                 fecha_hasta_obj = fecha_hasta_obj.replace(hour=23, minute=59, second=59)
-                query = query.filter(Pedido.fecha_pedido <= fecha_hasta_obj)
             except ValueError:
                 return jsonify({'error': 'Formato de fecha_hasta inválido. Use YYYY-MM-DD'}), 400
         
-        # Búsqueda por número de pedido o nombre de cliente
-        if buscar:
-            query = query.join(Cliente).filter(
-                db.or_(
-                    Pedido.numero_pedido.ilike(f'%{buscar}%'),
-                    Cliente.nombre.ilike(f'%{buscar}%')
-                )
-            )
-        
-        # Paginación
-        pedidos_paginados = query.order_by(Pedido.fecha_pedido.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        # Solo las columnas del listado (incluye cliente y usuario por outer join);
+        # búsqueda por número de pedido o nombre de cliente
+        consulta = listado_pedidos(cliente_id, estado, fecha_desde_obj, fecha_hasta_obj, buscar)
+        pedidos_paginados = paginar(consulta, page, per_page)
         
         return jsonify({
-            'pedidos': [pedido.to_dict() for pedido in pedidos_paginados.items],
+            'pedidos': a_diccionarios(pedidos_paginados.items),
             'total': pedidos_paginados.total,
             'pagina_actual': page,
             'total_paginas': pedidos_paginados.pages,
             'por_pagina': per_page
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al listar pedidos: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al listar pedidos')
 
 
 @pedidos_bp.route('/<int:id>', methods=['GET'])
 @login_required
 def obtener_pedido(id):
-    """Obtener un pedido por ID con todos sus detalles"""
+    """Obtener un pedido por ID con todos sus detalles (también si está archivado)"""
     try:
-        pedido = Pedido.query.get(id)
+        pedido = Pedido.query.options(
+            *Pedido.opciones_carga(include_detalles=True)
+        ).get(id)
         
-        if not pedido:
-            return jsonify({'error': 'Pedido no encontrado'}), 404
+        if pedido:
+            datos = pedido.to_dict(include_detalles=True)
+        else:
+            # Los pedidos cerrados antiguos se leen del archivo (solo lectura)
+            datos = pedido_archivado(id)
+            if not datos:
+                return jsonify({'error': 'Pedido no encontrado'}), 404
         
         # Verificar si tiene devoluciones pendientes
-        devoluciones_pendientes = Devolucion.query.filter_by(
-            cliente_id=pedido.cliente_id,
+        devoluciones_pendientes = Devolucion.query.options(
+            *Devolucion.opciones_carga(include_detalles=True)
+        ).filter_by(
+            cliente_id=datos['cliente_id'],
             estado='pendiente'
         ).all()
         
         return jsonify({
-            'pedido': pedido.to_dict(include_detalles=True),
+            'pedido': datos,
             'devoluciones_pendientes': [d.to_dict(include_detalles=True) for d in devoluciones_pendientes]
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al obtener pedido: {str(e)}'}), 500
-
-
-@pedidos_bp.route('/', methods=['POST'])
-@login_required
-def crear_pedido():
-    try:
-        user_id = session.get('user_id')
-        data = request.get_json()
-
-        if not data or not data.get('cliente_id') or not data.get('detalles'):
-            return jsonify({'error': 'Cliente y detalles son requeridos'}), 400
-
-        cliente = Cliente.query.get(data['cliente_id'])
-        if not cliente:
-            return jsonify({'error': 'Cliente no encontrado'}), 404
-        if not cliente.activo:
-            return jsonify({'error': 'El cliente está desactivado'}), 400
-
-        if not data['detalles'] or len(data['detalles']) == 0:
-            return jsonify({'error': 'Debe agregar al menos un producto al pedido'}), 400
-
-        numero_pedido = Pedido.generar_numero_pedido()
-        descuento = float(data.get('descuento', 0))
-
-        nuevo_pedido = Pedido(
-            numero_pedido=numero_pedido,
-            cliente_id=data['cliente_id'],
-            usuario_id=user_id,
-            descuento=descuento,
-            observaciones=data.get('observaciones'),
-            fecha_entrega=datetime.strptime(data['fecha_entrega'], '%Y-%m-%d').date() if data.get('fecha_entrega') else None,
-            subtotal=0,
-            total=0
+    except Exception:
+        return error_interno('Error al obtener pedido')
+
+
+def registrar_pedido(data, usuario_id, validar_stock=False):
+    """
+    Crear el pedido con sus detalles y descontar stock, sin confirmar la transacción
+
+    Args:
+        data: Cuerpo de la petición (cliente_id, detalles, descuento, ...)
+        usuario_id: Vendedor que registra el pedido
+        validar_stock: Rechazar si algún producto no tiene stock suficiente
+            (pedidos tomados sin conexión que se sincronizan después)
+
+    Returns:
+        Pedido creado (ya con id)
+
+    Raises:
+        ErrorValidacion: Cliente o productos inválidos
+    """
+    if not data or not data.get('cliente_id') or not data.get('detalles'):
+        raise ErrorValidacion('Cliente y detalles son requeridos')
+
+    cliente = db.session.get(Cliente, data['cliente_id'])
+    if not cliente:
+        raise ErrorValidacion('Cliente no encontrado', 404)
+    if not cliente.activo:
+        raise ErrorValidacion('El cliente está desactivado')
+
+    numero_pedido = Pedido.generar_numero_pedido()
+    descuento = float(data.get('descuento', 0))
+
+    nuevo_pedido = Pedido(
+        numero_pedido=numero_pedido,
+        cliente_id=data['cliente_id'],
+        usuario_id=usuario_id,
+        descuento=descuento,
+        observaciones=data.get('observaciones'),
+        fecha_entrega=datetime.strptime(data['fecha_entrega'], '%Y-%m-%d').date() if data.get('fecha_entrega') else None,
+        subtotal=0,
+        total=0
+    )
+
+    db.session.add(nuevo_pedido)
+    db.session.flush()
+
+    subtotal_acumulado = 0.0
+
+    # Una sola consulta para todos los productos; los get() del ciclo los toman del mapa de identidad
+    productos_por_id(detalle_data['producto_id'] for detalle_data in data['detalles'])
+
+    for detalle_data in data['detalles']:
+        producto = db.session.get(Producto, detalle_data['producto_id'])
+        if not producto:
+            raise ErrorValidacion(f'Producto con ID {detalle_data["producto_id"]} no encontrado', 404,
+                                  producto_id=detalle_data['producto_id'])
+        if not producto.activo:
+            raise ErrorValidacion(f'El producto {producto.nombre} está desactivado', producto_id=producto.id)
+
+        try:
+            cantidad = float(detalle_data['cantidad'])
+            if cantidad <= 0:
+                raise ValueError()
+        except:
+            raise ErrorValidacion('La cantidad debe ser mayor a 0')
+
+        if validar_stock and producto.stock_actual < int(cantidad):
+            raise ErrorValidacion(f'Stock insuficiente de {producto.nombre}', 409,
+                                  producto_id=producto.id,
+                                  stock_disponible=producto.stock_actual,
+                                  cantidad_necesaria=int(cantidad))
+
+        precio_unitario = float(detalle_data.get('precio_unitario', producto.precio_venta))
+        subtotal_detalle = cantidad * precio_unitario
+
+        detalle = DetallePedido(
+            pedido_id=nuevo_pedido.id,
+            producto_id=producto.id,
+            cantidad=cantidad,
+            precio_unitario=precio_unitario,
+            subtotal=subtotal_detalle
         )
+        db.session.add(detalle)
 
-        db.session.add(nuevo_pedido)
-        db.session.flush()
-
-        subtotal_acumulado = 0.0
+        subtotal_acumulado += subtotal_detalle
+        producto.actualizar_stock(int(cantidad), 'restar')
 
-        for detalle_data in data['detalles']:
-            producto = Producto.query.get(detalle_data['producto_id'])
-            if not producto:
-                db.session.rollback()
-                return jsonify({'error': f'Producto con ID {detalle_data["producto_id"]} no encontrado'}), 404
-            if not producto.activo:
-                db.session.rollback()
-                return jsonify({'error': f'El producto {producto.nombre} está desactivado'}), 400
+    nuevo_pedido.subtotal = subtotal_acumulado
+    nuevo_pedido.total = subtotal_acumulado - descuento
 
-            try:
-                cantidad = float(detalle_data['cantidad'])
-                if cantidad <= 0:
-                    raise ValueError()
-            except:
-                db.session.rollback()
-                return jsonify({'error': 'La cantidad debe ser mayor a 0'}), 400
-
-            precio_unitario = float(detalle_data.get('precio_unitario', producto.precio_venta))
-            subtotal_detalle = cantidad * precio_unitario
-
-            detalle = DetallePedido(
-                pedido_id=nuevo_pedido.id,
-                producto_id=producto.id,
-                cantidad=cantidad,
-                precio_unitario=precio_unitario,
-                subtotal=subtotal_detalle
-            )
-            db.session.add(detalle)
-
-            subtotal_acumulado += subtotal_detalle
-            producto.actualizar_stock(int(cantidad), 'restar')
-
-        nuevo_pedido.subtotal = subtotal_acumulado
-        nuevo_pedido.total = subtotal_acumulado - descuento
+    ResumenCliente.actualizar(nuevo_pedido.cliente_id)
+    VentaDiaria.actualizar(nuevo_pedido.fecha_pedido.date())
+    return nuevo_pedido
 
-        db.session.commit()
 
-        return jsonify({
+@pedidos_bp.route('/', methods=['POST'])
+@login_required
+@idempotente
+def crear_pedido():
+    try:
+        nuevo_pedido = registrar_pedido(request.get_json(), session.get('user_id'))
+        cuerpo = {
             'mensaje': 'Pedido creado exitosamente',
             'pedido': nuevo_pedido.to_dict(include_detalles=True)
-        }), 201
+        }
+        respuesta_idempotente(cuerpo, 201)
+        db.session.commit()
+        invalidar_caches_fecha(nuevo_pedido.fecha_pedido)
+
+        return jsonify(cuerpo), 201
 
-    except Exception as e:
+    except ErrorValidacion as e:
         db.session.rollback()
-        return jsonify({'error': f'Error al crear pedido: {str(e)}'}), 500
+        return jsonify(e.to_dict()), e.codigo
+    except Exception:
+        db.session.rollback()
+        return error_interno('Error al crear pedido')
 
 @pedidos_bp.route('/<int:id>', methods=['PUT'])
 @login_required
 def actualizar_pedido(id):
     try:
-        pedido = Pedido.query.get(id)
+        pedido = db.session.get(Pedido, id)
         
         if not pedido:
             return jsonify({'error': 'Pedido no encontrado'}), 404
@@ -210,20 +371,15 @@ def actualizar_pedido(id):
         pedido.descuento = descuento
 
         if 'detalles' in data:
-            # Restaurar stock de productos anteriores
-            for detalle in pedido.detalles:
-                producto = Producto.query.get(detalle.producto_id)
-                if producto:
-                    producto.actualizar_stock(int(detalle.cantidad), 'sumar')
+            # Validar todos los productos con una sola consulta
+            producto_ids = {detalle_data['producto_id'] for detalle_data in data['detalles']}
+            productos = productos_por_id(producto_ids)
             
-            # Eliminar detalles antiguos
-            DetallePedido.query.filter_by(pedido_id=id).delete()
-            db.session.flush()
-
+            lineas = []
             subtotal_acumulado = 0.0
-
+            
             for detalle_data in data['detalles']:
-                producto = Producto.query.get(detalle_data['producto_id'])
+                producto = productos.get(detalle_data['producto_id'])
                 if not producto:
                     db.session.rollback()
                     return jsonify({'error': f'Producto con ID {detalle_data["producto_id"]} no encontrado'}), 404
@@ -235,40 +391,43 @@ def actualizar_pedido(id):
                 cantidad = float(detalle_data['cantidad'])
                 precio_unitario = float(detalle_data.get('precio_unitario', producto.precio_venta))
                 subtotal_detalle = cantidad * precio_unitario
-
-                detalle = DetallePedido(
-                    pedido_id=pedido.id,
-                    producto_id=producto.id,
-                    cantidad=cantidad,
-                    precio_unitario=precio_unitario,
-                    subtotal=subtotal_detalle
-                )
-                db.session.add(detalle)
-
+                
+                lineas.append({
+                    'producto_id': producto.id,
+                    'cantidad': cantidad,
+                    'precio_unitario': precio_unitario,
+                    'subtotal': subtotal_detalle
+                })
                 subtotal_acumulado += subtotal_detalle
-                producto.actualizar_stock(int(cantidad), 'restar')
-
+            
+            # Solo se escriben las líneas que cambiaron y el stock neto de cada producto
+            deltas = sincronizar_lineas(pedido.detalles, lineas, lambda datos: DetallePedido(**datos))
+            Producto.ajustar_stock({producto_id: -delta for producto_id, delta in deltas.items()})
+            
             # Asignar totales directamente
             pedido.subtotal = subtotal_acumulado
             pedido.total = subtotal_acumulado - descuento
 
+        ResumenCliente.actualizar(pedido.cliente_id)
+        VentaDiaria.actualizar(pedido.fecha_pedido.date())
         db.session.commit()
+        invalidar_caches_fecha(pedido.fecha_pedido)
         
         return jsonify({
             'mensaje': 'Pedido actualizado exitosamente',
             'pedido': pedido.to_dict(include_detalles=True)
         }), 200
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al actualizar pedido: {str(e)}'}), 500
+        return error_interno('Error al actualizar pedido')
 
 @pedidos_bp.route('/<int:id>/cambiar-estado', methods=['PATCH'])
 @login_required
 def cambiar_estado_pedido(id):
     """Cambiar el estado de un pedido"""
     try:
-        pedido = Pedido.query.get(id)
+        pedido = db.session.get(Pedido, id)
         
         if not pedido:
             return jsonify({'error': 'Pedido no encontrado'}), 404
@@ -291,13 +450,13 @@ def cambiar_estado_pedido(id):
         # Si se cancela, restaurar stock
         if nuevo_estado == 'cancelado' and pedido.estado != 'cancelado':
             for detalle in pedido.detalles:
-                producto = Producto.query.get(detalle.producto_id)
+                producto = db.session.get(Producto, detalle.producto_id)
                 producto.actualizar_stock(int(detalle.cantidad), 'sumar')
         
         # Si se reactiva desde cancelado, descontar stock
         if pedido.estado == 'cancelado' and nuevo_estado in ['pendiente', 'entregado']:
             for detalle in pedido.detalles:
-                producto = Producto.query.get(detalle.producto_id)
+                producto = db.session.get(Producto, detalle.producto_id)
                 if producto.stock_actual < int(detalle.cantidad):
                     db.session.rollback()
                     return jsonify({
@@ -308,16 +467,19 @@ def cambiar_estado_pedido(id):
                 producto.actualizar_stock(int(detalle.cantidad), 'restar')
         
         pedido.estado = nuevo_estado
+        ResumenCliente.actualizar(pedido.cliente_id)
+        VentaDiaria.actualizar(pedido.fecha_pedido.date())
         db.session.commit()
+        invalidar_caches_fecha(pedido.fecha_pedido)
         
         return jsonify({
             'mensaje': f'Pedido cambiado a estado "{nuevo_estado}" exitosamente',
             'pedido': pedido.to_dict()
         }), 200
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al cambiar estado: {str(e)}'}), 500
+        return error_interno('Error al cambiar estado')
 
 
 @pedidos_bp.route('/<int:id>', methods=['DELETE'])
@@ -325,7 +487,7 @@ def cambiar_estado_pedido(id):
 def eliminar_pedido(id):
     """Eliminar un pedido (solo si está pendiente)"""
     try:
-        pedido = Pedido.query.get(id)
+        pedido = db.session.get(Pedido, id)
         
         if not pedido:
             return jsonify({'error': 'Pedido no encontrado'}), 404
@@ -335,23 +497,28 @@ def eliminar_pedido(id):
         
         # Restaurar stock
         for detalle in pedido.detalles:
-            producto = Producto.query.get(detalle.producto_id)
+            producto = db.session.get(Producto, detalle.producto_id)
             producto.actualizar_stock(int(detalle.cantidad), 'sumar')
         
+        fecha_pedido = pedido.fecha_pedido
         db.session.delete(pedido)
+        ResumenCliente.actualizar(pedido.cliente_id)
+        VentaDiaria.actualizar(fecha_pedido.date())
         db.session.commit()
+        invalidar_caches_fecha(fecha_pedido)
         
         return jsonify({
             'mensaje': 'Pedido eliminado exitosamente'
         }), 200
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al eliminar pedido: {str(e)}'}), 500
+        return error_interno('Error al eliminar pedido')
 
 
 @pedidos_bp.route('/resumen-dia', methods=['GET'])
 @login_required
+@lectura_replica
 def resumen_dia():
     """Obtener resumen de pedidos del día"""
     try:
@@ -365,105 +532,207 @@ def resumen_dia():
         else:
             fecha = get_bolivia_time().date()
         
-        # Obtener pedidos del día
-        pedidos = Pedido.query.filter(
-            db.func.date(Pedido.fecha_pedido) == fecha
-        ).order_by(Pedido.cliente_id, Pedido.fecha_pedido).all()
-        
-        # Agrupar por cliente
-        resumen = []
-        total_general = 0
-        
-        for pedido in pedidos:
-            cliente_existente = next(
-                (item for item in resumen if item['cliente_id'] == pedido.cliente_id),
-                None
-            )
-            
-            if cliente_existente:
-                for detalle in pedido.detalles:
-                    cliente_existente['productos'].append({
-                        'nombre': detalle.producto.nombre,
-                        'cantidad': float(detalle.cantidad),
-                        'unidad_medida': detalle.producto.unidad_medida
-                    })
-                cliente_existente['total'] += float(pedido.total)
-            else:
-                resumen.append({
-                    'cliente_id': pedido.cliente_id,
-                    'cliente_nombre': pedido.cliente.nombre,
-                    'productos': [{
-                        'nombre': detalle.producto.nombre,
-                        'cantidad': float(detalle.cantidad),
-                        'unidad_medida': detalle.producto.unidad_medida
-                    } for detalle in pedido.detalles],
-                    'total': float(pedido.total)
-                })
-            
-            total_general += float(pedido.total)
+        # Peticiones simultáneas del mismo día comparten un solo cálculo
+        datos, coalescida = coalescedor.ejecutar(
+            ('resumen_dia', fecha, bool(g.get('leer_de_replica'))), datos_resumen_dia, fecha
+        )
         
-        return jsonify({
-            'fecha': fecha.strftime('%d/%m/%Y'),
-            'resumen': resumen,
-            'total_pedidos': len(pedidos),
-            'total_clientes': len(resumen),
-            'total_general': total_general
-        }), 200
+        response = jsonify(datos)
+        response.headers['X-Coalescido'] = 'true' if coalescida else 'false'
+        return response, 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al generar resumen: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al generar resumen')
+
+
+@pedidos_bp.route('/coalescencia', methods=['GET'])
+@admin_required
+def metricas_coalescencia():
+    """Cálculos compartidos por peticiones simultáneas en este proceso"""
+    return jsonify({'coalescencia': coalescedor.metricas()}), 200
 
 
 @pedidos_bp.route('/estadisticas', methods=['GET'])
 @login_required
+@cached(tags=['pedidos'], ttl=60)
+@lectura_replica
 def estadisticas_pedidos():
     """Obtener estadísticas generales de pedidos"""
     try:
         fecha_desde = request.args.get('fecha_desde')
         fecha_hasta = request.args.get('fecha_hasta')
         
-        query = Pedido.query
+        desde = datetime.strptime(fecha_desde, '%Y-%m-%d').date() if fecha_desde else None
+        hasta = datetime.strptime(fecha_hasta, '%Y-%m-%d').date() if fecha_hasta else None
         
-        if fecha_desde:
-            fecha_desde_obj = datetime.strptime(fecha_desde, '%Y-%m-%d')
-            query = query.filter(Pedido.fecha_pedido >= fecha_desde_obj)
+        # Conteos por estado y total vendido en una consulta, con los pedidos archivados
+        return jsonify(resumen_estados_pedidos(desde, hasta)), 200
         
-        if fecha_hasta:
-            fecha_hasta_obj = datetime.strptime(fecha_hasta, '%Y-%m-%d')
-            fecha_hasta_obj = fecha_hasta_obj.replace(hour=23, minute=59, second=59)
-            query = query.filter(Pedido.fecha_pedido <= fecha_hasta_obj)
+    except Exception:
+        return error_interno('Error al obtener estadísticas')
+
+
+@pedidos_bp.route('/series', methods=['GET'])
+@login_required
+@cached(tags=['pedidos'], ttl=300)
+@lectura_replica
+@concurrencia_limitada('reportes')
+def serie_ventas_pedidos():
+    """Obtener totales y cantidades vendidas por día, semana o mes"""
+    try:
+        granularidad = request.args.get('granularidad', 'dia')
+        desde = request.args.get('desde')
+        hasta = request.args.get('hasta')
+        cliente_id = request.args.get('cliente_id', type=int)
+        producto_id = request.args.get('producto_id', type=int)
+        
+        if granularidad not in GRANULARIDADES:
+            return jsonify({
+                'error': 'Granularidad inválida',
+                'granularidades_validas': list(GRANULARIDADES)
+            }), 400
+        
+        try:
+            hasta = datetime.strptime(hasta, '%Y-%m-%d').date() if hasta else get_bolivia_time().date()
+            if desde:
+                desde = datetime.strptime(desde, '%Y-%m-%d').date()
+            else:
+                dias_por_defecto = {'dia': 30, 'semana': 12 * 7, 'mes': 365}
+                desde = hasta - timedelta(days=dias_por_defecto[granularidad])
+        except ValueError:
+            return jsonify({'error': 'Formato de fecha inválido. Use YYYY-MM-DD'}), 400
+        
+        if desde > hasta:
+            return jsonify({'error': 'La fecha desde no puede ser mayor a la fecha hasta'}), 400
+        
+        limites = {'dia': 366, 'semana': 5 * 366, 'mes': 10 * 366}
+        if (hasta - desde).days > limites[granularidad]:
+            return jsonify({'error': 'Rango de fechas demasiado amplio para la granularidad'}), 400
         
-        # Contar por estado
-        total_pendientes = query.filter_by(estado='pendiente').count()
-        total_entregados = query.filter_by(estado='entregado').count()
-        total_cancelados = query.filter_by(estado='cancelado').count()
+        serie = serie_ventas(granularidad, desde, hasta, cliente_id, producto_id)
         
-        # Calcular total vendido
-        pedidos_entregados = query.filter_by(estado='entregado').all()
-        total_vendido = sum(float(p.total) for p in pedidos_entregados)
+        return jsonify({
+            'granularidad': granularidad,
+            'desde': desde.strftime('%d/%m/%Y'),
+            'hasta': hasta.strftime('%d/%m/%Y'),
+            'series': serie,
+            'total': sum(p['total'] for p in serie),
+            'cantidad': sum(p['cantidad'] for p in serie),
+            'pedidos': sum(p['pedidos'] for p in serie)
+        }), 200
+        
+    except Exception:
+        return error_interno('Error al obtener series')
+
+
+@pedidos_bp.route('/rutas', methods=['GET'])
+@login_required
+@concurrencia_limitada('reportes')
+def rutas_entrega():
+    """Planificar rutas de entrega: pedidos pendientes agrupados por zona"""
+    try:
+        fecha = _fecha_parametro()
+        if not fecha:
+            return jsonify({'error': 'Formato de fecha inválido. Use YYYY-MM-DD'}), 400
+        
+        filas = db.session.query(
+            Pedido.id.label('pedido_id'),
+            Pedido.numero_pedido,
+            Pedido.total,
+            Cliente.id.label('cliente_id'),
+            Cliente.nombre.label('cliente_nombre'),
+            Cliente.direccion,
+            Cliente.celular,
+            Cliente.zona,
+            Cliente.ciudad,
+            UbicacionCliente.latitud,
+            UbicacionCliente.longitud,
+            DetallePedido.producto_id,
+            Producto.codigo.label('producto_codigo'),
+            Producto.nombre.label('producto_nombre'),
+            Producto.unidad_medida,
+            DetallePedido.cantidad
+        ).join(
+            Cliente, Cliente.id == Pedido.cliente_id
+        ).join(
+            DetallePedido, DetallePedido.pedido_id == Pedido.id
+        ).join(
+            Producto, Producto.id == DetallePedido.producto_id
+        ).outerjoin(
+            UbicacionCliente, UbicacionCliente.cliente_id == Cliente.id
+        ).filter(filtro_pedidos_a_entregar(fecha)).all()
+        
+        origen = (current_app.config['DEPOSITO_LATITUD'], current_app.config['DEPOSITO_LONGITUD'])
+        zonas = planificar_rutas([fila._mapping for fila in filas], origen)
         
         return jsonify({
-            'total_pedidos': query.count(),
-            'pendientes': total_pendientes,
-            'entregados': total_entregados,
-            'cancelados': total_cancelados,
-            'total_vendido': total_vendido
+            'fecha': fecha.strftime('%d/%m/%Y'),
+            'deposito': {'latitud': origen[0], 'longitud': origen[1]},
+            'zonas': zonas,
+            'total_zonas': len(zonas),
+            'total_paradas': sum(z['total_paradas'] for z in zonas),
+            'total_pedidos': sum(z['total_pedidos'] for z in zonas)
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al obtener estadísticas: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al planificar rutas')
+
+
+@pedidos_bp.route('/picking', methods=['GET'])
+@login_required
+def lista_picking():
+    """Lista de preparación consolidada: cantidad por producto de los pedidos del día"""
+    try:
+        fecha = _fecha_parametro()
+        if not fecha:
+            return jsonify({'error': 'Formato de fecha inválido. Use YYYY-MM-DD'}), 400
+        
+        return jsonify(_datos_picking(fecha, request.args.get('zona'))), 200
+        
+    except Exception:
+        return error_interno('Error al generar lista de preparación')
+
+
+@pedidos_bp.route('/picking/pdf', methods=['GET'])
+@login_required
+@concurrencia_limitada('pdf')
+def generar_pdf_picking():
+    """Generar PDF de la lista de preparación"""
+    try:
+        fecha = _fecha_parametro()
+        if not fecha:
+            return jsonify({'error': 'Formato de fecha inválido. Use YYYY-MM-DD'}), 400
+        
+        data = _datos_picking(fecha, request.args.get('zona'))
+        
+        from app.utils.pdf_generator import PDFGenerator
+        pdf_gen = PDFGenerator()
+        buffer = pdf_gen.generar_picking(data)
+        
+        return send_file(
+            buffer,
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=f'picking_{fecha.strftime("%Y%m%d")}.pdf'
+        )
+        
+    except Exception:
+        return error_interno('Error al generar PDF')
 
 
 @pedidos_bp.route('/<int:id>/pdf', methods=['GET'])
 @login_required
+@lectura_replica
+@concurrencia_limitada('pdf')
 def generar_pdf_pedido(id):
     """Generar PDF de un pedido"""
     try:
-        pedido = Pedido.query.get(id)
+        pedido = db.session.get(Pedido, id)
         
         if not pedido:
             return jsonify({'error': 'Pedido no encontrado'}), 404
         
+        from app.utils.pdf_generator import PDFGenerator
         pdf_gen = PDFGenerator()
         buffer = pdf_gen.generar_pedido(pedido.to_dict(include_detalles=True))
         
@@ -474,12 +743,13 @@ def generar_pdf_pedido(id):
             download_name=f'pedido_{pedido.numero_pedido}.pdf'
         )
         
-    except Exception as e:
-        return jsonify({'error': f'Error al generar PDF: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al generar PDF')
 
 
 @pedidos_bp.route('/resumen-dia/pdf', methods=['GET'])
 @login_required
+@lectura_replica
 def generar_pdf_resumen_dia():
     """Generar PDF del resumen del día"""
     try:
@@ -493,60 +763,20 @@ def generar_pdf_resumen_dia():
         else:
             fecha = get_bolivia_time().date()
         
-        # Obtener datos del resumen
-        pedidos = Pedido.query.filter(
-            db.func.date(Pedido.fecha_pedido) == fecha
-        ).order_by(Pedido.cliente_id, Pedido.fecha_pedido).all()
-        
-        # Agrupar por cliente
-        resumen = []
-        total_general = 0
-        
-        for pedido in pedidos:
-            cliente_existente = next(
-                (item for item in resumen if item['cliente_id'] == pedido.cliente_id),
-                None
-            )
-            
-            if cliente_existente:
-                for detalle in pedido.detalles:
-                    cliente_existente['productos'].append({
-                        'nombre': detalle.producto.nombre,
-                        'cantidad': float(detalle.cantidad),
-                        'unidad_medida': detalle.producto.unidad_medida
-                    })
-                cliente_existente['total'] += float(pedido.total)
-            else:
-                resumen.append({
-                    'cliente_id': pedido.cliente_id,
-                    'cliente_nombre': pedido.cliente.nombre,
-                    'productos': [{
-                        'nombre': detalle.producto.nombre,
-                        'cantidad': float(detalle.cantidad),
-                        'unidad_medida': detalle.producto.unidad_medida
-                    } for detalle in pedido.detalles],
-                    'total': float(pedido.total)
-                })
-            
-            total_general += float(pedido.total)
-        
-        data = {
-            'fecha': fecha.strftime('%d/%m/%Y'),
-            'resumen': resumen,
-            'total_pedidos': len(pedidos),
-            'total_clientes': len(resumen),
-            'total_general': total_general
-        }
-        
-        pdf_gen = PDFGenerator()
-        buffer = pdf_gen.generar_resumen_dia(data)
+        contenido, coalescida = coalescedor.ejecutar(
+            ('resumen_dia_pdf', fecha, bool(g.get('leer_de_replica'))), pdf_resumen_dia, fecha
+        )
         
-        return send_file(
-            buffer,
+        response = send_file(
+            BytesIO(contenido),
             mimetype='application/pdf',
             as_attachment=True,
             download_name=f'resumen_{fecha.strftime("%Y%m%d")}.pdf'
         )
+        response.headers['X-Coalescido'] = 'true' if coalescida else 'false'
+        return response
         
-    except Exception as e:
-        return jsonify({'error': f'Error al generar PDF: {str(e)}'}), 500
\ No newline at end of file
+    except ConcurrenciaAgotada:
+        raise
+    except Exception:
+        return error_interno('Error al generar PDF')
\ No newline at end of file
@@ -1,10 +1,18 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app
+from sqlalchemy import text
 from app.database import db
-from app.models.producto import Producto
-from app.models.pedido import DetallePedido
-from app.utils.decorators import login_required
+from app.models.producto import Producto, SugerenciaReposicion
+from app.models.archivo import ventas_producto
+from app.utils.decorators import login_required, lectura_replica, cached
+from app.utils.limites import por_pagina
+from app.utils.errores import error_interno
+from app.utils.consultas import listado_productos, paginar, productos_por_id
+from app.utils.analitica import ranking_productos_vendidos
+from app.utils.cache import invalidacion_por_escritura
+from app.utils.serializacion import a_diccionarios, columnas, monto
 
 productos_bp = Blueprint('productos', __name__)
+productos_bp.after_request(invalidacion_por_escritura('productos'))
 
 @productos_bp.route('/', methods=['GET'])
 @login_required
@@ -17,47 +25,28 @@ def listar_productos():
         stock_bajo = request.args.get('stock_bajo')
         unidad_medida = request.args.get('unidad_medida')
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        
-        query = Producto.query
-        
-        # Filtro por activo
-        if activo is not None:
-            query = query.filter_by(activo=activo.lower() == 'true')
-        
-        # Filtro por unidad de medida
-        if unidad_medida:
-            query = query.filter_by(unidad_medida=unidad_medida)
-        
-        # Filtro por stock bajo
-        if stock_bajo and stock_bajo.lower() == 'true':
-            query = query.filter(Producto.stock_actual <= Producto.stock_minimo)
-        
-        # Búsqueda por código, nombre o descripción
-        if buscar:
-            query = query.filter(
-                db.or_(
-                    Producto.codigo.ilike(f'%{buscar}%'),
-                    Producto.nombre.ilike(f'%{buscar}%'),
-                    Producto.descripcion.ilike(f'%{buscar}%')
-                )
-            )
-        
-        # Paginación
-        productos_paginados = query.order_by(Producto.nombre).paginate(
-            page=page, per_page=per_page, error_out=False
+        per_page = por_pagina()
+        
+        # Filtros por activo, unidad de medida y stock bajo; búsqueda por
+        # código, nombre o descripción
+        consulta = listado_productos(
+            activo=activo.lower() == 'true' if activo is not None else None,
+            unidad_medida=unidad_medida,
+            stock_bajo=bool(stock_bajo) and stock_bajo.lower() == 'true',
+            buscar=buscar
         )
+        productos_paginados = paginar(consulta, page, per_page)
         
         return jsonify({
-            'productos': [producto.to_dict() for producto in productos_paginados.items],
+            'productos': a_diccionarios(productos_paginados.items),
             'total': productos_paginados.total,
             'pagina_actual': page,
             'total_paginas': productos_paginados.pages,
             'por_pagina': per_page
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al listar productos: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al listar productos')
 
 
 @productos_bp.route('/todos', methods=['GET'])
@@ -65,22 +54,22 @@ def listar_productos():
 def listar_todos_productos():
     """Listar todos los productos activos sin paginación (para selectores)"""
     try:
-        productos = Producto.query.filter_by(activo=True).order_by(Producto.nombre).all()
+        productos = db.session.query(*columnas(
+            id=Producto.id,
+            codigo=Producto.codigo,
+            nombre=Producto.nombre,
+            precio_venta=monto(Producto.precio_venta),
+            unidad_medida=Producto.unidad_medida,
+            stock_actual=Producto.stock_actual
+        )).filter(Producto.activo == True).order_by(Producto.nombre).all()
         
         return jsonify({
-            'productos': [{
-                'id': p.id,
-                'codigo': p.codigo,
-                'nombre': p.nombre,
-                'precio_venta': float(p.precio_venta),
-                'unidad_medida': p.unidad_medida,
-                'stock_actual': p.stock_actual
-            } for p in productos],
+            'productos': a_diccionarios(productos),
             'total': len(productos)
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al listar productos: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al listar productos')
 
 
 @productos_bp.route('/<int:id>', methods=['GET'])
@@ -88,27 +77,19 @@ def listar_todos_productos():
 def obtener_producto(id):
     """Obtener un producto por ID"""
     try:
-        producto = Producto.query.get(id)
+        producto = db.session.get(Producto, id)
         
         if not producto:
             return jsonify({'error': 'Producto no encontrado'}), 404
         
-        # Obtener estadísticas de ventas
-        ventas = db.session.query(
-            db.func.sum(DetallePedido.cantidad).label('total_vendido'),
-            db.func.count(DetallePedido.id).label('veces_vendido')
-        ).filter(DetallePedido.producto_id == id).first()
-        
+        # Obtener estadísticas de ventas (incluye pedidos archivados)
         return jsonify({
             'producto': producto.to_dict(),
-            'estadisticas': {
-                'total_vendido': float(ventas.total_vendido) if ventas.total_vendido else 0,
-                'veces_vendido': ventas.veces_vendido if ventas.veces_vendido else 0
-            }
+            'estadisticas': ventas_producto(id)
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al obtener producto: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al obtener producto')
 
 
 @productos_bp.route('/', methods=['POST'])
@@ -173,9 +154,9 @@ def crear_producto():
             'producto': nuevo_producto.to_dict()
         }), 201
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al crear producto: {str(e)}'}), 500
+        return error_interno('Error al crear producto')
 
 
 @productos_bp.route('/<int:id>', methods=['PUT'])
@@ -183,7 +164,7 @@ def crear_producto():
 def actualizar_producto(id):
     """Actualizar un producto"""
     try:
-        producto = Producto.query.get(id)
+        producto = db.session.get(Producto, id)
         
         if not producto:
             return jsonify({'error': 'Producto no encontrado'}), 404
@@ -251,9 +232,9 @@ def actualizar_producto(id):
             'producto': producto.to_dict()
         }), 200
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al actualizar producto: {str(e)}'}), 500
+        return error_interno('Error al actualizar producto')
 
 
 @productos_bp.route('/<int:id>/ajustar-stock', methods=['PATCH'])
@@ -261,7 +242,7 @@ def actualizar_producto(id):
 def ajustar_stock(id):
     """Ajustar stock de un producto (sumar o restar)"""
     try:
-        producto = Producto.query.get(id)
+        producto = db.session.get(Producto, id)
         
         if not producto:
             return jsonify({'error': 'Producto no encontrado'}), 404
@@ -308,9 +289,9 @@ def ajustar_stock(id):
             'diferencia': cantidad
         }), 200
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al ajustar stock: {str(e)}'}), 500
+        return error_interno('Error al ajustar stock')
 
 
 @productos_bp.route('/<int:id>/toggle-activo', methods=['PATCH'])
@@ -318,7 +299,7 @@ def ajustar_stock(id):
 def toggle_activo_producto(id):
     """Activar/Desactivar un producto"""
     try:
-        producto = Producto.query.get(id)
+        producto = db.session.get(Producto, id)
         
         if not producto:
             return jsonify({'error': 'Producto no encontrado'}), 404
@@ -333,9 +314,9 @@ def toggle_activo_producto(id):
             'producto': producto.to_dict()
         }), 200
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al cambiar estado: {str(e)}'}), 500
+        return error_interno('Error al cambiar estado')
 
 
 @productos_bp.route('/<int:id>', methods=['DELETE'])
@@ -343,17 +324,18 @@ def toggle_activo_producto(id):
 def eliminar_producto(id):
     """Eliminar un producto"""
     try:
-        producto = Producto.query.get(id)
+        producto = db.session.get(Producto, id)
         
         if not producto:
             return jsonify({'error': 'Producto no encontrado'}), 404
         
-        # Verificar si tiene detalles de pedidos
-        if len(producto.detalle_pedidos) > 0:
+        # Verificar si tiene detalles de pedidos (también archivados, que no tienen clave foránea)
+        lineas = ventas_producto(id)['veces_vendido']
+        if lineas > 0:
             return jsonify({
                 'error': 'No se puede eliminar el producto porque está en pedidos registrados',
                 'sugerencia': 'Considere desactivar el producto en lugar de eliminarlo',
-                'pedidos_relacionados': len(producto.detalle_pedidos)
+                'pedidos_relacionados': lineas
             }), 400
         
         db.session.delete(producto)
@@ -363,9 +345,9 @@ def eliminar_producto(id):
             'mensaje': 'Producto eliminado exitosamente'
         }), 200
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al eliminar producto: {str(e)}'}), 500
+        return error_interno('Error al eliminar producto')
 
 
 @productos_bp.route('/stock-bajo', methods=['GET'])
@@ -386,12 +368,13 @@ def productos_stock_bajo():
             'total': len(productos_bajo)
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al obtener productos con stock bajo: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al obtener productos con stock bajo')
 
 
 @productos_bp.route('/unidades-medida', methods=['GET'])
 @login_required
+@cached(tags=['productos'], ttl=300)
 def listar_unidades_medida():
     """Listar unidades de medida disponibles"""
     try:
@@ -401,42 +384,41 @@ def listar_unidades_medida():
             'unidades_medida': unidades
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al listar unidades: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al listar unidades')
 
 
 @productos_bp.route('/mas-vendidos', methods=['GET'])
 @login_required
+@cached(tags=['productos', 'pedidos'], ttl=120)
+@lectura_replica
 def productos_mas_vendidos():
     """Listar los productos más vendidos"""
     try:
         limite = request.args.get('limite', 10, type=int)
         
-        productos_vendidos = db.session.query(
-            Producto,
-            db.func.sum(DetallePedido.cantidad).label('total_vendido')
-        ).join(
-            DetallePedido, Producto.id == DetallePedido.producto_id
-        ).group_by(
-            Producto.id
-        ).order_by(
-            db.desc('total_vendido')
-        ).limit(limite).all()
+        # Ranking sobre pedidos activos y archivados; después los productos en una consulta
+        ranking = ranking_productos_vendidos(limite)
+        productos = productos_por_id(producto_id for producto_id, _ in ranking)
+        
+        productos_vendidos = [{
+            **productos[producto_id].to_dict(),
+            'total_vendido': total
+        } for producto_id, total in ranking if producto_id in productos]
         
         return jsonify({
-            'productos': [{
-                **producto.to_dict(),
-                'total_vendido': float(total)
-            } for producto, total in productos_vendidos],
+            'productos': productos_vendidos,
             'total': len(productos_vendidos)
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al obtener productos más vendidos: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al obtener productos más vendidos')
     
 
 @productos_bp.route('/estadisticas', methods=['GET'])
 @login_required
+@cached(tags=['productos'], ttl=60)
+@lectura_replica
 def estadisticas_productos():
     """Obtener estadísticas de productos"""
     try:
@@ -452,5 +434,94 @@ def estadisticas_productos():
             'stock_bajo': productos_stock_bajo
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al obtener estadísticas: {str(e)}'}), 500
\ No newline at end of file
+    except Exception:
+        return error_interno('Error al obtener estadísticas')
+
+
+@productos_bp.route('/sugerencias-reposicion', methods=['GET'])
+@login_required
+def sugerencias_reposicion():
+    """Sugerencias de stock mínimo y cantidad a reponer según el pronóstico de demanda"""
+    # numpy se importa al usar el pronóstico, no al arrancar el worker
+    from app.utils.pronostico import recalcular_sugerencias, cantidad_reposicion
+    
+    try:
+        solo_reposicion = request.args.get('solo_reposicion', 'false').lower() == 'true'
+        dias_cobertura = request.args.get('dias_cobertura', current_app.config['PRONOSTICO_DIAS_COBERTURA'], type=int)
+        
+        # El cálculo corre de noche (flask jobs pronosticos); solo se hace aquí la primera vez
+        if db.session.query(SugerenciaReposicion.producto_id).first() is None:
+            recalcular_sugerencias()
+        
+        filas = db.session.query(Producto, SugerenciaReposicion).join(
+            SugerenciaReposicion, SugerenciaReposicion.producto_id == Producto.id
+        ).filter(Producto.activo == True).order_by(Producto.nombre).all()
+        
+        sugerencias = []
+        for producto, sugerencia in filas:
+            demanda = float(sugerencia.demanda_diaria)
+            cantidad = cantidad_reposicion(
+                producto.stock_actual, sugerencia.stock_minimo_sugerido, demanda, dias_cobertura
+            )
+            
+            if solo_reposicion and cantidad == 0:
+                continue
+            
+            sugerencias.append({
+                'producto_id': producto.id,
+                'codigo': producto.codigo,
+                'nombre': producto.nombre,
+                'unidad_medida': producto.unidad_medida,
+                'stock_actual': producto.stock_actual,
+                'stock_minimo': producto.stock_minimo,
+                'stock_minimo_sugerido': sugerencia.stock_minimo_sugerido,
+                'demanda_diaria': demanda,
+                'promedio_movil': float(sugerencia.promedio_movil),
+                'desviacion': float(sugerencia.desviacion),
+                'dias_cobertura_actual': round(producto.stock_actual / demanda, 1) if demanda > 0 else None,
+                'cantidad_reposicion': cantidad
+            })
+        
+        return jsonify({
+            'sugerencias': sugerencias,
+            'total': len(sugerencias),
+            'dias_cobertura': dias_cobertura,
+            'fecha_calculo': filas[0][1].fecha_calculo.strftime('%d/%m/%Y %H:%M') if filas else None
+        }), 200
+        
+    except Exception:
+        db.session.rollback()
+        return error_interno('Error al obtener sugerencias de reposición')
+
+
+@productos_bp.route('/sugerencias-reposicion/aplicar', methods=['POST'])
+@login_required
+def aplicar_sugerencias_reposicion():
+    """Actualizar el stock mínimo de los productos con el valor sugerido"""
+    try:
+        data = request.get_json(silent=True) or {}
+        producto_ids = data.get('producto_ids')
+        
+        sql = """
+            UPDATE productos p
+            SET stock_minimo = s.stock_minimo_sugerido
+            FROM sugerencias_reposicion s
+            WHERE s.producto_id = p.id
+        """
+        params = {}
+        
+        if producto_ids:
+            sql += " AND p.id = ANY(:producto_ids)"
+            params['producto_ids'] = [int(pid) for pid in producto_ids]
+        
+        resultado = db.session.execute(text(sql), params)
+        db.session.commit()
+        
+        return jsonify({
+            'mensaje': 'Stock mínimo actualizado exitosamente',
+            'productos_actualizados': resultado.rowcount
+        }), 200
+        
+    except Exception:
+        db.session.rollback()
+        return error_interno('Error al aplicar sugerencias')
@@ -0,0 +1,120 @@
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from flask import Blueprint, jsonify, current_app
+from sqlalchemy import text
+from app.database import db
+from app.utils.decorators import admin_required
+from app.utils.cache import cache, cache_compartido, cache_pdf, cache_respuestas
+
+salud_bp = Blueprint('salud', __name__)
+
+# Los pings corren en un hilo aparte para no esperar más de SALUD_TIEMPO_MAXIMO
+# aunque el pool esté agotado (el checkout espera hasta pool_timeout)
+_executor_ping = ThreadPoolExecutor(max_workers=2, thread_name_prefix='ping')
+
+
+def _nombre_bind(clave):
+    return 'primaria' if clave is None else clave
+
+
+def _ping(engine, timeout_ms):
+    """SELECT 1 con statement_timeout acotado a la transacción"""
+    with engine.begin() as conexion:
+        conexion.execute(text(f'SET LOCAL statement_timeout = {int(timeout_ms)}'))
+        conexion.execute(text('SELECT 1'))
+
+
+def _directorio_sesiones():
+    return current_app.config.get('SESSION_FILE_DIR') or os.path.join(os.getcwd(), 'flask_session')
+
+
+def _estado_pool(engine):
+    """Conexiones del pool de un engine (QueuePool; otros pools informan solo su estado)"""
+    pool = engine.pool
+    if not hasattr(pool, 'checkedout'):
+        return {'tipo': type(pool).__name__, 'estado': pool.status()}
+
+    return {
+        'tipo': type(pool).__name__,
+        'tamano': pool.size(),
+        'en_uso': pool.checkedout(),
+        'libres': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+        'overflow_maximo': getattr(pool, '_max_overflow', None),
+        'timeout': getattr(pool, '_timeout', None)
+    }
+
+
+def _estado_sesiones():
+    """Almacén de sesiones en archivos: directorio, si se puede escribir y cuántas hay"""
+    directorio = _directorio_sesiones()
+    if not os.path.isdir(directorio):
+        return {'tipo': current_app.config['SESSION_TYPE'], 'directorio': directorio, 'existe': False}
+
+    with os.scandir(directorio) as entradas:
+        archivos = sum(1 for entrada in entradas if not entrada.name.startswith('__wz_cache'))
+    return {
+        'tipo': current_app.config['SESSION_TYPE'],
+        'directorio': directorio,
+        'existe': True,
+        'escribible': os.access(directorio, os.W_OK),
+        'archivos': archivos,
+        'disco_libre_mb': shutil.disk_usage(directorio).free // (1024 * 1024)
+    }
+
+
+@salud_bp.route('/_health', methods=['GET'])
+def health():
+    """Liveness: el proceso responde (no consulta la base de datos)"""
+    return jsonify({'estado': 'ok'}), 200
+
+
+@salud_bp.route('/_ready', methods=['GET'])
+def ready():
+    """Readiness: ping a cada base de datos con tiempo máximo y sesiones escribibles"""
+    tiempo_maximo = current_app.config['SALUD_TIEMPO_MAXIMO']
+    pings = {
+        _nombre_bind(clave): _executor_ping.submit(_ping, engine, tiempo_maximo * 1000)
+        for clave, engine in db.engines.items()
+    }
+
+    limite = time.monotonic() + tiempo_maximo
+    comprobaciones = {}
+    for nombre, futuro in pings.items():
+        try:
+            futuro.result(timeout=max(limite - time.monotonic(), 0))
+            comprobaciones[nombre] = 'ok'
+        except TimeoutError:
+            comprobaciones[nombre] = 'tiempo agotado'
+        except Exception as e:
+            comprobaciones[nombre] = f'error: {type(e).__name__}'
+
+    directorio = _directorio_sesiones()
+    comprobaciones['sesiones'] = 'ok' if os.access(directorio, os.W_OK) else 'sin acceso de escritura'
+
+    listo = all(estado == 'ok' for estado in comprobaciones.values())
+    return jsonify({
+        'estado': 'ok' if listo else 'no disponible',
+        'comprobaciones': comprobaciones
+    }), 200 if listo else 503
+
+
+@salud_bp.route('/_pool', methods=['GET'])
+@admin_required
+def pool():
+    """Conexiones de SQLAlchemy, almacén de sesiones y cachés de este proceso"""
+    return jsonify({
+        'pid': os.getpid(),
+        'pools': {_nombre_bind(clave): _estado_pool(engine) for clave, engine in db.engines.items()},
+        'sesiones': _estado_sesiones(),
+        'caches': {
+            'respuestas': cache_respuestas.estadisticas(),
+            'respuestas_local': cache_respuestas.local.estadisticas(),
+            'memoria': cache.estadisticas(),
+            'datos': cache_compartido.estadisticas(),
+            'pdf': cache_pdf.estadisticas()
+        }
+    }), 200
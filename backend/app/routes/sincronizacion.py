@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+
+from flask import Blueprint, request, jsonify, session, current_app
+from sqlalchemy.exc import IntegrityError
+from app.database import db
+from app.models.idempotencia import ClaveIdempotencia
+from app.routes.pedidos import registrar_pedido, invalidar_caches_fecha
+from app.routes.devoluciones import registrar_devolucion
+from app.utils.decorators import login_required
+from app.utils.cache import invalidacion_por_escritura
+from app.utils.errores import ErrorValidacion, error_interno
+
+logger = logging.getLogger(__name__)
+
+sincronizacion_bp = Blueprint('sincronizacion', __name__)
+sincronizacion_bp.after_request(invalidacion_por_escritura('pedidos', 'devoluciones', 'productos'))
+
+MAXIMO_OPERACIONES = 50
+
+
+def _crear_pedido(datos, usuario_id):
+    pedido = registrar_pedido(datos, usuario_id, validar_stock=True)
+    return pedido, {'mensaje': 'Pedido creado exitosamente', 'pedido': pedido.to_dict(include_detalles=True)}
+
+
+def _crear_devolucion(datos, usuario_id):
+    devolucion = registrar_devolucion(datos, usuario_id)
+    return None, {'mensaje': 'Devolución registrada exitosamente', 'devolucion': devolucion.to_dict(include_detalles=True)}
+
+
+# tipo de operación -> (endpoint equivalente, función que la aplica)
+# El endpoint es el mismo que registra @idempotente: si el POST directo llegó al
+# servidor antes de perder la conexión, la operación encolada no se repite
+OPERACIONES = {
+    'pedido': ('pedidos.crear_pedido', _crear_pedido),
+    'devolucion': ('devoluciones.crear_devolucion', _crear_devolucion)
+}
+
+
+def _resultado_existente(existente, endpoint, hash_peticion):
+    """Resultado de una operación cuya clave ya estaba registrada"""
+    if existente.endpoint != endpoint or existente.hash_peticion != hash_peticion:
+        return {'estado': 'conflicto', 'error': 'Clave ya usada con otra petición'}
+    if existente.codigo_estado is None:
+        return {'estado': 'en_proceso'}
+    return {'estado': 'aplicada', 'respuesta': json.loads(existente.respuesta)}
+
+
+@sincronizacion_bp.route('/', methods=['POST'])
+@login_required
+def sincronizar():
+    """
+    Aplicar las operaciones tomadas sin conexión (cola del frontend) en una sola
+    transacción. Cada operación trae la clave UUID generada en el cliente y el
+    cuerpo tal como se habría enviado al endpoint de creación; las que fallan
+    (stock insuficiente, producto desactivado...) se reportan como conflicto sin
+    afectar a las demás
+    """
+    try:
+        user_id = session.get('user_id')
+        data = request.get_json()
+
+        if not data or not isinstance(data.get('operaciones'), list):
+            return jsonify({'error': 'Se requiere la lista de operaciones'}), 400
+
+        operaciones = data['operaciones']
+        if len(operaciones) > MAXIMO_OPERACIONES:
+            return jsonify({'error': f'Máximo {MAXIMO_OPERACIONES} operaciones por lote'}), 400
+
+        resultados = []
+        fechas_pedidos = set()
+
+        for operacion in operaciones:
+            clave = str(operacion.get('clave') or '').strip()
+            tipo = operacion.get('tipo')
+            cuerpo = operacion.get('cuerpo')
+
+            if not clave or len(clave) > 100 or tipo not in OPERACIONES or not isinstance(cuerpo, str):
+                resultados.append({'clave': clave, 'estado': 'invalida',
+                                   'error': 'Se requieren clave, tipo (pedido o devolucion) y cuerpo'})
+                continue
+
+            try:
+                datos = json.loads(cuerpo)
+            except ValueError:
+                resultados.append({'clave': clave, 'estado': 'invalida', 'error': 'El cuerpo no es JSON válido'})
+                continue
+
+            if not isinstance(datos, dict):
+                resultados.append({'clave': clave, 'estado': 'invalida', 'error': 'El cuerpo debe ser un objeto JSON'})
+                continue
+
+            endpoint, aplicar = OPERACIONES[tipo]
+            hash_peticion = hashlib.sha256(cuerpo.encode('utf-8')).hexdigest()
+
+            # Una reserva sin respuesta de la misma petición se intenta tomar abajo
+            # (si quedó abandonada); si no, se informa como en proceso
+            existente = db.session.get(ClaveIdempotencia, (user_id, clave))
+            if existente and (existente.codigo_estado is not None or existente.endpoint != endpoint
+                              or existente.hash_peticion != hash_peticion):
+                resultados.append({'clave': clave, **_resultado_existente(existente, endpoint, hash_peticion)})
+                continue
+
+            # Punto de guardado por operación: un conflicto deshace solo esa operación
+            punto = db.session.begin_nested()
+            try:
+                pedido, respuesta = aplicar(datos, user_id)
+                if not ClaveIdempotencia.registrar(user_id, clave, endpoint, hash_peticion,
+                                                   201, current_app.json.dumps(respuesta)):
+                    # La petición original sigue en curso en otro worker
+                    punto.rollback()
+                    resultados.append({'clave': clave, 'estado': 'en_proceso'})
+                    continue
+                punto.commit()
+            except ErrorValidacion as e:
+                punto.rollback()
+                resultados.append({'clave': clave, 'estado': 'conflicto', 'codigo': e.codigo, **e.to_dict()})
+                continue
+            except IntegrityError:
+                # La misma clave (o el mismo número correlativo) se registró en
+                # paralelo desde otra petición: el cliente reintenta más tarde
+                punto.rollback()
+                resultados.append({'clave': clave, 'estado': 'en_proceso'})
+                continue
+            except Exception:
+                # Un cuerpo que el endpoint directo rechazaría con 500 (fecha mal
+                # formada, cantidad no numérica...) no debe tumbar el lote entero
+                punto.rollback()
+                logger.exception('Operación de sincronización inválida', extra={'clave': clave, 'tipo': tipo})
+                resultados.append({'clave': clave, 'estado': 'invalida', 'error': 'No se pudo aplicar la operación'})
+                continue
+
+            if pedido:
+                fechas_pedidos.add(pedido.fecha_pedido.date())
+            resultados.append({'clave': clave, 'estado': 'aplicada', 'respuesta': respuesta})
+
+        db.session.commit()
+        for fecha in fechas_pedidos:
+            invalidar_caches_fecha(fecha)
+
+        return jsonify({
+            'resultados': resultados,
+            'aplicadas': sum(1 for r in resultados if r['estado'] == 'aplicada'),
+            'conflictos': sum(1 for r in resultados if r['estado'] in ('conflicto', 'invalida'))
+        }), 200
+
+    except Exception:
+        db.session.rollback()
+        return error_interno('Error al sincronizar operaciones')
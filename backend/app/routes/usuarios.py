@@ -2,6 +2,9 @@ from flask import Blueprint, request, jsonify, session
 from app.database import db
 from app.models.usuario import Usuario
 from app.utils.decorators import login_required, admin_required
+from app.utils.contrasenas import HashSaturado
+from app.utils.limites import por_pagina
+from app.utils.errores import error_interno
 
 usuarios_bp = Blueprint('usuarios', __name__)
 
@@ -11,7 +14,7 @@ def listar_usuarios():
     """Listar todos los usuarios (solo administradores)"""
     try:
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        per_page = por_pagina()
         activo = request.args.get('activo')
         rol = request.args.get('rol')
         buscar = request.args.get('buscar', '').strip()
@@ -54,8 +57,8 @@ def listar_usuarios():
             'por_pagina': per_page
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al listar usuarios: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al listar usuarios')
 
 
 @usuarios_bp.route('/<int:id>', methods=['GET'])
@@ -72,8 +75,8 @@ def obtener_usuario(id):
             'usuario': usuario.to_dict()
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al obtener usuario: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al obtener usuario')
 
 
 @usuarios_bp.route('/', methods=['POST'])
@@ -120,9 +123,13 @@ def crear_usuario():
             'usuario': nuevo_usuario.to_dict()
         }), 201
         
-    except Exception as e:
+    except HashSaturado:
+        # 503 con Retry-After (manejador de la app), no un error interno
         db.session.rollback()
-        return jsonify({'error': f'Error al crear usuario: {str(e)}'}), 500
+        raise
+    except Exception:
+        db.session.rollback()
+        return error_interno('Error al crear usuario')
 
 
 @usuarios_bp.route('/<int:id>', methods=['PUT'])
@@ -186,9 +193,13 @@ def actualizar_usuario(id):
             'usuario': usuario.to_dict()
         }), 200
         
-    except Exception as e:
+    except HashSaturado:
+        # 503 con Retry-After (manejador de la app), no un error interno
+        db.session.rollback()
+        raise
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al actualizar usuario: {str(e)}'}), 500
+        return error_interno('Error al actualizar usuario')
 
 
 @usuarios_bp.route('/<int:id>/toggle-activo', methods=['PATCH'])
@@ -222,9 +233,9 @@ def toggle_activo(id):
             'usuario': usuario.to_dict()
         }), 200
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al cambiar estado del usuario: {str(e)}'}), 500
+        return error_interno('Error al cambiar estado del usuario')
 
 
 @usuarios_bp.route('/<int:id>', methods=['DELETE'])
@@ -268,9 +279,9 @@ def eliminar_usuario(id):
             'mensaje': 'Usuario eliminado exitosamente'
         }), 200
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al eliminar usuario: {str(e)}'}), 500
+        return error_interno('Error al eliminar usuario')
 
 
 @usuarios_bp.route('/cambiar-password', methods=['PATCH'])
@@ -309,9 +320,13 @@ def cambiar_password():
             'mensaje': 'Contraseña cambiada exitosamente'
         }), 200
         
-    except Exception as e:
+    except HashSaturado:
+        # 503 con Retry-After (manejador de la app), no un error interno
+        db.session.rollback()
+        raise
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al cambiar contraseña: {str(e)}'}), 500
+        return error_interno('Error al cambiar contraseña')
 
 
 @usuarios_bp.route('/perfil', methods=['PUT'])
@@ -353,9 +368,9 @@ def actualizar_perfil():
             'usuario': usuario.to_dict()
         }), 200
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'error': f'Error al actualizar perfil: {str(e)}'}), 500
+        return error_interno('Error al actualizar perfil')
 
 
 @usuarios_bp.route('/roles', methods=['GET'])
@@ -372,8 +387,8 @@ def listar_roles():
             'roles': roles
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al listar roles: {str(e)}'}), 500
+    except Exception:
+        return error_interno('Error al listar roles')
 
 
 @usuarios_bp.route('/estadisticas', methods=['GET'])
@@ -395,5 +410,5 @@ def estadisticas_usuarios():
             'vendedores': total_vendedores
         }), 200
         
-    except Exception as e:
-        return jsonify({'error': f'Error al obtener estadísticas: {str(e)}'}), 500
\ No newline at end of file
+    except Exception:
+        return error_interno('Error al obtener estadísticas')
\ No newline at end of file
@@ -0,0 +1,309 @@
+from datetime import timedelta
+from sqlalchemy import text
+from app.database import db
+from app.models.venta_diaria import VentaDiaria
+
+# Recencia, frecuencia y monto por cliente con puntajes NTILE, ranking y
+# variación mes a mes (LAG sobre una grilla de dos meses por cliente)
+SQL_RFM = text("""
+    WITH base AS (
+        SELECT
+            cliente_id,
+            MAX(fecha_pedido) AS ultima_compra,
+            COUNT(*) AS frecuencia,
+            SUM(total) AS monetario
+        FROM pedidos_historicos
+        WHERE estado <> 'cancelado' AND fecha_pedido >= :desde
+        GROUP BY cliente_id
+    ),
+    mensual AS (
+        SELECT cliente_id, DATE_TRUNC('month', fecha_pedido) AS mes, SUM(total) AS monto
+        FROM pedidos_historicos
+        WHERE estado <> 'cancelado' AND fecha_pedido >= :mes_anterior
+        GROUP BY cliente_id, DATE_TRUNC('month', fecha_pedido)
+    ),
+    grilla AS (
+        SELECT b.cliente_id, m.mes, COALESCE(me.monto, 0) AS monto
+        FROM base b
+        CROSS JOIN (VALUES (CAST(:mes_anterior AS timestamp)), (CAST(:mes_actual AS timestamp))) AS m(mes)
+        LEFT JOIN mensual me ON me.cliente_id = b.cliente_id AND me.mes = m.mes
+    ),
+    variacion AS (
+        SELECT
+            cliente_id,
+            mes,
+            monto AS monto_mes_actual,
+            LAG(monto) OVER (PARTITION BY cliente_id ORDER BY mes) AS monto_mes_anterior
+        FROM grilla
+    ),
+    puntajes AS (
+        SELECT
+            b.*,
+            NTILE(5) OVER (ORDER BY b.ultima_compra) AS puntaje_r,
+            NTILE(5) OVER (ORDER BY b.frecuencia) AS puntaje_f,
+            NTILE(5) OVER (ORDER BY b.monetario) AS puntaje_m,
+            RANK() OVER (ORDER BY b.monetario DESC) AS ranking,
+            SUM(b.monetario) OVER () AS monetario_total
+        FROM base b
+    )
+    SELECT
+        p.cliente_id,
+        c.nombre AS cliente_nombre,
+        c.zona,
+        p.ultima_compra,
+        p.frecuencia,
+        p.monetario,
+        p.puntaje_r,
+        p.puntaje_f,
+        p.puntaje_m,
+        p.ranking,
+        p.monetario_total,
+        v.monto_mes_actual,
+        v.monto_mes_anterior
+    FROM puntajes p
+    JOIN clientes c ON c.id = p.cliente_id
+    JOIN variacion v ON v.cliente_id = p.cliente_id AND v.mes = CAST(:mes_actual AS timestamp)
+    ORDER BY p.ranking, p.cliente_id
+""")
+
+SEGMENTOS = ['campeon', 'leal', 'nuevo', 'en_riesgo', 'perdido', 'regular']
+
+
+def segmento_rfm(r, f, m):
+    """Clasificar a un cliente según sus puntajes RFM (1 a 5)"""
+    if r >= 4 and f >= 4:
+        return 'campeon'
+    if r <= 2 and f >= 3:
+        return 'en_riesgo'
+    if r <= 1:
+        return 'perdido'
+    if f >= 4:
+        return 'leal'
+    if r >= 4 and f <= 2:
+        return 'nuevo'
+    return 'regular'
+
+
+def _inicio_mes(fecha):
+    return fecha.replace(day=1)
+
+
+def calcular_rfm(hoy, meses=12):
+    """
+    Calcular la analítica RFM de todos los clientes con pedidos en el periodo
+
+    Args:
+        hoy: Fecha de referencia
+        meses: Meses de historial considerados
+
+    Returns:
+        Lista de diccionarios ordenada por ranking
+    """
+    mes_actual = _inicio_mes(hoy)
+    mes_anterior = _inicio_mes(mes_actual - timedelta(days=1))
+
+    filas = db.session.execute(SQL_RFM, {
+        'desde': hoy - timedelta(days=meses * 30),
+        'mes_actual': mes_actual,
+        'mes_anterior': mes_anterior
+    }).mappings().all()
+
+    resultado = []
+    for fila in filas:
+        monetario = float(fila['monetario'])
+        monetario_total = float(fila['monetario_total']) or 1
+        actual = float(fila['monto_mes_actual'])
+        anterior = float(fila['monto_mes_anterior'] or 0)
+
+        resultado.append({
+            'cliente_id': fila['cliente_id'],
+            'cliente_nombre': fila['cliente_nombre'],
+            'zona': fila['zona'],
+            'ultima_compra': fila['ultima_compra'].strftime('%d/%m/%Y'),
+            'recencia_dias': (hoy - fila['ultima_compra'].date()).days,
+            'frecuencia': fila['frecuencia'],
+            'monetario': monetario,
+            'puntaje_r': fila['puntaje_r'],
+            'puntaje_f': fila['puntaje_f'],
+            'puntaje_m': fila['puntaje_m'],
+            'puntaje_rfm': f"{fila['puntaje_r']}{fila['puntaje_f']}{fila['puntaje_m']}",
+            'segmento': segmento_rfm(fila['puntaje_r'], fila['puntaje_f'], fila['puntaje_m']),
+            'ranking': fila['ranking'],
+            'participacion': round(monetario * 100 / monetario_total, 2),
+            'monto_mes_actual': actual,
+            'monto_mes_anterior': anterior,
+            'variacion_mensual': round((actual - anterior) * 100 / anterior, 2) if anterior else None
+        })
+
+    return resultado
+
+
+# Totales y cantidades vendidas por periodo en una sola consulta (incluye pedidos archivados).
+# El total de cada pedido ya resta su descuento: se suma una vez por pedido
+# (TOTAL_PEDIDO) o, con filtro de producto, repartido entre sus líneas en
+# proporción al subtotal (TOTAL_PRORRATEADO), así la serie coincide con los
+# totales de los pedidos y con total_vendido de /estadisticas
+SQL_SERIE = """
+    WITH por_pedido AS (
+        SELECT l.pedido_id, l.fecha_pedido, {total} AS total, SUM(l.cantidad) AS cantidad
+        FROM lineas_pedidos_historicas l
+        WHERE l.estado <> 'cancelado'
+          AND l.fecha_pedido >= :desde
+          AND l.fecha_pedido < :hasta
+          {filtros}
+        GROUP BY l.pedido_id, l.fecha_pedido
+    )
+    SELECT
+        DATE_TRUNC(:granularidad, fecha_pedido) AS periodo,
+        COUNT(*) AS pedidos,
+        SUM(total) AS total,
+        SUM(cantidad) AS cantidad
+    FROM por_pedido
+    GROUP BY periodo
+    ORDER BY periodo
+"""
+
+TOTAL_PEDIDO = 'MAX(l.pedido_total)'
+TOTAL_PRORRATEADO = 'ROUND(COALESCE(SUM(l.subtotal * l.pedido_total / NULLIF(l.pedido_subtotal, 0)), 0), 2)'
+
+# Misma serie leída de los totales diarios precalculados (sin filtros)
+SQL_SERIE_DIARIA = text("""
+    SELECT
+        DATE_TRUNC(:granularidad, CAST(dia AS timestamp)) AS periodo,
+        SUM(pedidos) AS pedidos,
+        SUM(total) AS total,
+        SUM(cantidad) AS cantidad
+    FROM ventas_diarias
+    WHERE dia >= :desde AND dia < :hasta
+    GROUP BY periodo
+    ORDER BY periodo
+""")
+
+GRANULARIDADES = {'dia': 'day', 'semana': 'week', 'mes': 'month'}
+
+
+def inicio_periodo(fecha, granularidad):
+    """Truncar una fecha al inicio de su periodo (igual que DATE_TRUNC)"""
+    if granularidad == 'semana':
+        return fecha - timedelta(days=fecha.weekday())
+    if granularidad == 'mes':
+        return fecha.replace(day=1)
+    return fecha
+
+
+def siguiente_periodo(fecha, granularidad):
+    """Inicio del periodo siguiente"""
+    if granularidad == 'semana':
+        return fecha + timedelta(days=7)
+    if granularidad == 'mes':
+        return (fecha.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return fecha + timedelta(days=1)
+
+
+def serie_ventas(granularidad, desde, hasta, cliente_id=None, producto_id=None):
+    """
+    Serie de ventas por día, semana o mes con los periodos vacíos completados
+
+    Args:
+        granularidad: 'dia', 'semana' o 'mes'
+        desde: Fecha inicial (incluida)
+        hasta: Fecha final (incluida)
+        cliente_id: Filtrar por cliente (opcional)
+        producto_id: Filtrar por producto (opcional)
+
+    Returns:
+        Lista de periodos con pedidos, total y cantidad
+    """
+    filtros = []
+    params = {
+        'granularidad': GRANULARIDADES[granularidad],
+        'desde': desde,
+        'hasta': hasta + timedelta(days=1)
+    }
+
+    if cliente_id:
+        filtros.append('AND l.cliente_id = :cliente_id')
+        params['cliente_id'] = cliente_id
+
+    if producto_id:
+        filtros.append('AND l.producto_id = :producto_id')
+        params['producto_id'] = producto_id
+
+    if not filtros and VentaDiaria.materializado():
+        consulta = SQL_SERIE_DIARIA
+    else:
+        total = TOTAL_PRORRATEADO if producto_id else TOTAL_PEDIDO
+        consulta = text(SQL_SERIE.format(filtros=' '.join(filtros), total=total))
+
+    filas = db.session.execute(consulta, params).mappings().all()
+    por_periodo = {fila['periodo'].date(): fila for fila in filas}
+
+    serie = []
+    periodo = inicio_periodo(desde, granularidad)
+    while periodo <= hasta:
+        fila = por_periodo.get(periodo)
+        serie.append({
+            'periodo': periodo.strftime('%Y-%m-%d'),
+            'etiqueta': periodo.strftime('%m/%Y') if granularidad == 'mes' else periodo.strftime('%d/%m/%Y'),
+            'pedidos': fila['pedidos'] if fila else 0,
+            'total': float(fila['total']) if fila else 0.0,
+            'cantidad': float(fila['cantidad']) if fila else 0.0
+        })
+        periodo = siguiente_periodo(periodo, granularidad)
+
+    return serie
+
+
+# Pedidos por estado y total entregado en una sola consulta (incluye pedidos archivados)
+SQL_ESTADOS_PEDIDOS = """
+    SELECT
+        COUNT(*) AS total_pedidos,
+        COUNT(*) FILTER (WHERE estado = 'pendiente') AS pendientes,
+        COUNT(*) FILTER (WHERE estado = 'entregado') AS entregados,
+        COUNT(*) FILTER (WHERE estado = 'cancelado') AS cancelados,
+        COALESCE(SUM(total) FILTER (WHERE estado = 'entregado'), 0) AS total_vendido
+    FROM pedidos_historicos
+    WHERE TRUE {filtros}
+"""
+
+# Cantidad pedida por producto (incluye pedidos archivados)
+SQL_RANKING_PRODUCTOS = text("""
+    SELECT l.producto_id, SUM(l.cantidad) AS total_vendido
+    FROM lineas_pedidos_historicas l
+    GROUP BY l.producto_id
+    ORDER BY total_vendido DESC
+    LIMIT :limite
+""")
+
+
+def resumen_estados_pedidos(desde=None, hasta=None):
+    """
+    Cantidad de pedidos por estado y total vendido (entregados)
+
+    Args:
+        desde: Fecha inicial (incluida, opcional)
+        hasta: Fecha final (incluida, opcional)
+    """
+    filtros = []
+    params = {}
+
+    if desde:
+        filtros.append('AND fecha_pedido >= :desde')
+        params['desde'] = desde
+
+    if hasta:
+        filtros.append('AND fecha_pedido < :hasta')
+        params['hasta'] = hasta + timedelta(days=1)
+
+    fila = db.session.execute(
+        text(SQL_ESTADOS_PEDIDOS.format(filtros=' '.join(filtros))), params
+    ).mappings().one()
+    return {**fila, 'total_vendido': float(fila['total_vendido'])}
+
+
+def ranking_productos_vendidos(limite):
+    """Productos con más cantidad pedida como [(producto_id, total_vendido), ...]"""
+    return [
+        (fila.producto_id, float(fila.total_vendido))
+        for fila in db.session.execute(SQL_RANKING_PRODUCTOS, {'limite': limite})
+    ]
@@ -0,0 +1,236 @@
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request
+
+
+class _Estadisticas:
+    """Contadores de aciertos y fallos de obtener() en este proceso"""
+
+    aciertos = 0
+    fallos = 0
+
+    def _contar(self, valor):
+        if valor is None:
+            self.fallos += 1
+        else:
+            self.aciertos += 1
+        return valor
+
+    def estadisticas(self):
+        """Aciertos, fallos y proporción de aciertos desde que inició el proceso"""
+        total = self.aciertos + self.fallos
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'ratio_aciertos': round(self.aciertos / total, 3) if total else None
+        }
+
+
+class CacheMemoria(_Estadisticas):
+    """
+    Caché en memoria del proceso con expiración por entrada; con maximo se
+    comporta como LRU y descarta las entradas menos usadas
+    """
+
+    def __init__(self, maximo=None):
+        self.maximo = maximo
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        """Obtener un valor o None si no existe o expiró"""
+        with self._lock:
+            return self._contar(self._obtener(clave))
+
+    def _obtener(self, clave):
+        entrada = self._datos.get(clave)
+        if entrada is None:
+            return None
+
+        valor, expira = entrada
+        if expira is not None and expira < time.monotonic():
+            del self._datos[clave]
+            return None
+
+        self._datos.move_to_end(clave)
+        return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        """Guardar un valor; ttl en segundos (None = sin expiración)"""
+        expira = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._datos[clave] = (valor, expira)
+            self._datos.move_to_end(clave)
+            if self.maximo:
+                while len(self._datos) > self.maximo:
+                    self._datos.popitem(last=False)
+
+    def eliminar(self, clave):
+        """Eliminar una entrada"""
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def invalidar(self, predicado):
+        """Eliminar todas las entradas cuya clave cumpla el predicado"""
+        with self._lock:
+            claves = [clave for clave in self._datos if predicado(clave)]
+            for clave in claves:
+                del self._datos[clave]
+            return len(claves)
+
+    def limpiar(self):
+        """Vaciar la caché"""
+        with self._lock:
+            self._datos.clear()
+
+    def estadisticas(self):
+        return {**super().estadisticas(), 'entradas': len(self._datos)}
+
+
+class CacheArchivos(_Estadisticas):
+    """
+    Caché en archivos dentro de CACHE_DIR, compartida entre los workers y los
+    comandos de consola (flask jobs ...) que la precalculan
+    """
+
+    def __init__(self, subdirectorio):
+        self.subdirectorio = subdirectorio
+
+    def _directorio(self):
+        return os.path.join(current_app.config['CACHE_DIR'], self.subdirectorio)
+
+    def _ruta(self, clave):
+        nombre = hashlib.sha1(repr(clave).encode('utf-8')).hexdigest()
+        return os.path.join(self._directorio(), nombre)
+
+    def obtener(self, clave):
+        """Obtener un valor o None si no existe o expiró"""
+        return self._contar(self._obtener(clave))
+
+    def _obtener(self, clave):
+        try:
+            with open(self._ruta(clave), 'rb') as archivo:
+                valor, expira = pickle.load(archivo)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        if expira is not None and expira < time.time():
+            self.eliminar(clave)
+            return None
+
+        return valor
+
+    def contiene(self, clave):
+        """Indica si existe una entrada vigente para la clave"""
+        return self._obtener(clave) is not None
+
+    def guardar(self, clave, valor, ttl=None):
+        """Guardar un valor; ttl en segundos (None = sin expiración)"""
+        directorio = self._directorio()
+        os.makedirs(directorio, exist_ok=True)
+        expira = time.time() + ttl if ttl else None
+
+        # Escribir en un temporal y reemplazar para que nadie lea un archivo a medias
+        descriptor, temporal = tempfile.mkstemp(dir=directorio)
+        try:
+            with os.fdopen(descriptor, 'wb') as archivo:
+                pickle.dump((valor, expira), archivo, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporal, self._ruta(clave))
+        except Exception:
+            os.remove(temporal)
+            raise
+
+    def eliminar(self, clave):
+        """Eliminar una entrada"""
+        try:
+            os.remove(self._ruta(clave))
+        except FileNotFoundError:
+            pass
+
+    def limpiar(self):
+        """Vaciar la caché"""
+        shutil.rmtree(self._directorio(), ignore_errors=True)
+
+
+class CacheEtiquetas(_Estadisticas):
+    """
+    Caché de respuestas en dos niveles: LRU del proceso y caché compartida entre
+    workers (archivos en CACHE_DIR, o memoria si CACHE_RESPUESTAS_COMPARTIDA es
+    false, p. ej. en pruebas).
+
+    Cada etiqueta tiene una versión guardada en la caché compartida y las claves
+    incluyen las versiones de sus etiquetas: invalidar una etiqueta cambia su
+    versión y todas las entradas que dependen de ella dejan de encontrarse en
+    todos los procesos, sin recorrerlas.
+    """
+
+    def __init__(self):
+        self.local = CacheMemoria()
+        self.compartida = CacheMemoria()
+
+    def init_app(self, app):
+        """Crear los niveles según la configuración"""
+        self.local = CacheMemoria(maximo=app.config['CACHE_RESPUESTAS_MAXIMO'])
+        if app.config['CACHE_RESPUESTAS_COMPARTIDA']:
+            self.compartida = CacheArchivos('respuestas')
+        else:
+            self.compartida = CacheMemoria(maximo=app.config['CACHE_RESPUESTAS_MAXIMO'])
+
+    def versiones(self, etiquetas):
+        """Versión actual de cada etiqueta (0 si nunca se invalidó)"""
+        return tuple(self.compartida.obtener(('etiqueta', etiqueta)) or 0 for etiqueta in etiquetas)
+
+    def invalidar(self, *etiquetas):
+        """Invalidar todas las entradas que dependen de alguna de las etiquetas"""
+        version = time.time_ns()
+        for etiqueta in etiquetas:
+            self.compartida.guardar(('etiqueta', etiqueta), version)
+
+    def obtener(self, clave):
+        """Buscar primero en el proceso y después en la caché compartida"""
+        valor = self.local.obtener(clave)
+        if valor is None:
+            valor = self.compartida.obtener(clave)
+            if valor is not None:
+                self.local.guardar(clave, valor, ttl=max(valor['expira'] - time.time(), 1))
+        return self._contar(valor)
+
+    def guardar(self, clave, valor, ttl):
+        """Guardar en los dos niveles"""
+        self.local.guardar(clave, valor, ttl=ttl)
+        self.compartida.guardar(clave, valor, ttl=ttl)
+
+    def limpiar(self):
+        """Vaciar los dos niveles"""
+        self.local.limpiar()
+        self.compartida.limpiar()
+
+
+def invalidacion_por_escritura(*etiquetas):
+    """
+    Función after_request para un blueprint: cada escritura exitosa (POST, PUT,
+    PATCH, DELETE) invalida las etiquetas de las respuestas cacheadas que afecta
+    """
+    def invalidar(response):
+        if request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and response.status_code < 400:
+            cache_respuestas.invalidar(*etiquetas)
+        return response
+    return invalidar
+
+
+# Instancia compartida por todo el proceso
+cache = CacheMemoria()
+
+# Resultados precalculados por las tareas programadas y PDFs generados
+cache_compartido = CacheArchivos('datos')
+cache_pdf = CacheArchivos('pdf')
+
+# Respuestas de los endpoints de lectura con @cached (ver init_app)
+cache_respuestas = CacheEtiquetas()
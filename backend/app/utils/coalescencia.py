@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import defaultdict
+
+
+class _Llamada:
+    """Cálculo en curso que esperan las peticiones coalescidas"""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+class Coalescedor:
+    """
+    Single-flight: peticiones concurrentes con la misma clave esperan un único
+    cálculo y comparten su resultado (o su excepción).
+
+    Coalesce entre los hilos de un proceso; cada worker hace su propio cálculo.
+    """
+
+    def __init__(self, espera_maxima=60):
+        self.espera_maxima = espera_maxima
+        self._en_curso = {}
+        self._lock = threading.Lock()
+        self._metricas = defaultdict(lambda: {'ejecuciones': 0, 'coalescidas': 0, 'errores': 0,
+                                              'esperas_agotadas': 0, 'ms_calculo': 0})
+
+    def ejecutar(self, clave, funcion, *args, **kwargs):
+        """
+        Ejecutar funcion(*args, **kwargs) o esperar al cálculo en curso con la misma clave
+
+        Args:
+            clave: Tupla hashable; el primer elemento agrupa las métricas
+            funcion: Cálculo a compartir (su resultado no debe modificarse)
+
+        Returns:
+            Tupla (resultado, coalescida) donde coalescida indica si se reutilizó
+            el cálculo de otra petición
+        """
+        nombre = clave[0]
+        with self._lock:
+            llamada = self._en_curso.get(clave)
+            lider = llamada is None
+            if lider:
+                llamada = self._en_curso[clave] = _Llamada()
+            else:
+                self._metricas[nombre]['coalescidas'] += 1
+
+        if not lider:
+            if llamada.evento.wait(self.espera_maxima):
+                if llamada.error is not None:
+                    raise llamada.error
+                return llamada.resultado, True
+
+            # El cálculo original no terminó a tiempo: calcular por separado
+            with self._lock:
+                self._metricas[nombre]['esperas_agotadas'] += 1
+            return funcion(*args, **kwargs), False
+
+        inicio = time.perf_counter()
+        try:
+            llamada.resultado = funcion(*args, **kwargs)
+            return llamada.resultado, False
+        except Exception as e:
+            llamada.error = e
+            with self._lock:
+                self._metricas[nombre]['errores'] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._en_curso[clave]
+                self._metricas[nombre]['ejecuciones'] += 1
+                self._metricas[nombre]['ms_calculo'] += int((time.perf_counter() - inicio) * 1000)
+            llamada.evento.set()
+
+    def metricas(self):
+        """Contadores por nombre desde que inició el proceso"""
+        with self._lock:
+            return {
+                nombre: {
+                    **valores,
+                    'en_curso': sum(1 for clave in self._en_curso if clave[0] == nombre)
+                }
+                for nombre, valores in self._metricas.items()
+            }
+
+
+# Instancia compartida por todo el proceso
+coalescedor = Coalescedor()
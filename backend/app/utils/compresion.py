@@ -0,0 +1,55 @@
+import gzip
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # Brotli es opcional; sin él se usa solo gzip
+    brotli = None
+
+TIPOS_COMPRIMIBLES = {
+    'application/json',
+    'application/javascript',
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/csv',
+    'image/svg+xml'
+}
+
+
+def _codificaciones_disponibles():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def comprimir_respuesta(response):
+    """
+    Comprimir con brotli o gzip (según Accept-Encoding) las respuestas de texto
+    que superan COMPRESION_MINIMO_BYTES. Registrado con app.after_request
+    """
+    if (response.direct_passthrough
+            or response.is_streamed
+            or not 200 <= response.status_code < 300
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in TIPOS_COMPRIMIBLES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    config = current_app.config
+    if response.content_length is not None and response.content_length < config['COMPRESION_MINIMO_BYTES']:
+        return response
+
+    codificacion = request.accept_encodings.best_match(_codificaciones_disponibles())
+    if not codificacion:
+        return response
+
+    datos = response.get_data()
+    if codificacion == 'br':
+        comprimido = brotli.compress(datos, quality=config['COMPRESION_CALIDAD_BROTLI'])
+    else:
+        comprimido = gzip.compress(datos, compresslevel=config['COMPRESION_NIVEL_GZIP'])
+
+    response.set_data(comprimido)
+    response.headers['Content-Encoding'] = codificacion
+    return response
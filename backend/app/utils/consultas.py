@@ -0,0 +1,150 @@
+"""
+Consultas frecuentes de los listados con sentencias lambda (lambda_stmt).
+
+SQLAlchemy construye el SELECT de cada lambda una sola vez por línea de código y
+lo reutiliza junto con su SQL compilado: en las peticiones siguientes solo extrae
+los valores de las variables (filtros, página) como parámetros. Cada filtro
+opcional es una lambda aparte, así cada combinación de filtros tiene su propia
+entrada en la caché de sentencias.
+
+Dentro de las lambdas solo se referencian variables locales ya calculadas (el
+patrón de búsqueda, el offset): operar sobre ellas dentro de la lambda quedaría
+fijado en la primera ejecución.
+"""
+import math
+from collections import namedtuple
+
+from sqlalchemy import func, lambda_stmt, or_, select
+
+from app.database import db
+from app.models.cliente import Cliente
+from app.models.devolucion import Devolucion
+from app.models.pedido import Pedido
+from app.models.producto import Producto
+
+# Misma forma que el Pagination de Flask-SQLAlchemy que usaban las rutas
+Pagina = namedtuple('Pagina', ['items', 'total', 'pages'])
+
+
+def paginar(consulta, page, per_page, entidades=False):
+    """
+    Ejecutar una página de la consulta y el total de filas
+
+    Args:
+        consulta: Sentencia lambda ya ordenada
+        page: Número de página (desde 1)
+        per_page: Filas por página
+        entidades: True si la consulta selecciona un modelo (devuelve objetos
+            en lugar de filas por columnas)
+    """
+    offset = (max(page, 1) - 1) * per_page
+
+    total = db.session.execute(
+        consulta + (lambda s: select(func.count()).select_from(s.order_by(None).subquery()))
+    ).scalar()
+
+    pagina = consulta + (lambda s: s.limit(per_page).offset(offset))
+    items = db.session.scalars(pagina).all() if entidades else db.session.execute(pagina).all()
+
+    return Pagina(items, total, math.ceil(total / per_page) if total else 0)
+
+
+def _patron(buscar):
+    return f'%{buscar}%'
+
+
+def listado_pedidos(cliente_id=None, estado=None, desde=None, hasta=None, buscar=None):
+    """Listado por columnas de pedidos, más recientes primero"""
+    consulta = lambda_stmt(lambda: Pedido.consulta_listado().statement)
+
+    if cliente_id:
+        consulta += lambda s: s.where(Pedido.cliente_id == cliente_id)
+    if estado:
+        consulta += lambda s: s.where(Pedido.estado == estado)
+    if desde:
+        consulta += lambda s: s.where(Pedido.fecha_pedido >= desde)
+    if hasta:
+        consulta += lambda s: s.where(Pedido.fecha_pedido <= hasta)
+    if buscar:
+        patron = _patron(buscar)
+        consulta += lambda s: s.where(or_(
+            Pedido.numero_pedido.ilike(patron),
+            Cliente.nombre.ilike(patron)
+        ))
+
+    return consulta + (lambda s: s.order_by(Pedido.fecha_pedido.desc()))
+
+
+def listado_productos(activo=None, unidad_medida=None, stock_bajo=False, buscar=None):
+    """Listado por columnas de productos, por nombre"""
+    consulta = lambda_stmt(lambda: Producto.consulta_listado().statement)
+
+    if activo is not None:
+        consulta += lambda s: s.where(Producto.activo == activo)
+    if unidad_medida:
+        consulta += lambda s: s.where(Producto.unidad_medida == unidad_medida)
+    if stock_bajo:
+        consulta += lambda s: s.where(Producto.stock_actual <= Producto.stock_minimo)
+    if buscar:
+        patron = _patron(buscar)
+        consulta += lambda s: s.where(or_(
+            Producto.codigo.ilike(patron),
+            Producto.nombre.ilike(patron),
+            Producto.descripcion.ilike(patron)
+        ))
+
+    return consulta + (lambda s: s.order_by(Producto.nombre))
+
+
+def listado_clientes(activo=None, zona=None, ciudad=None, buscar=None):
+    """Listado por columnas de clientes, por nombre"""
+    consulta = lambda_stmt(lambda: Cliente.consulta_listado().statement)
+
+    if activo is not None:
+        consulta += lambda s: s.where(Cliente.activo == activo)
+    if zona:
+        consulta += lambda s: s.where(Cliente.zona == zona)
+    if ciudad:
+        consulta += lambda s: s.where(Cliente.ciudad == ciudad)
+    if buscar:
+        patron = _patron(buscar)
+        consulta += lambda s: s.where(or_(
+            Cliente.nombre.ilike(patron),
+            Cliente.celular.ilike(patron),
+            Cliente.direccion.ilike(patron)
+        ))
+
+    return consulta + (lambda s: s.order_by(Cliente.nombre))
+
+
+def listado_devoluciones(cliente_id=None, estado=None, motivo=None, desde=None, hasta=None, buscar=None):
+    """Listado de devoluciones (objetos con sus relaciones para to_dict()), más recientes primero"""
+    consulta = lambda_stmt(lambda: select(Devolucion).options(*Devolucion.opciones_carga()))
+
+    if cliente_id:
+        consulta += lambda s: s.where(Devolucion.cliente_id == cliente_id)
+    if estado:
+        consulta += lambda s: s.where(Devolucion.estado == estado)
+    if motivo:
+        consulta += lambda s: s.where(Devolucion.motivo == motivo)
+    if desde:
+        consulta += lambda s: s.where(Devolucion.fecha_devolucion >= desde)
+    if hasta:
+        consulta += lambda s: s.where(Devolucion.fecha_devolucion <= hasta)
+    if buscar:
+        patron = _patron(buscar)
+        consulta += lambda s: s.join(Cliente, Cliente.id == Devolucion.cliente_id).where(or_(
+            Devolucion.numero_devolucion.ilike(patron),
+            Cliente.nombre.ilike(patron)
+        ))
+
+    return consulta + (lambda s: s.order_by(Devolucion.fecha_devolucion.desc()))
+
+
+def productos_por_id(producto_ids):
+    """Productos de los ids dados en una sola consulta, como {id: Producto}"""
+    producto_ids = list(producto_ids)
+    if not producto_ids:
+        return {}
+    productos = db.session.scalars(lambda_stmt(lambda: select(Producto).where(Producto.id.in_(producto_ids))))
+    return {producto.id: producto for producto in productos}
@@ -0,0 +1,103 @@
+"""
+Hash y verificación de contraseñas.
+
+Las contraseñas nuevas se guardan con bcrypt (coste BCRYPT_COSTE). Los hashes
+anteriores de Werkzeug (scrypt/pbkdf2) se siguen aceptando y, como los de bcrypt
+con otro coste, se reemplazan en el siguiente login correcto.
+
+La verificación corre en un pool acotado de HASH_HILOS hilos (bcrypt libera el
+GIL): una ráfaga de logins ocupa como mucho esos hilos en lugar de todos los del
+worker, y con más de HASH_COLA_MAXIMA verificaciones pendientes (o si el
+resultado no llega en HASH_TIEMPO_MAXIMO segundos) se rechaza con HashSaturado
+en lugar de encolar sin límite. La app lo responde con 503 y Retry-After.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as TiempoAgotado
+
+import bcrypt
+from flask import current_app
+from werkzeug.security import check_password_hash
+
+PREFIJOS_BCRYPT = ('$2a$', '$2b$', '$2y$')
+
+
+class HashSaturado(Exception):
+    """Demasiadas verificaciones de contraseña pendientes"""
+
+
+_executor = None
+_cupos = None
+_hash_ficticio = None
+_lock = threading.Lock()
+
+
+def _pool():
+    """Crear el pool y los cupos de la cola la primera vez (según la configuración)"""
+    global _executor, _cupos
+    with _lock:
+        if _executor is None:
+            hilos = current_app.config['HASH_HILOS']
+            _executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='hash')
+            _cupos = threading.BoundedSemaphore(hilos + current_app.config['HASH_COLA_MAXIMA'])
+        return _executor, _cupos
+
+
+def coste():
+    """Coste bcrypt configurado (leer antes de pasar al pool, que no tiene contexto de app)"""
+    return current_app.config['BCRYPT_COSTE']
+
+
+def generar_hash(password, coste_bcrypt):
+    """Hash bcrypt de la contraseña"""
+    salt = bcrypt.gensalt(rounds=coste_bcrypt)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('ascii')
+
+
+def verificar(password_hash, password):
+    """Comparar la contraseña con un hash bcrypt o de Werkzeug"""
+    if password_hash.startswith(PREFIJOS_BCRYPT):
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('ascii'))
+    return check_password_hash(password_hash, password)
+
+
+def necesita_rehash(password_hash):
+    """Indica si el hash no es bcrypt o tiene un coste distinto del configurado"""
+    if not password_hash.startswith(PREFIJOS_BCRYPT):
+        return True
+    return int(password_hash.split('$')[2]) != coste()
+
+
+def en_pool(funcion, *args):
+    """
+    Ejecutar funcion(*args) en el pool de hash y esperar el resultado
+
+    Raises:
+        HashSaturado: Si la cola de verificaciones está llena o el resultado no
+            llega en HASH_TIEMPO_MAXIMO segundos
+    """
+    executor, cupos = _pool()
+    if not cupos.acquire(blocking=False):
+        raise HashSaturado()
+
+    try:
+        futuro = executor.submit(funcion, *args)
+    except Exception:
+        cupos.release()
+        raise
+    futuro.add_done_callback(lambda _: cupos.release())
+    try:
+        return futuro.result(timeout=current_app.config['HASH_TIEMPO_MAXIMO'])
+    except TiempoAgotado:
+        raise HashSaturado() from None
+
+
+def verificacion_ficticia(password):
+    """
+    Verificar contra un hash fijo cuando el email no existe, para que la
+    respuesta tarde lo mismo y no revele qué cuentas existen
+    """
+    global _hash_ficticio
+    if _hash_ficticio is None:
+        _hash_ficticio = generar_hash('ficticia', coste())
+    en_pool(verificar, _hash_ficticio, password)
+    return False
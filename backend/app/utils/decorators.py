@@ -1,6 +1,17 @@
+import hashlib
+import threading
+import time
 from functools import wraps
-from flask import jsonify, session
+from flask import jsonify, session, g, current_app, make_response, request, copy_current_request_context
+from app.database import db
 from app.models.usuario import Usuario
+from app.models.idempotencia import ClaveIdempotencia
+from app.utils.cache import cache_respuestas
+from app.utils.limites import cupo_concurrencia
+
+# Claves que se están recalculando en segundo plano (una sola vez por proceso)
+_refrescando = set()
+_lock_refresco = threading.Lock()
 
 def login_required(f):
     """Decorador para requerir autenticación con sesiones"""
@@ -39,4 +50,208 @@ def admin_required(f):
             return jsonify({'error': 'Acceso denegado. Se requiere rol de administrador'}), 403
         
         return f(*args, **kwargs)
-    return decorated_function
\ No newline at end of file
+    return decorated_function
+
+
+def usa_replica():
+    """
+    Si las consultas de esta petición van a la réplica (None si no hay réplica
+    configurada). Se decide una vez por petición y queda en g.leer_de_replica
+    """
+    if 'replica' not in current_app.config.get('SQLALCHEMY_BINDS', {}):
+        return None
+    
+    if 'leer_de_replica' not in g:
+        ultima_escritura = session.get('ultima_escritura', 0)
+        g.leer_de_replica = time.time() - ultima_escritura > current_app.config['REPLICA_VENTANA_ESCRITURA']
+    return g.leer_de_replica
+
+
+def lectura_replica(f):
+    """
+    Decorador para ejecutar las consultas del endpoint en la réplica de lectura
+    (si está configurada). Si el usuario escribió hace menos de
+    REPLICA_VENTANA_ESCRITURA segundos se usa la primaria para que vea sus cambios
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        replica = usa_replica()
+        if replica is None:
+            return f(*args, **kwargs)
+        
+        response = make_response(f(*args, **kwargs))
+        response.headers['X-Origen-Datos'] = 'replica' if replica else 'primaria'
+        return response
+    decorated_function.lectura_replica = True
+    return decorated_function
+
+
+def idempotente(f):
+    """
+    Decorador para endpoints de creación: con el encabezado Idempotency-Key los
+    reintentos de la misma petición se contestan con la respuesta guardada sin
+    volver a ejecutar la transacción (usar después de @login_required). El
+    endpoint guarda su respuesta con respuesta_idempotente() antes de su commit
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        clave = request.headers.get('Idempotency-Key', '').strip()
+        if not clave:
+            return f(*args, **kwargs)
+        
+        if len(clave) > 100:
+            return jsonify({'error': 'Idempotency-Key demasiado larga (máximo 100 caracteres)'}), 400
+        
+        usuario_id = session['user_id']
+        hash_peticion = hashlib.sha256(request.get_data()).hexdigest()
+        existente, reserva = ClaveIdempotencia.reservar(usuario_id, clave, request.endpoint, hash_peticion)
+        
+        if existente:
+            if existente.endpoint != request.endpoint or existente.hash_peticion != hash_peticion:
+                return jsonify({'error': 'Idempotency-Key ya usada con otra petición'}), 422
+            if existente.codigo_estado is None:
+                response = jsonify({'error': 'La petición original todavía está en proceso'})
+                response.status_code = 409
+                response.headers['Retry-After'] = '1'
+                return response
+            
+            response = current_app.response_class(existente.respuesta, status=existente.codigo_estado,
+                                                  mimetype='application/json')
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        
+        g.idempotencia = (usuario_id, clave, reserva)
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            ClaveIdempotencia.liberar(usuario_id, clave, reserva)
+            raise
+        
+        # Con un error (stock insuficiente, fallo del servidor) se libera la clave
+        # para que el reintento se ejecute; las creaciones exitosas ya guardaron su
+        # respuesta en la misma transacción
+        if response.status_code >= 400:
+            ClaveIdempotencia.liberar(usuario_id, clave, reserva)
+        return response
+    return decorated_function
+
+
+def respuesta_idempotente(cuerpo, codigo_estado):
+    """
+    Guardar la respuesta de un endpoint @idempotente en la transacción en curso,
+    junto con su escritura (llamar antes del commit). Sin Idempotency-Key no hace nada
+
+    Raises:
+        RuntimeError: La reserva de la clave se consideró abandonada y la tomó un
+            reintento (la transacción debe deshacerse)
+    """
+    if not g.get('idempotencia'):
+        return
+    
+    usuario_id, clave, reserva = g.idempotencia
+    if not ClaveIdempotencia.guardar_respuesta(usuario_id, clave, reserva, codigo_estado,
+                                               current_app.json.dumps(cuerpo)):
+        raise RuntimeError(f'La reserva de Idempotency-Key {clave} ya no es de esta petición')
+
+
+def _entrada_cache(response, ttl, obsoleto):
+    """Guardar lo necesario para reconstruir la respuesta"""
+    ahora = time.time()
+    return {
+        'cuerpo': response.get_data(),
+        'estado': response.status_code,
+        'tipo': response.mimetype,
+        'encabezados': [(k, v) for k, v in response.headers.items()
+                        if k not in ('Content-Length', 'Content-Type', 'Set-Cookie', 'Vary', 'X-Origen-Datos')],
+        'fresco_hasta': ahora + ttl,
+        'expira': ahora + ttl + obsoleto
+    }
+
+
+def _refrescar(clave, funcion, args, kwargs, ttl, obsoleto):
+    """Recalcular una entrada vencida en un hilo aparte (stale-while-revalidate)"""
+    with _lock_refresco:
+        if clave in _refrescando:
+            return
+        _refrescando.add(clave)
+    
+    @copy_current_request_context
+    def recalcular():
+        try:
+            response = make_response(funcion(*args, **kwargs))
+            if response.status_code == 200:
+                cache_respuestas.guardar(clave, _entrada_cache(response, ttl, obsoleto), ttl + obsoleto)
+        finally:
+            with _lock_refresco:
+                _refrescando.discard(clave)
+    
+    threading.Thread(target=recalcular, daemon=True).start()
+
+
+def cached(tags, ttl=60, obsoleto=None):
+    """
+    Decorador para cachear la respuesta de un endpoint de lectura (usar después
+    de @login_required). La clave incluye los parámetros de la URL y la versión
+    de cada etiqueta: una escritura que invalida la etiqueta fuerza el recálculo.
+    Sobre @lectura_replica la clave separa las respuestas leídas de la réplica de
+    las de la primaria, para que quien acaba de escribir no reciba datos atrasados.
+
+    Pasados ttl segundos la respuesta vieja se sigue sirviendo hasta `obsoleto`
+    segundos más (por defecto otro ttl) mientras se recalcula en segundo plano.
+    Con CACHE_RESPUESTAS=false se ejecuta siempre el endpoint.
+    """
+    obsoleto = ttl if obsoleto is None else obsoleto
+    
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_app.config['CACHE_RESPUESTAS']:
+                return f(*args, **kwargs)
+            
+            replica = usa_replica() if getattr(f, 'lectura_replica', False) else None
+            clave = (
+                'respuesta',
+                request.endpoint,
+                tuple(sorted(request.args.items(multi=True))),
+                tuple(sorted(kwargs.items())),
+                replica,
+                cache_respuestas.versiones(tags)
+            )
+            
+            entrada = cache_respuestas.obtener(clave)
+            estado_cache = 'MISS'
+            if entrada is not None:
+                estado_cache = 'HIT'
+                if entrada['fresco_hasta'] < time.time():
+                    estado_cache = 'STALE'
+                    _refrescar(clave, f, args, kwargs, ttl, obsoleto)
+                response = current_app.response_class(entrada['cuerpo'], status=entrada['estado'],
+                                                      mimetype=entrada['tipo'])
+                response.headers.extend(entrada['encabezados'])
+                if replica is not None:
+                    response.headers['X-Origen-Datos'] = 'replica' if replica else 'primaria'
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code == 200:
+                    cache_respuestas.guardar(clave, _entrada_cache(response, ttl, obsoleto), ttl + obsoleto)
+            
+            response.headers['X-Cache'] = estado_cache
+            return response
+        return decorated_function
+    return decorator
+
+
+def concurrencia_limitada(grupo):
+    """
+    Decorador para endpoints pesados (PDF, reportes): como mucho
+    CONCURRENCIA_MAXIMA[grupo] a la vez por proceso; si no se libera un cupo a
+    tiempo se responde 503 con Retry-After (ver respuesta_concurrencia_agotada)
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            with cupo_concurrencia(grupo):
+                return f(*args, **kwargs)
+        return decorated_function
+    return decorator
@@ -0,0 +1,48 @@
+import logging
+
+from flask import g, jsonify
+from werkzeug.exceptions import HTTPException
+
+logger = logging.getLogger(__name__)
+
+
+class ErrorValidacion(Exception):
+    """
+    Datos rechazados por una regla de negocio; las rutas lo convierten en una
+    respuesta JSON con el código HTTP indicado
+
+    Args:
+        mensaje: Texto para el campo 'error'
+        codigo: Código HTTP de la respuesta (400 por defecto)
+        **detalle: Campos adicionales de la respuesta (stock_disponible, ...)
+    """
+
+    def __init__(self, mensaje, codigo=400, **detalle):
+        super().__init__(mensaje)
+        self.mensaje = mensaje
+        self.codigo = codigo
+        self.detalle = detalle
+
+    def to_dict(self):
+        """Convertir a diccionario"""
+        return {'error': self.mensaje, **self.detalle}
+
+
+def error_interno(mensaje):
+    """
+    Respuesta 500 para un `except Exception` de una ruta: registra el traceback
+    de la excepción en curso y devuelve solo el mensaje y el request_id (el
+    detalle queda en el log, no en la respuesta)
+
+    Args:
+        mensaje: Texto para el campo 'error' (p. ej. 'Error al crear pedido')
+    """
+    logger.exception(mensaje)
+    return jsonify({'error': mensaje, 'request_id': g.get('request_id')}), 500
+
+
+def manejar_excepcion(e):
+    """Manejador de la app para excepciones no capturadas por las rutas"""
+    if isinstance(e, HTTPException):
+        return e
+    return error_interno('Error interno del servidor')
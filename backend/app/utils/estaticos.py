@@ -0,0 +1,171 @@
+"""
+Archivos del frontend: compilación con huellas (nombre con hash de contenido)
+y variantes precomprimidas, y envío desde la ruta catch-all de create_app.
+
+    flask estaticos compilar    # genera frontend/dist
+
+Si frontend/dist existe se sirve desde ahí con un índice de archivos armado al
+iniciar (sin stat por petición) y Cache-Control immutable para los archivos con
+huella; si no, se sirve frontend/ tal cual, revalidando siempre (desarrollo).
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+from flask import request, send_file
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # Sin brotli solo se generan variantes .gz
+    brotli = None
+
+CARPETA_COMPILADA = 'dist'
+EXTENSIONES_HUELLA = ('.js', '.css')
+# El service worker se registra siempre en /sw.js: no lleva huella
+SIN_HUELLA = ('sw.js',)
+EXTENSIONES_PRECOMPRIMIR = ('.html', '.js', '.css', '.svg', '.json', '.txt', '.webmanifest')
+MINIMO_PRECOMPRIMIR = 512
+VARIANTES = {'br': '.br', 'gzip': '.gz'}
+UN_ANIO = 365 * 24 * 3600
+
+mimetypes.add_type('application/manifest+json', '.webmanifest')
+
+PATRON_HUELLA = re.compile(r'\.[0-9a-f]{10}\.(?:js|css)$')
+PATRON_REFERENCIA = re.compile(r'((?:href|src)=["\'])(\.?/)?((?:css|js)/[^"\'?#]+)')
+
+
+def _huella(contenido):
+    return hashlib.sha256(contenido).hexdigest()[:10]
+
+
+def _precomprimir(ruta):
+    """Escribir ruta.gz y ruta.br si resultan más chicos que el original"""
+    with open(ruta, 'rb') as archivo:
+        contenido = archivo.read()
+
+    variantes = {'.gz': gzip.compress(contenido, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variantes['.br'] = brotli.compress(contenido, quality=11)
+
+    for extension, comprimido in variantes.items():
+        if len(comprimido) < len(contenido):
+            with open(ruta + extension, 'wb') as archivo:
+                archivo.write(comprimido)
+
+
+def compilar(origen):
+    """
+    Generar origen/dist: copia del frontend con huellas en JS/CSS, HTML con las
+    referencias reescritas, manifest.json y variantes .gz/.br
+
+    Returns:
+        Diccionario ruta original -> ruta con huella
+    """
+    destino = os.path.join(origen, CARPETA_COMPILADA)
+    shutil.rmtree(destino, ignore_errors=True)
+
+    archivos = []
+    for raiz, carpetas, nombres in os.walk(origen):
+        if raiz == origen and CARPETA_COMPILADA in carpetas:
+            carpetas.remove(CARPETA_COMPILADA)
+        for nombre in nombres:
+            archivos.append(os.path.relpath(os.path.join(raiz, nombre), origen).replace(os.sep, '/'))
+
+    # 1. JS y CSS con el hash del contenido en el nombre
+    manifiesto = {}
+    for relativa in archivos:
+        if not relativa.endswith(EXTENSIONES_HUELLA) or relativa in SIN_HUELLA:
+            continue
+        with open(os.path.join(origen, relativa), 'rb') as archivo:
+            contenido = archivo.read()
+        base, extension = os.path.splitext(relativa)
+        manifiesto[relativa] = f'{base}.{_huella(contenido)}{extension}'
+
+    def reescribir(coincidencia):
+        prefijo, raiz, relativa = coincidencia.groups()
+        return prefijo + (raiz or '') + manifiesto.get(relativa, relativa)
+
+    # 2. Copiar todo; en los HTML se reemplazan las referencias a css/ y js/
+    for relativa in archivos:
+        salida = os.path.join(destino, manifiesto.get(relativa, relativa))
+        os.makedirs(os.path.dirname(salida), exist_ok=True)
+
+        if relativa.endswith('.html'):
+            with open(os.path.join(origen, relativa), encoding='utf-8') as archivo:
+                html = PATRON_REFERENCIA.sub(reescribir, archivo.read())
+            with open(salida, 'w', encoding='utf-8') as archivo:
+                archivo.write(html)
+        else:
+            shutil.copyfile(os.path.join(origen, relativa), salida)
+
+    with open(os.path.join(destino, 'manifest.json'), 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, indent=2, sort_keys=True)
+
+    # 3. Variantes precomprimidas para enviar sin comprimir en cada petición
+    for raiz, _, nombres in os.walk(destino):
+        for nombre in nombres:
+            ruta = os.path.join(raiz, nombre)
+            if nombre.endswith(EXTENSIONES_PRECOMPRIMIR) and os.path.getsize(ruta) >= MINIMO_PRECOMPRIMIR:
+                _precomprimir(ruta)
+
+    return manifiesto
+
+
+class ArchivosEstaticos:
+    """Resolver y enviar archivos del frontend"""
+
+    def __init__(self, carpeta_frontend):
+        compilada = os.path.join(carpeta_frontend, CARPETA_COMPILADA)
+        self.compilado = os.path.isdir(compilada)
+        self.carpeta = compilada if self.compilado else carpeta_frontend
+        self._indice = self._indexar() if self.compilado else None
+
+    def _indexar(self):
+        """El build no cambia mientras corre el servidor: un solo recorrido al iniciar"""
+        indice = {}
+        for raiz, _, nombres in os.walk(self.carpeta):
+            for nombre in nombres:
+                ruta = os.path.join(raiz, nombre)
+                indice[os.path.relpath(ruta, self.carpeta).replace(os.sep, '/')] = ruta
+        return indice
+
+    def buscar(self, path):
+        """Ruta absoluta del archivo o None si no existe"""
+        if self._indice is not None:
+            return self._indice.get(path)
+
+        ruta = safe_join(self.carpeta, path)
+        return ruta if ruta and os.path.isfile(ruta) else None
+
+    def enviar(self, path):
+        """Responder con el archivo (o index.html si no existe), su variante precomprimida y Cache-Control"""
+        ruta = self.buscar(path) if path else None
+        if ruta is None:
+            path = 'index.html'
+            ruta = self.buscar(path)
+
+        disponibles = [c for c, extension in VARIANTES.items() if self.buscar(path + extension)]
+        codificacion = request.accept_encodings.best_match(disponibles) if disponibles else None
+        if codificacion:
+            ruta = self.buscar(path + VARIANTES[codificacion])
+
+        con_huella = bool(PATRON_HUELLA.search(path))
+        response = send_file(
+            ruta,
+            mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream',
+            conditional=True,
+            max_age=UN_ANIO if con_huella else None
+        )
+
+        if con_huella:
+            response.cache_control.immutable = True
+        if disponibles:
+            response.vary.add('Accept-Encoding')
+        if codificacion:
+            response.headers['Content-Encoding'] = codificacion
+        return response
@@ -0,0 +1,36 @@
+from decimal import Decimal
+
+import orjson
+from flask.json.provider import JSONProvider
+
+# Claves no string (p. ej. ids enteros) igual que el módulo json
+OPCIONES_ORJSON = orjson.OPT_NON_STR_KEYS
+
+
+def _convertir(valor):
+    """Tipos que orjson no serializa por sí mismo"""
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (set, frozenset)):
+        return list(valor)
+    raise TypeError(f'Objeto de tipo {type(valor).__name__} no serializable a JSON')
+
+
+class ORJSONProvider(JSONProvider):
+    """
+    Proveedor JSON de la app (jsonify, request.get_json) basado en orjson.
+    Serializa Decimal como número y date/datetime en formato ISO 8601
+    """
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_convertir, option=OPCIONES_ORJSON).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_convertir, option=OPCIONES_ORJSON),
+            mimetype='application/json'
+        )
@@ -0,0 +1,156 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from flask import current_app, jsonify, request, session
+
+
+class CuboTokens:
+    """
+    Limitador token bucket por clave (cuenta, IP...): cada clave tiene hasta
+    `capacidad` tokens que se recargan a razón de uno cada `recarga` segundos.
+
+    Los cubos viven en la memoria del proceso; se descartan los menos usados
+    por encima de `maximo_claves` (un cubo descartado vuelve lleno).
+    """
+
+    def __init__(self, capacidad, recarga, maximo_claves=10000):
+        self.capacidad = capacidad
+        self.recarga = recarga
+        self.maximo_claves = maximo_claves
+        self._cubos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tokens(self, clave, ahora):
+        """Tokens disponibles de la clave después de la recarga (llamar con el lock)"""
+        tokens, ultimo = self._cubos.get(clave, (self.capacidad, ahora))
+        return min(self.capacidad, tokens + (ahora - ultimo) / self.recarga)
+
+    def _espera(self, tokens, costo):
+        return max((costo - tokens) * self.recarga, 0)
+
+    def disponible(self, clave, costo=1):
+        """
+        Consultar sin consumir
+
+        Returns:
+            Segundos a esperar hasta tener `costo` tokens (0 si ya los tiene)
+        """
+        with self._lock:
+            return self._espera(self._tokens(clave, time.monotonic()), costo)
+
+    def consumir(self, clave, costo=1):
+        """
+        Consumir `costo` tokens si hay suficientes
+
+        Returns:
+            0 si se consumieron, o los segundos a esperar para poder hacerlo
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(clave, ahora)
+            if tokens < costo:
+                return self._espera(tokens, costo)
+
+            self._cubos[clave] = (tokens - costo, ahora)
+            self._cubos.move_to_end(clave)
+            while len(self._cubos) > self.maximo_claves:
+                self._cubos.popitem(last=False)
+            return 0
+
+    def reiniciar(self, clave):
+        """Volver a llenar el cubo de la clave"""
+        with self._lock:
+            self._cubos.pop(clave, None)
+
+
+def por_pagina(defecto=20):
+    """Parámetro per_page de la petición acotado entre 1 y PAGINACION_MAXIMA"""
+    per_page = request.args.get('per_page', defecto, type=int)
+    return min(max(per_page, 1), current_app.config['PAGINACION_MAXIMA'])
+
+
+def _respuesta_reintentar(mensaje, codigo, espera):
+    """Respuesta de error con Retry-After"""
+    response = jsonify({'error': mensaje})
+    response.status_code = codigo
+    response.headers['Retry-After'] = str(max(math.ceil(espera), 1))
+    return response
+
+
+def limitar_peticiones():
+    """
+    before_request: token bucket por usuario (o por IP sin sesión) para /api.
+    Cada endpoint gasta los tokens de RATE_LIMIT_COSTOS (1 por defecto); sin
+    tokens suficientes responde 429 con Retry-After
+    """
+    config = current_app.config
+    if not config['RATE_LIMIT'] or request.method == 'OPTIONS' or not request.path.startswith('/api/'):
+        return None
+
+    cubo = current_app.extensions.get('cubo_peticiones')
+    if cubo is None:
+        cubo = current_app.extensions['cubo_peticiones'] = CuboTokens(
+            config['RATE_LIMIT_TOKENS'], config['RATE_LIMIT_RECARGA']
+        )
+
+    usuario_id = session.get('user_id')
+    clave = f'usuario:{usuario_id}' if usuario_id else f'ip:{request.remote_addr}'
+    costo = config['RATE_LIMIT_COSTOS'].get(request.endpoint, 1)
+
+    espera = cubo.consumir(clave, costo)
+    if espera:
+        return _respuesta_reintentar('Demasiadas peticiones. Intente más tarde', 429, espera)
+    return None
+
+
+class ConcurrenciaAgotada(Exception):
+    """No hubo cupo libre en el grupo de concurrencia dentro del tiempo de espera"""
+
+    def __init__(self, grupo, espera):
+        super().__init__(grupo)
+        self.grupo = grupo
+        self.espera = espera
+
+
+_lock_semaforos = threading.Lock()
+
+
+def _semaforo(grupo):
+    """Semáforo del grupo (uno por app, con el cupo de CONCURRENCIA_MAXIMA)"""
+    semaforos = current_app.extensions.setdefault('semaforos_concurrencia', {})
+    with _lock_semaforos:
+        if grupo not in semaforos:
+            semaforos[grupo] = threading.BoundedSemaphore(current_app.config['CONCURRENCIA_MAXIMA'][grupo])
+        return semaforos[grupo]
+
+
+@contextmanager
+def cupo_concurrencia(grupo):
+    """
+    Ocupar un cupo del grupo ('pdf', 'reportes') mientras dura el bloque
+
+    Raises:
+        ConcurrenciaAgotada: Si no se libera un cupo en CONCURRENCIA_ESPERA segundos
+    """
+    espera = current_app.config['CONCURRENCIA_ESPERA']
+    semaforo = _semaforo(grupo)
+    if not semaforo.acquire(timeout=espera):
+        raise ConcurrenciaAgotada(grupo, espera)
+    try:
+        yield
+    finally:
+        semaforo.release()
+
+
+def respuesta_concurrencia_agotada(error):
+    """Manejador de ConcurrenciaAgotada: 503 con Retry-After"""
+    return _respuesta_reintentar('Servidor ocupado generando reportes, intente nuevamente en unos segundos',
+                                 503, error.espera)
+
+
+def respuesta_hash_saturado(error):
+    """Manejador de HashSaturado (pool de contraseñas ocupado): 503 con Retry-After"""
+    return _respuesta_reintentar('Servidor ocupado, intente nuevamente en unos segundos', 503, 2)
@@ -0,0 +1,53 @@
+from collections import defaultdict
+from decimal import Decimal
+
+
+def _igual(actual, nuevo):
+    """Comparar un valor guardado con el recibido (Numeric vs float, None)"""
+    if isinstance(actual, (int, float, Decimal)) and isinstance(nuevo, (int, float, Decimal)):
+        return abs(float(actual) - float(nuevo)) < 1e-9
+    return actual == nuevo
+
+
+def sincronizar_lineas(detalles, nuevas, crear):
+    """
+    Aplicar a la colección de detalles solo las diferencias con las líneas nuevas
+
+    Las líneas se emparejan por producto_id (en orden si un producto se repite):
+    las emparejadas se actualizan solo en los campos que cambiaron, las sobrantes
+    se eliminan (delete-orphan) y las que faltan se crean.
+
+    Args:
+        detalles: Colección de la relación (pedido.detalles, devolucion.detalles)
+        nuevas: Lista de diccionarios con producto_id, cantidad y el resto de columnas
+        crear: Función que recibe un diccionario y devuelve el detalle nuevo
+
+    Returns:
+        Diccionario {producto_id: cantidad nueva - cantidad anterior} sin los ceros
+    """
+    anteriores = defaultdict(list)
+    for detalle in detalles:
+        anteriores[detalle.producto_id].append(detalle)
+
+    deltas = defaultdict(int)
+    agregar = []
+
+    for datos in nuevas:
+        producto_id = datos['producto_id']
+        if anteriores[producto_id]:
+            detalle = anteriores[producto_id].pop(0)
+            deltas[producto_id] += int(datos['cantidad']) - int(detalle.cantidad)
+            for campo, valor in datos.items():
+                if not _igual(getattr(detalle, campo), valor):
+                    setattr(detalle, campo, valor)
+        else:
+            agregar.append(crear(datos))
+            deltas[producto_id] += int(datos['cantidad'])
+
+    for pendientes in anteriores.values():
+        for detalle in pendientes:
+            deltas[detalle.producto_id] -= int(detalle.cantidad)
+            detalles.remove(detalle)
+
+    detalles.extend(agregar)
+    return {producto_id: delta for producto_id, delta in deltas.items() if delta}
@@ -479,6 +479,107 @@ class PDFGenerator:
             buffer.seek(0)
             return buffer
     
+    def generar_picking(self, data, output_path=None):
+        """
+        Generar PDF de la lista de preparación (picking) consolidada del día
+        
+        Args:
+            data: Diccionario con los productos a preparar
+            output_path: Ruta donde guardar el PDF (opcional)
+        
+        Returns:
+            BytesIO si no se especifica output_path, None si se guarda en archivo
+        """
+        # Crear buffer o archivo
+        if output_path:
+            pdf = SimpleDocTemplate(output_path, pagesize=A4)
+        else:
+            buffer = BytesIO()
+            pdf = SimpleDocTemplate(buffer, pagesize=A4)
+        
+        # Contenido del PDF
+        elementos = []
+        
+        # Encabezado
+        elementos.append(Paragraph(
+            "DISTRIBUIDORA DE QUESOS CAROLINA",
+            self.styles['TituloEmpresa']
+        ))
+        elementos.append(Spacer(1, 0.3*cm))
+        
+        elementos.append(Paragraph(
+            "LISTA DE PREPARACIÓN",
+            self.styles['Subtitulo']
+        ))
+        elementos.append(Spacer(1, 0.5*cm))
+        
+        # Información general
+        info = f"<b>Fecha de entrega:</b> {data['fecha']}"
+        if data.get('zona'):
+            info += f" &nbsp;&nbsp; <b>Zona:</b> {data['zona']}"
+        elementos.append(Paragraph(info, self.styles['InfoGeneral']))
+        elementos.append(Spacer(1, 0.4*cm))
+        
+        # Tabla de productos
+        productos_data = [['', 'Código', 'Producto', 'Cantidad', 'Pedidos', 'Stock']]
+        
+        for producto in data['productos']:
+            productos_data.append([
+                '[  ]',
+                producto['codigo'] or '-',
+                f"{producto['nombre']} ({producto['unidad_medida']})",
+                self._formatear_cantidad(producto['cantidad']),
+                str(producto['pedidos']),
+                str(producto['stock_actual'])
+            ])
+        
+        tabla_productos = Table(productos_data, colWidths=[1*cm, 3*cm, 7.5*cm, 2*cm, 1.7*cm, 1.8*cm], repeatRows=1)
+        estilos_tabla = [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+            ('ALIGN', (3, 1), (-1, -1), 'CENTER'),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ]
+        
+        # Resaltar productos sin stock suficiente
+        for fila, producto in enumerate(data['productos'], start=1):
+            if producto['faltante'] > 0:
+                estilos_tabla.append(('TEXTCOLOR', (0, fila), (-1, fila), colors.HexColor('#c0392b')))
+        
+        tabla_productos.setStyle(TableStyle(estilos_tabla))
+        
+        elementos.append(tabla_productos)
+        elementos.append(Spacer(1, 0.5*cm))
+        
+        # Resumen
+        elementos.append(Paragraph(
+            f"<b>Productos:</b> {data['total_productos']} &nbsp;&nbsp; "
+            f"<b>Sin stock suficiente:</b> {data['productos_con_faltante']}",
+            self.styles['InfoGeneral']
+        ))
+        
+        # Pie de página
+        elementos.append(Spacer(1, 1*cm))
+        elementos.append(Paragraph(
+            f"Generado el {datetime.now().strftime('%d/%m/%Y %H:%M')}",
+            self.styles['InfoGeneral']
+        ))
+        
+        # Construir PDF
+        pdf.build(elementos)
+        
+        if output_path:
+            return None
+        else:
+            buffer.seek(0)
+            return buffer
+    
     def _crear_linea_separadora(self):
         """Crear una línea separadora"""
         return Table([['_' * 100]], colWidths=[17*cm])
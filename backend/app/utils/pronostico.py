@@ -0,0 +1,122 @@
+import math
+from datetime import timedelta
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import text
+
+from app.database import db, get_bolivia_time
+from app.models.producto import Producto, SugerenciaReposicion
+
+# Cantidad vendida por producto y día (excluye pedidos cancelados)
+SQL_VENTAS_DIARIAS = text("""
+    SELECT d.producto_id, DATE(p.fecha_pedido) AS dia, SUM(d.cantidad) AS cantidad
+    FROM detalle_pedidos d
+    JOIN pedidos p ON p.id = d.pedido_id
+    WHERE p.estado <> 'cancelado'
+      AND p.fecha_pedido >= :desde
+      AND p.fecha_pedido < :hasta
+    GROUP BY d.producto_id, DATE(p.fecha_pedido)
+""")
+
+
+def matriz_ventas(producto_ids, desde, dias):
+    """
+    Construir la matriz productos × días de cantidades vendidas
+
+    Args:
+        producto_ids: Ids de producto (define el orden de las filas)
+        desde: Primer día de la matriz
+        dias: Número de columnas (días)
+
+    Returns:
+        numpy.ndarray de forma (len(producto_ids), dias)
+    """
+    indice = {producto_id: i for i, producto_id in enumerate(producto_ids)}
+    filas = db.session.execute(SQL_VENTAS_DIARIAS, {
+        'desde': desde,
+        'hasta': desde + timedelta(days=dias)
+    }).all()
+
+    posiciones = [(indice[f.producto_id], (f.dia - desde).days, float(f.cantidad))
+                  for f in filas if f.producto_id in indice]
+
+    matriz = np.zeros((len(producto_ids), dias))
+    if posiciones:
+        fila_idx, columna_idx, cantidades = (np.array(v) for v in zip(*posiciones))
+        np.add.at(matriz, (fila_idx.astype(int), columna_idx.astype(int)), cantidades)
+    return matriz
+
+
+def suavizado_exponencial(matriz, alfa):
+    """Suavizado exponencial simple aplicado a todos los productos a la vez"""
+    dias = matriz.shape[1]
+    inicio = min(7, dias)
+    nivel = matriz[:, :inicio].mean(axis=1)
+    for t in range(inicio, dias):
+        nivel = alfa * matriz[:, t] + (1 - alfa) * nivel
+    return nivel
+
+
+def pronosticar(matriz, ventana, alfa, tiempo_entrega, z):
+    """
+    Pronóstico de demanda diaria y punto de reposición por producto
+
+    Returns:
+        Tupla de arrays (demanda_diaria, promedio_movil, desviacion, punto_reposicion)
+    """
+    promedio_movil = matriz[:, -ventana:].mean(axis=1)
+    demanda = suavizado_exponencial(matriz, alfa)
+    desviacion = matriz.std(axis=1)
+
+    # Punto de reposición = demanda durante el tiempo de entrega + stock de seguridad
+    stock_seguridad = z * desviacion * math.sqrt(tiempo_entrega)
+    punto_reposicion = np.ceil(demanda * tiempo_entrega + stock_seguridad)
+    return demanda, promedio_movil, desviacion, punto_reposicion
+
+
+def recalcular_sugerencias(hoy=None):
+    """
+    Recalcular el pronóstico de todos los productos activos y guardar las sugerencias
+
+    Returns:
+        Número de productos procesados
+    """
+    config = current_app.config
+    hoy = hoy or get_bolivia_time().date()
+    dias = config['PRONOSTICO_DIAS_HISTORIAL']
+    desde = hoy - timedelta(days=dias)
+
+    producto_ids = [p.id for p in db.session.query(Producto.id).filter_by(activo=True).order_by(Producto.id)]
+    matriz = matriz_ventas(producto_ids, desde, dias)
+
+    demanda, promedio_movil, desviacion, punto_reposicion = pronosticar(
+        matriz,
+        ventana=min(config['PRONOSTICO_VENTANA_MOVIL'], dias),
+        alfa=config['PRONOSTICO_ALFA'],
+        tiempo_entrega=config['PRONOSTICO_TIEMPO_ENTREGA'],
+        z=config['PRONOSTICO_NIVEL_SERVICIO_Z']
+    )
+
+    ahora = get_bolivia_time()
+    db.session.query(SugerenciaReposicion).delete()
+    db.session.bulk_insert_mappings(SugerenciaReposicion, [{
+        'producto_id': producto_id,
+        'demanda_diaria': round(float(demanda[i]), 3),
+        'promedio_movil': round(float(promedio_movil[i]), 3),
+        'desviacion': round(float(desviacion[i]), 3),
+        'stock_minimo_sugerido': int(punto_reposicion[i]),
+        'dias_historial': dias,
+        'fecha_calculo': ahora
+    } for i, producto_id in enumerate(producto_ids)])
+    db.session.commit()
+
+    return len(producto_ids)
+
+
+def cantidad_reposicion(stock_actual, stock_minimo_sugerido, demanda_diaria, dias_cobertura):
+    """Cantidad a pedir para volver a cubrir los días de cobertura sobre el punto de reposición"""
+    if stock_actual > stock_minimo_sugerido:
+        return 0
+    objetivo = stock_minimo_sugerido + demanda_diaria * dias_cobertura
+    return max(int(math.ceil(objetivo - stock_actual)), 0)
@@ -0,0 +1,163 @@
+"""
+Registro (logging) estructurado de la app.
+
+Cada registro es una línea JSON con la hora, nivel, logger, mensaje y, dentro
+de una petición, su request_id, usuario_id y endpoint. Los loggers solo ponen el
+registro en una cola (QueueHandler); un QueueListener en un hilo aparte lo
+serializa y lo escribe en stdout, así la E/S de los logs no bloquea la petición.
+
+Al terminar cada petición se registra una línea de acceso con el código y la
+latencia. Las de lecturas exitosas y rápidas son las más numerosas y se
+muestrean (LOG_MUESTREO); errores, escrituras y peticiones lentas se registran
+siempre.
+"""
+import atexit
+import copy
+import logging
+import queue
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+import orjson
+from flask import current_app, g, has_request_context, request, session
+
+logger_peticiones = logging.getLogger('app.peticiones')
+
+# Atributos propios de LogRecord (el resto son campos enviados con extra=)
+_ATRIBUTOS_RECORD = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'muestreo'}
+
+_listener = None
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por registro, con los campos de extra= y el traceback"""
+
+    def format(self, record):
+        datos = {
+            'fecha': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage()
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_RECORD:
+                datos[clave] = valor
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            datos['traceback'] = record.exc_text
+        return orjson.dumps(datos, default=str).decode('utf-8')
+
+
+class ContextoPeticion(logging.Filter):
+    """Agregar request_id, usuario_id y endpoint de la petición en curso"""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.usuario_id = session.get('user_id')
+            record.endpoint = request.endpoint
+        return True
+
+
+class Muestreo(logging.Filter):
+    """Dejar pasar solo una fracción de los registros INFO marcados con muestreo=True"""
+
+    def __init__(self, tasa):
+        super().__init__()
+        self.tasa = tasa
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or not getattr(record, 'muestreo', False):
+            return True
+        return random.random() < self.tasa
+
+
+class ColaAcotada(QueueHandler):
+    """QueueHandler que descarta (y cuenta) registros si la cola está llena en vez de bloquear"""
+
+    descartados = 0
+
+    def prepare(self, record):
+        # Resolver el mensaje y el traceback aquí (el listener no debe tocar
+        # args ni el frame de la excepción), pero serializar a JSON en el listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            ColaAcotada.descartados += 1
+
+
+def configurar_registro(app):
+    """
+    Dirigir los logs del proceso (raíz, app, werkzeug, sqlalchemy) a la cola JSON
+    y registrar los hooks de request_id y de la línea de acceso.
+    La cola y el hilo escritor se crean una sola vez por proceso.
+    """
+    global _listener
+    config = app.config
+
+    if _listener is None:
+        cola = queue.Queue(config['LOG_COLA_MAXIMA'])
+        salida = logging.StreamHandler(sys.stdout)
+        salida.setFormatter(FormatoJSON())
+
+        manejador = ColaAcotada(cola)
+        manejador.addFilter(ContextoPeticion())
+        manejador.addFilter(Muestreo(config['LOG_MUESTREO']))
+
+        raiz = logging.getLogger()
+        raiz.handlers[:] = [manejador]
+        raiz.setLevel(config['LOG_NIVEL'])
+
+        _listener = QueueListener(cola, salida, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+    app.before_request(_iniciar_peticion)
+    app.after_request(_registrar_acceso)
+
+
+def _iniciar_peticion():
+    """Asignar el request_id (el del proxy si llega en X-Request-ID) y marcar el inicio"""
+    g.request_id = request.headers.get('X-Request-ID', '')[:64] or uuid.uuid4().hex
+    g.inicio_peticion = time.perf_counter()
+
+
+def _registrar_acceso(response):
+    """Línea de acceso con código y latencia; devolver el request_id al cliente"""
+    inicio = g.get('inicio_peticion')
+    if inicio is None:
+        return response
+
+    latencia_ms = round((time.perf_counter() - inicio) * 1000, 1)
+    lenta = latencia_ms >= current_app.config['LOG_LENTO_MS']
+
+    if response.status_code >= 500:
+        nivel = logging.ERROR
+    elif response.status_code >= 400 or lenta:
+        nivel = logging.WARNING
+    else:
+        nivel = logging.INFO
+
+    logger_peticiones.log(nivel, '%s %s %s', request.method, request.path, response.status_code, extra={
+        'metodo': request.method,
+        'ruta': request.path,
+        'codigo': response.status_code,
+        'latencia_ms': latencia_ms,
+        'muestreo': request.method in ('GET', 'HEAD') and not lenta
+    })
+    response.headers['X-Request-ID'] = g.request_id
+    return response
@@ -0,0 +1,158 @@
+import math
+
+RADIO_TIERRA_KM = 6371.0
+
+
+def distancia_km(a, b):
+    """Distancia haversine entre dos puntos (latitud, longitud)"""
+    lat1, lon1 = math.radians(a[0]), math.radians(a[1])
+    lat2, lon2 = math.radians(b[0]), math.radians(b[1])
+    h = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(h))
+
+
+def _longitud_ruta(orden, matriz):
+    return sum(matriz[orden[i]][orden[i + 1]] for i in range(len(orden) - 1))
+
+
+def _vecino_mas_cercano(matriz):
+    """Ruta inicial partiendo del nodo 0 (origen) y visitando siempre el más cercano"""
+    pendientes = set(range(1, len(matriz)))
+    orden = [0]
+    while pendientes:
+        ultimo = orden[-1]
+        siguiente = min(pendientes, key=lambda j: matriz[ultimo][j])
+        orden.append(siguiente)
+        pendientes.remove(siguiente)
+    return orden
+
+
+def _dos_opt(orden, matriz, max_iteraciones=50):
+    """Mejorar una ruta abierta invirtiendo tramos mientras se acorte (2-opt)"""
+    n = len(orden)
+    for _ in range(max_iteraciones):
+        mejorado = False
+        for i in range(1, n - 1):
+            a, b = orden[i - 1], orden[i]
+            for j in range(i + 1, n):
+                c = orden[j]
+                d = orden[j + 1] if j + 1 < n else None
+                # Ruta abierta: el último tramo no regresa al origen
+                antes = matriz[a][b] + (matriz[c][d] if d is not None else 0)
+                despues = matriz[a][c] + (matriz[b][d] if d is not None else 0)
+                if despues < antes - 1e-9:
+                    orden[i:j + 1] = reversed(orden[i:j + 1])
+                    b = orden[i]
+                    mejorado = True
+        if not mejorado:
+            break
+    return orden
+
+
+def ordenar_paradas(origen, puntos):
+    """
+    Ordenar paradas con vecino más cercano + 2-opt
+
+    Args:
+        origen: Tupla (latitud, longitud) de partida
+        puntos: Lista de tuplas (latitud, longitud)
+
+    Returns:
+        Tupla (índices de puntos en orden de visita, distancia total en km)
+    """
+    if not puntos:
+        return [], 0.0
+
+    nodos = [origen] + list(puntos)
+    matriz = [[distancia_km(p, q) for q in nodos] for p in nodos]
+
+    orden = _dos_opt(_vecino_mas_cercano(matriz), matriz)
+    return [i - 1 for i in orden[1:]], _longitud_ruta(orden, matriz)
+
+
+def centroide(puntos):
+    """Punto medio simple de una lista de coordenadas (None si está vacía)"""
+    if not puntos:
+        return None
+    return (sum(p[0] for p in puntos) / len(puntos), sum(p[1] for p in puntos) / len(puntos))
+
+
+def planificar_rutas(filas, origen):
+    """
+    Agrupar líneas de pedidos pendientes por zona y ordenar las paradas
+
+    Args:
+        filas: Líneas de pedido con datos del cliente, producto y coordenadas
+        origen: Tupla (latitud, longitud) del depósito
+
+    Returns:
+        Lista de zonas en orden de visita con su carga y paradas
+    """
+    zonas = {}
+    for fila in filas:
+        nombre_zona = fila['zona'] or 'Sin zona'
+        zona = zonas.setdefault(nombre_zona, {'paradas': {}, 'carga': {}, 'pedidos': set()})
+
+        parada = zona['paradas'].get(fila['cliente_id'])
+        if parada is None:
+            tiene_coordenadas = fila['latitud'] is not None and fila['longitud'] is not None
+            parada = zona['paradas'][fila['cliente_id']] = {
+                'cliente_id': fila['cliente_id'],
+                'cliente_nombre': fila['cliente_nombre'],
+                'direccion': fila['direccion'],
+                'celular': fila['celular'],
+                'ciudad': fila['ciudad'],
+                'latitud': float(fila['latitud']) if tiene_coordenadas else None,
+                'longitud': float(fila['longitud']) if tiene_coordenadas else None,
+                'pedidos': [],
+                'total': 0.0
+            }
+
+        if fila['pedido_id'] not in zona['pedidos']:
+            zona['pedidos'].add(fila['pedido_id'])
+            parada['pedidos'].append(fila['numero_pedido'])
+            parada['total'] += float(fila['total'])
+
+        producto = zona['carga'].get(fila['producto_id'])
+        if producto is None:
+            producto = zona['carga'][fila['producto_id']] = {
+                'producto_id': fila['producto_id'],
+                'codigo': fila['producto_codigo'],
+                'nombre': fila['producto_nombre'],
+                'unidad_medida': fila['unidad_medida'],
+                'cantidad': 0.0
+            }
+        producto['cantidad'] += float(fila['cantidad'])
+
+    resultado = []
+    for nombre_zona, zona in zonas.items():
+        paradas = sorted(zona['paradas'].values(), key=lambda p: p['cliente_nombre'])
+        con_coordenadas = [p for p in paradas if p['latitud'] is not None]
+        sin_coordenadas = [p for p in paradas if p['latitud'] is None]
+
+        # Las paradas sin coordenadas se visitan al final, en orden alfabético
+        orden, distancia = ordenar_paradas(
+            origen, [(p['latitud'], p['longitud']) for p in con_coordenadas]
+        )
+        paradas = [con_coordenadas[i] for i in orden] + sin_coordenadas
+        for numero, parada in enumerate(paradas, start=1):
+            parada['orden'] = numero
+
+        resultado.append({
+            'zona': nombre_zona,
+            'centro': centroide([(p['latitud'], p['longitud']) for p in con_coordenadas]),
+            'total_paradas': len(paradas),
+            'total_pedidos': len(zona['pedidos']),
+            'total': sum(p['total'] for p in paradas),
+            'distancia_km': round(distancia, 2) if con_coordenadas else None,
+            'paradas_sin_coordenadas': len(sin_coordenadas),
+            'carga': sorted(zona['carga'].values(), key=lambda c: (c['codigo'] or '', c['nombre'])),
+            'paradas': paradas
+        })
+
+    # Las zonas también se recorren por vecino más cercano según su centro
+    con_centro = [z for z in resultado if z['centro']]
+    sin_centro = sorted((z for z in resultado if not z['centro']), key=lambda z: z['zona'])
+    orden, _ = ordenar_paradas(origen, [z['centro'] for z in con_centro])
+    return [con_centro[i] for i in orden] + sin_centro
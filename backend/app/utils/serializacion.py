@@ -0,0 +1,35 @@
+"""
+Serialización por proyección de columnas para los listados: se seleccionan solo
+las columnas que se devuelven, con fechas y montos ya formateados por PostgreSQL
+(to_char y float8), y cada fila se convierte en diccionario sin construir
+objetos del ORM. El formato es el mismo que el de los to_dict() de los modelos.
+"""
+from app.database import db
+
+
+def fecha_hora(columna):
+    """Fecha y hora como 'dd/mm/aaaa hh:mm'"""
+    return db.func.to_char(columna, 'DD/MM/YYYY HH24:MI')
+
+
+def fecha(columna):
+    """Fecha como 'dd/mm/aaaa'"""
+    return db.func.to_char(columna, 'DD/MM/YYYY')
+
+
+def monto(columna):
+    """Numeric como float"""
+    return db.cast(columna, db.Float)
+
+
+def columnas(**campos):
+    """Etiquetar las expresiones con el nombre de la clave que tendrán en el diccionario"""
+    return [expresion.label(nombre) for nombre, expresion in campos.items()]
+
+
+def a_diccionarios(filas):
+    """Convertir filas de una consulta por columnas en diccionarios"""
+    if not filas:
+        return []
+    nombres = filas[0]._fields
+    return [dict(zip(nombres, fila)) for fila in filas]
@@ -0,0 +1 @@
+# Suite de benchmarks de Distribuidora Carolina
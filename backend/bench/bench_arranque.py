@@ -0,0 +1,88 @@
+"""
+Arranque en frío de un worker: tiempo de importación de la app medido con
+`python -X importtime` y presupuesto que no debe superarse.
+
+ReportLab (PDFs) y numpy (pronóstico) se importan dentro de las funciones que
+los usan; estas pruebas fallan si alguno vuelve a cargarse al crear la app.
+
+Uso (desde backend/, no necesita la base de datos poblada):
+    pytest -c bench/pytest.ini bench/bench_arranque.py
+
+ARRANQUE_PRESUPUESTO_MS cambia el presupuesto (por defecto 1500 ms, holgado
+para una máquina de desarrollo; el valor medido queda en extra_info).
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+# Crear la app como lo hace un worker de gunicorn (run:app)
+CODIGO_ARRANQUE = 'from app import create_app; create_app()'
+
+# Paquetes que no deben importarse al arrancar
+PAQUETES_DIFERIDOS = ('reportlab', 'numpy')
+
+PRESUPUESTO_MS = int(os.environ.get('ARRANQUE_PRESUPUESTO_MS', 1500))
+
+
+def _arrancar(*opciones):
+    """Ejecutar CODIGO_ARRANQUE en un intérprete nuevo y devolver su stderr"""
+    resultado = subprocess.run(
+        [sys.executable, *opciones, '-c', CODIGO_ARRANQUE],
+        cwd=BACKEND, capture_output=True, text=True, check=True
+    )
+    return resultado.stderr
+
+
+def _importtime():
+    """
+    Líneas de -X importtime como {modulo: (propio_us, acumulado_us, nivel)}
+
+    El nivel es la profundidad en el árbol de importaciones (0 = importado
+    directamente por el código de arranque)
+    """
+    modulos = {}
+    for linea in _arrancar('-X', 'importtime').splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        propio, acumulado, nombre = linea[len('import time:'):].split('|')
+        nivel = (len(nombre) - len(nombre.lstrip()) - 1) // 2
+        modulos[nombre.strip()] = (int(propio), int(acumulado), nivel)
+    return modulos
+
+
+def _total_ms(importaciones):
+    """Tiempo total de importación: suma de los acumulados de primer nivel"""
+    return sum(acumulado for _, acumulado, nivel in importaciones.values() if nivel == 0) / 1000
+
+
+@pytest.fixture(scope='module')
+def importaciones():
+    return _importtime()
+
+
+def test_dependencias_pesadas_diferidas(importaciones):
+    cargados = sorted({
+        nombre for nombre in importaciones
+        if nombre.split('.')[0] in PAQUETES_DIFERIDOS
+    })
+    assert not cargados, f'Se importan al crear la app: {cargados}'
+
+
+def test_presupuesto_importacion(importaciones):
+    total_ms = _total_ms(importaciones)
+    mas_lentos = sorted(importaciones.items(), key=lambda item: item[1][0], reverse=True)[:10]
+    detalle = ', '.join(f'{nombre}={propio / 1000:.0f}ms' for nombre, (propio, _, _) in mas_lentos)
+    assert total_ms <= PRESUPUESTO_MS, f'Importar la app tomó {total_ms:.0f} ms (más lentos: {detalle})'
+
+
+def test_arranque_en_frio(benchmark, importaciones):
+    """Intérprete nuevo hasta create_app() terminado (lo que tarda un worker en aceptar peticiones)"""
+    benchmark.group = 'arranque'
+    benchmark.pedantic(_arrancar, rounds=5, iterations=1, warmup_rounds=1)
+    benchmark.extra_info['presupuesto_ms'] = PRESUPUESTO_MS
+    benchmark.extra_info['importacion_ms'] = round(_total_ms(importaciones))
@@ -0,0 +1,78 @@
+"""
+Costo en Python de las consultas de los listados: la construcción con Query
+por petición (como lo hacían las rutas) frente a las sentencias lambda de
+app.utils.consultas, que se construyen y compilan una sola vez.
+
+Las dos variantes devuelven las mismas filas y hacen las mismas consultas a la
+base de datos (página de 20 filas y total), así la diferencia entre grupos es
+el trabajo de SQLAlchemy por petición.
+
+Uso (desde backend/):
+    DB_NAME=distribuidora_bench pytest -c bench/pytest.ini bench/bench_consultas.py
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.database import db
+from app.models.cliente import Cliente
+from app.models.pedido import Pedido
+from app.models.producto import Producto
+from app.utils.consultas import listado_clientes, listado_pedidos, listado_productos, paginar
+
+POR_PAGINA = 20
+
+
+def _pedidos_query(fecha):
+    desde = datetime.combine(fecha - timedelta(days=30), datetime.min.time())
+    return Pedido.consulta_listado().filter(
+        Pedido.estado == 'entregado'
+    ).filter(
+        Pedido.fecha_pedido >= desde
+    ).order_by(Pedido.fecha_pedido.desc()).paginate(page=1, per_page=POR_PAGINA, error_out=False)
+
+
+def _pedidos_lambda(fecha):
+    desde = datetime.combine(fecha - timedelta(days=30), datetime.min.time())
+    return paginar(listado_pedidos(estado='entregado', desde=desde), 1, POR_PAGINA)
+
+
+CASOS = {
+    'pedidos': (_pedidos_query, _pedidos_lambda),
+    'productos': (
+        lambda _: Producto.consulta_listado().filter(Producto.activo == True).filter(
+            db.or_(Producto.nombre.ilike('%a%'), Producto.codigo.ilike('%a%'), Producto.descripcion.ilike('%a%'))
+        ).order_by(Producto.nombre).paginate(page=1, per_page=POR_PAGINA, error_out=False),
+        lambda _: paginar(listado_productos(activo=True, buscar='a'), 1, POR_PAGINA)
+    ),
+    'clientes': (
+        lambda _: Cliente.consulta_listado().filter(Cliente.activo == True)
+        .order_by(Cliente.nombre).paginate(page=1, per_page=POR_PAGINA, error_out=False),
+        lambda _: paginar(listado_clientes(activo=True), 1, POR_PAGINA)
+    )
+}
+
+
+@pytest.fixture(scope='module')
+def contexto(app):
+    with app.app_context():
+        yield
+
+
+@pytest.mark.parametrize('camino', ['query', 'lambda'])
+@pytest.mark.parametrize('listado', list(CASOS))
+def test_listado(benchmark, contexto, muestra, listado, camino):
+    benchmark.group = f'consultas-{listado}'
+    consultar = CASOS[listado][0 if camino == 'query' else 1]
+
+    pagina = benchmark(consultar, muestra['fecha'])
+    benchmark.extra_info['filas'] = len(pagina.items)
+    benchmark.extra_info['total'] = pagina.total
+
+
+@pytest.mark.parametrize('listado', list(CASOS))
+def test_mismos_resultados(contexto, muestra, listado):
+    por_query, por_lambda = (consultar(muestra['fecha']) for consultar in CASOS[listado])
+    assert por_query.total == por_lambda.total
+    assert len(por_query.items) == len(por_lambda.items)
+    assert por_query.items[0]._fields == por_lambda.items[0]._fields
@@ -0,0 +1,141 @@
+"""
+Benchmarks de los endpoints principales de la API.
+
+Uso (desde backend/):
+    DB_NAME=distribuidora_bench pytest -c bench/pytest.ini bench
+"""
+import pytest
+
+from app.utils.cache import cache_pdf
+
+
+def _get(cliente_http, url):
+    response = cliente_http.get(url)
+    assert response.status_code == 200, response.data[:300]
+    return response
+
+
+# ---------------------------------------------------------------------------
+# Listados
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize('url', [
+    '/api/pedidos/?page=1&per_page=20',
+    '/api/pedidos/?page=500&per_page=20',
+    '/api/pedidos/?estado=pendiente&per_page=50',
+    '/api/pedidos/?buscar=Cliente 00&per_page=20',
+    '/api/clientes/?per_page=20',
+    '/api/clientes/todos',
+    '/api/productos/?per_page=20',
+    '/api/productos/todos',
+    '/api/devoluciones/?per_page=20',
+    '/api/devoluciones/pendientes',
+])
+def test_listados(benchmark, cliente_http, url):
+    benchmark.group = 'listados'
+    benchmark(_get, cliente_http, url)
+
+
+# ---------------------------------------------------------------------------
+# Detalle
+# ---------------------------------------------------------------------------
+
+def test_detalle_pedido(benchmark, cliente_http, muestra):
+    benchmark.group = 'detalle'
+    benchmark(_get, cliente_http, f"/api/pedidos/{muestra['pedido_id']}")
+
+
+def test_detalle_cliente(benchmark, cliente_http, muestra):
+    benchmark.group = 'detalle'
+    benchmark(_get, cliente_http, f"/api/clientes/{muestra['cliente_id']}")
+
+
+def test_detalle_producto(benchmark, cliente_http, muestra):
+    benchmark.group = 'detalle'
+    benchmark(_get, cliente_http, f"/api/productos/{muestra['producto_id']}")
+
+
+def test_detalle_devolucion(benchmark, cliente_http, muestra):
+    benchmark.group = 'detalle'
+    benchmark(_get, cliente_http, f"/api/devoluciones/{muestra['devolucion_id']}")
+
+
+def test_alerta_devoluciones(benchmark, cliente_http, muestra):
+    benchmark.group = 'detalle'
+    benchmark(_get, cliente_http,
+              f"/api/devoluciones/cliente/{muestra['cliente_id']}/pendientes-alerta")
+
+
+# ---------------------------------------------------------------------------
+# Creación
+# ---------------------------------------------------------------------------
+
+def test_crear_pedido(benchmark, cliente_http, muestra):
+    benchmark.group = 'creacion'
+    payload = {
+        'cliente_id': muestra['cliente_id'],
+        'detalles': [
+            {'producto_id': muestra['producto_id'] + i, 'cantidad': 2}
+            for i in range(5)
+        ]
+    }
+
+    def crear():
+        response = cliente_http.post('/api/pedidos/', json=payload)
+        assert response.status_code == 201, response.get_json()
+
+    benchmark(crear)
+
+
+# ---------------------------------------------------------------------------
+# Reportes
+# ---------------------------------------------------------------------------
+
+def test_resumen_dia(benchmark, cliente_http, muestra):
+    benchmark.group = 'reportes'
+    benchmark(_get, cliente_http, f"/api/pedidos/resumen-dia?fecha={muestra['fecha']}")
+
+
+@pytest.mark.parametrize('url', [
+    '/api/pedidos/estadisticas',
+    '/api/pedidos/estadisticas?fecha_desde=2024-12-01&fecha_hasta=2024-12-31',
+    '/api/clientes/estadisticas',
+    '/api/productos/estadisticas',
+    '/api/productos/mas-vendidos',
+    '/api/devoluciones/estadisticas',
+])
+def test_estadisticas(benchmark, cliente_http, url):
+    benchmark.group = 'estadisticas'
+    benchmark(_get, cliente_http, url)
+
+
+# ---------------------------------------------------------------------------
+# PDF
+# ---------------------------------------------------------------------------
+
+def test_pdf_pedido(benchmark, cliente_http, muestra):
+    benchmark.group = 'pdf'
+    benchmark(_get, cliente_http, f"/api/pedidos/{muestra['pedido_id']}/pdf")
+
+
+def test_pdf_resumen_dia(benchmark, app, cliente_http, muestra):
+    """Los días cerrados quedan en cache_pdf: se borra antes de cada ronda para medir la generación"""
+    benchmark.group = 'pdf'
+
+    def sin_cache():
+        with app.app_context():
+            cache_pdf.eliminar(('resumen_dia', muestra['fecha']))
+
+    benchmark.pedantic(_get, args=(cliente_http, f"/api/pedidos/resumen-dia/pdf?fecha={muestra['fecha']}"),
+                       setup=sin_cache, rounds=20)
+
+
+def test_pdf_resumen_dia_cacheado(benchmark, cliente_http, muestra):
+    """Variante en caliente: después de la primera ronda se sirve desde cache_pdf"""
+    benchmark.group = 'pdf-cache'
+    benchmark(_get, cliente_http, f"/api/pedidos/resumen-dia/pdf?fecha={muestra['fecha']}")
+
+
+def test_pdf_devolucion(benchmark, cliente_http, muestra):
+    benchmark.group = 'pdf'
+    benchmark(_get, cliente_http, f"/api/devoluciones/{muestra['devolucion_id']}/pdf")
@@ -0,0 +1,81 @@
+"""
+Filas por segundo al serializar listados: objetos del ORM + to_dict() frente a
+la proyección de columnas (app.utils.serializacion), y codificación JSON con el
+módulo json (como jsonify) frente a orjson.
+
+Uso (desde backend/):
+    DB_NAME=distribuidora_bench pytest -c bench/pytest.ini bench/bench_serializacion.py
+
+Las filas por segundo quedan en extra_info de cada benchmark del reporte JSON.
+"""
+import json
+
+import pytest
+
+from app.database import db
+from app.models.cliente import Cliente
+from app.models.pedido import Pedido
+from app.models.producto import Producto
+from app.utils.serializacion import a_diccionarios
+
+FILAS = 1000
+
+CASOS = {
+    'pedidos': (
+        lambda: [p.to_dict() for p in Pedido.query.options(*Pedido.opciones_carga())
+                 .order_by(Pedido.fecha_pedido.desc()).limit(FILAS)],
+        lambda: a_diccionarios(Pedido.consulta_listado()
+                               .order_by(Pedido.fecha_pedido.desc()).limit(FILAS).all())
+    ),
+    'clientes': (
+        lambda: [c.to_dict() for c in Cliente.query.order_by(Cliente.nombre).limit(FILAS)],
+        lambda: a_diccionarios(Cliente.consulta_listado().order_by(Cliente.nombre).limit(FILAS).all())
+    ),
+    'productos': (
+        lambda: [p.to_dict() for p in Producto.query.order_by(Producto.nombre).limit(FILAS)],
+        lambda: a_diccionarios(Producto.consulta_listado().order_by(Producto.nombre).limit(FILAS).all())
+    )
+}
+
+
+@pytest.fixture(scope='module')
+def contexto(app):
+    with app.app_context():
+        yield
+
+
+def _registrar_filas(benchmark, filas):
+    benchmark.extra_info['filas'] = filas
+    benchmark.extra_info['filas_por_segundo'] = round(filas / benchmark.stats.stats.mean)
+
+
+@pytest.mark.parametrize('camino', ['to_dict', 'proyeccion'])
+@pytest.mark.parametrize('listado', list(CASOS))
+def test_serializacion(benchmark, contexto, listado, camino):
+    benchmark.group = f'serializacion-{listado}'
+    serializar = CASOS[listado][0 if camino == 'to_dict' else 1]
+
+    def ejecutar():
+        resultado = serializar()
+        # Sin esto el mapa de identidad haría más baratas las repeticiones de to_dict()
+        db.session.expunge_all()
+        return resultado
+
+    _registrar_filas(benchmark, len(benchmark(ejecutar)))
+
+
+@pytest.mark.parametrize('codificador', ['json', 'orjson'])
+def test_codificacion_json(benchmark, contexto, codificador):
+    benchmark.group = 'serializacion-json'
+    datos = CASOS['pedidos'][1]()
+
+    if codificador == 'orjson':
+        orjson = pytest.importorskip('orjson')
+        codificar = orjson.dumps
+    else:
+        # Mismas opciones que el proveedor JSON por defecto de Flask
+        def codificar(valor):
+            return json.dumps(valor, ensure_ascii=True, sort_keys=True).encode('utf-8')
+
+    benchmark(codificar, {'pedidos': datos})
+    _registrar_filas(benchmark, len(datos))
@@ -0,0 +1,87 @@
+"""
+Fixtures compartidas por los benchmarks.
+
+La base de datos se toma de las mismas variables de entorno que Config
+(DB_NAME, DB_HOST, ...) y debe haberse poblado con bench.generar_datos.
+"""
+import os
+import subprocess
+
+# Config lee el entorno al importarse. Todas las peticiones de la suite van por
+# una sola sesión: con el límite de peticiones activo el cubo del usuario se
+# vacía en pocas rondas y se medirían respuestas 429
+os.environ.setdefault('RATE_LIMIT', 'false')
+# Sin caché de respuestas (@cached): se miden los endpoints y no los aciertos,
+# comparable con las corridas anteriores a la caché
+os.environ.setdefault('CACHE_RESPUESTAS', 'false')
+
+import pytest
+from sqlalchemy import text
+
+from app import create_app
+from app.database import db
+from bench.generar_datos import ADMIN_EMAIL, ADMIN_PASSWORD
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture(scope='session')
+def cliente_http(app):
+    """Cliente HTTP con sesión de administrador iniciada"""
+    client = app.test_client()
+    response = client.post('/api/auth/login', json={
+        'email': os.environ.get('BENCH_EMAIL', ADMIN_EMAIL),
+        'password': os.environ.get('BENCH_PASSWORD', ADMIN_PASSWORD)
+    })
+    assert response.status_code == 200, response.get_json()
+    return client
+
+
+@pytest.fixture(scope='session')
+def muestra(app):
+    """Ids representativos del conjunto de datos para los endpoints de detalle"""
+    with app.app_context():
+        fila = db.session.execute(text("""
+            SELECT
+                (SELECT id FROM pedidos ORDER BY id DESC LIMIT 1 OFFSET 10) AS pedido_id,
+                (SELECT cliente_id FROM pedidos GROUP BY cliente_id
+                 ORDER BY COUNT(*) DESC LIMIT 1) AS cliente_id,
+                (SELECT id FROM productos WHERE activo ORDER BY id LIMIT 1) AS producto_id,
+                (SELECT id FROM devoluciones ORDER BY id DESC LIMIT 1) AS devolucion_id,
+                (SELECT DATE(MAX(fecha_pedido)) FROM pedidos) AS fecha
+        """)).mappings().one()
+        return dict(fila)
+
+
+def _volumenes():
+    """Contar filas por tabla para adjuntarlas al reporte"""
+    app = create_app()
+    with app.app_context():
+        volumenes = {}
+        for tabla in ['clientes', 'productos', 'pedidos', 'detalle_pedidos',
+                      'devoluciones', 'detalle_devoluciones']:
+            # reltuples es suficiente para comparar corridas y evita COUNT(*) sobre millones de filas
+            volumenes[tabla] = int(db.session.execute(text(
+                "SELECT reltuples FROM pg_class WHERE relname = :tabla"
+            ), {'tabla': tabla}).scalar() or 0)
+        return volumenes
+
+
+def pytest_benchmark_update_json(config, benchmarks, output_json):
+    """Agregar volúmenes del dataset y commit al reporte JSON de cada corrida"""
+    try:
+        output_json['dataset'] = _volumenes()
+    except Exception as e:
+        output_json['dataset'] = {'error': str(e)}
+
+    try:
+        output_json['git_describe'] = subprocess.check_output(
+            ['git', 'describe', '--always', '--dirty'], text=True
+        ).strip()
+    except Exception:
+        output_json['git_describe'] = None
@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+"""
+Generador de datos sintéticos para benchmarks.
+
+Crea un volumen configurable de clientes, productos, pedidos y devoluciones
+usando COPY masivo de PostgreSQL. Con la misma semilla siempre se genera
+exactamente el mismo conjunto de datos.
+
+Uso (desde backend/):
+    DB_NAME=distribuidora_bench python -m bench.generar_datos \\
+        --clientes 5000 --productos 2000 --pedidos 1000000 --detalles 5
+"""
+import argparse
+import random
+import sys
+import time
+from array import array
+from datetime import datetime, timedelta
+from io import StringIO
+
+from sqlalchemy import text
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from app.database import db
+
+ZONAS = [
+    'Zona Sur', 'Miraflores', 'Villa Victoria', 'Centro', 'Ceja', 'Sopocachi',
+    'San Pedro', 'Obrajes', 'Calacoto', 'Villa Fátima', 'Achumani', 'Irpavi',
+    'Villa Adela', 'Senkata', 'Rio Seco', 'Alto Lima'
+]
+CIUDADES = {'Ceja': 'El Alto', 'Villa Adela': 'El Alto', 'Senkata': 'El Alto',
+            'Rio Seco': 'El Alto', 'Alto Lima': 'El Alto'}
+UNIDADES = ['unidad', 'kg', 'caja', 'paquete', 'litro']
+TIPOS_PRODUCTO = ['Queso', 'Leche', 'Yogurt', 'Mantequilla', 'Crema', 'Quesillo']
+MOTIVOS = ['vencido', 'mal_estado', 'error_entrega', 'otro']
+
+# Filas por cada llamada a COPY
+TAMANO_LOTE = 50000
+
+# Credenciales usadas también por los benchmarks
+ADMIN_EMAIL = 'admin@carolina.com'
+ADMIN_PASSWORD = 'admin123'
+
+
+def _valor(v):
+    """Formatear un valor para el formato de texto de COPY"""
+    if v is None:
+        return '\\N'
+    if isinstance(v, bool):
+        return 't' if v else 'f'
+    if isinstance(v, float):
+        return f'{v:.2f}'
+    if isinstance(v, datetime):
+        return v.strftime('%Y-%m-%d %H:%M:%S')
+    return str(v)
+
+
+class CopyWriter:
+    """Acumula filas en memoria y las envía con COPY por lotes"""
+
+    def __init__(self, cursor, tabla, columnas, lote=TAMANO_LOTE):
+        self.cursor = cursor
+        self.tabla = tabla
+        self.columnas = columnas
+        self.lote = lote
+        self.buffer = StringIO()
+        self.filas = 0
+        self.total = 0
+
+    def agregar(self, *valores):
+        self.buffer.write('\t'.join(_valor(v) for v in valores))
+        self.buffer.write('\n')
+        self.filas += 1
+        if self.lote and self.filas >= self.lote:
+            self.enviar()
+
+    def enviar(self):
+        if not self.filas:
+            return
+        self.buffer.seek(0)
+        self.cursor.copy_expert(
+            f"COPY {self.tabla} ({', '.join(self.columnas)}) FROM STDIN",
+            self.buffer
+        )
+        self.total += self.filas
+        self.buffer = StringIO()
+        self.filas = 0
+
+
+def _reiniciar_esquema():
+    """Eliminar y recrear todas las tablas (igual que init_db.py)"""
+    db.session.execute(text('DROP SCHEMA public CASCADE'))
+    db.session.execute(text('CREATE SCHEMA public'))
+    db.session.commit()
+    db.create_all()
+
+
+def _generar_usuarios(cursor, ahora):
+    writer = CopyWriter(cursor, 'usuarios', [
+        'id', 'nombre', 'email', 'password_hash', 'rol', 'activo', 'fecha_creacion'
+    ])
+    writer.agregar(1, 'Administrador', ADMIN_EMAIL,
+                   generate_password_hash(ADMIN_PASSWORD), 'admin', True, ahora)
+    writer.agregar(2, 'Ana Perez', 'ana@carolina.com',
+                   generate_password_hash('vendedor123'), 'vendedor', True, ahora)
+    writer.enviar()
+    return [1, 2]
+
+
+def _generar_clientes(cursor, rnd, total, ahora):
+    writer = CopyWriter(cursor, 'clientes', [
+        'id', 'nombre', 'celular', 'direccion', 'zona', 'ciudad', 'activo', 'fecha_registro'
+    ])
+    for i in range(1, total + 1):
+        zona = rnd.choice(ZONAS)
+        writer.agregar(
+            i,
+            f'Cliente {i:05d}',
+            f'{rnd.choice("67")}{rnd.randint(0, 9999999):07d}',
+            f'Calle {rnd.randint(1, 90)} #{rnd.randint(1, 2000)}',
+            zona,
+            CIUDADES.get(zona, 'La Paz'),
+            rnd.random() > 0.03,
+            ahora - timedelta(days=rnd.randint(0, 1500))
+        )
+    writer.enviar()
+    return writer.total
+
+
+def _generar_productos(cursor, rnd, total, ahora):
+    writer = CopyWriter(cursor, 'productos', [
+        'id', 'codigo', 'nombre', 'descripcion', 'unidad_medida', 'precio_venta',
+        'stock_actual', 'stock_minimo', 'activo', 'fecha_creacion'
+    ])
+    precios = array('d', [0.0])
+    for i in range(1, total + 1):
+        tipo = rnd.choice(TIPOS_PRODUCTO)
+        precio = round(rnd.uniform(5, 120), 2)
+        precios.append(precio)
+        writer.agregar(
+            i,
+            f'PROD-{i:05d}',
+            f'{tipo} {i:05d}',
+            f'{tipo} de prueba generado para benchmarks',
+            rnd.choice(UNIDADES),
+            precio,
+            rnd.randint(0, 5000),
+            rnd.randint(5, 50),
+            rnd.random() > 0.02,
+            ahora - timedelta(days=rnd.randint(0, 1500))
+        )
+    writer.enviar()
+    return precios
+
+
+def _generar_pedidos(cursor, rnd, total, detalles_promedio, total_clientes,
+                     precios, usuarios, dias, ahora):
+    """Generar pedidos y sus detalles; devuelve cliente y fecha de cada pedido"""
+    pedidos = CopyWriter(cursor, 'pedidos', [
+        'id', 'numero_pedido', 'cliente_id', 'usuario_id', 'fecha_pedido', 'subtotal',
+        'descuento', 'total', 'estado', 'observaciones', 'fecha_entrega'
+    ], lote=None)
+    detalles = CopyWriter(cursor, 'detalle_pedidos', [
+        'id', 'pedido_id', 'producto_id', 'cantidad', 'precio_unitario', 'subtotal'
+    ], lote=None)
+
+    inicio = (ahora - timedelta(days=dias)).replace(hour=0, minute=0, second=0, microsecond=0)
+    total_productos = len(precios) - 1
+    clientes_pedido = array('i', [0])
+    fechas_pedido = array('d', [0.0])
+
+    detalle_id = 0
+    dia_actual = None
+    correlativo = 0
+
+    for pedido_id in range(1, total + 1):
+        # Los pedidos se reparten en orden cronológico a lo largo del rango
+        dia = inicio + timedelta(days=(pedido_id - 1) * dias // total)
+        if dia != dia_actual:
+            dia_actual = dia
+            correlativo = 0
+        correlativo += 1
+        fecha = dia + timedelta(seconds=rnd.randint(7 * 3600, 19 * 3600))
+
+        cliente_id = rnd.randint(1, total_clientes)
+        dias_atras = (ahora - fecha).days
+        if dias_atras <= 1:
+            estado = 'pendiente'
+        else:
+            r = rnd.random()
+            estado = 'entregado' if r < 0.88 else ('cancelado' if r < 0.96 else 'pendiente')
+
+        lineas = max(1, int(rnd.gauss(detalles_promedio, detalles_promedio / 3)))
+        subtotal = 0.0
+        for producto_id in rnd.sample(range(1, total_productos + 1), min(lineas, total_productos)):
+            cantidad = float(rnd.randint(1, 30))
+            precio = precios[producto_id]
+            subtotal_detalle = round(cantidad * precio, 2)
+            subtotal += subtotal_detalle
+            detalle_id += 1
+            detalles.agregar(detalle_id, pedido_id, producto_id, cantidad, precio, subtotal_detalle)
+
+        descuento = round(subtotal * 0.05, 2) if rnd.random() < 0.1 else 0.0
+        pedidos.agregar(
+            pedido_id,
+            f'PED-{dia.strftime("%Y%m%d")}-{correlativo:03d}',
+            cliente_id,
+            rnd.choice(usuarios),
+            fecha,
+            round(subtotal, 2),
+            descuento,
+            round(subtotal - descuento, 2),
+            estado,
+            None,
+            (fecha + timedelta(days=1)).date()
+        )
+        clientes_pedido.append(cliente_id)
+        fechas_pedido.append(fecha.timestamp())
+
+        # Los pedidos deben existir antes que sus detalles (llave foránea)
+        if detalles.filas >= TAMANO_LOTE:
+            pedidos.enviar()
+            detalles.enviar()
+
+    pedidos.enviar()
+    detalles.enviar()
+    return clientes_pedido, fechas_pedido, detalles.total
+
+
+def _generar_devoluciones(cursor, rnd, total, clientes_pedido, fechas_pedido,
+                          total_productos, usuarios, ahora):
+    devoluciones = CopyWriter(cursor, 'devoluciones', [
+        'id', 'numero_devolucion', 'pedido_id', 'cliente_id', 'usuario_id', 'fecha_devolucion',
+        'motivo', 'descripcion_motivo', 'estado', 'pedido_compensacion_id',
+        'fecha_compensacion', 'observaciones'
+    ], lote=None)
+    detalles = CopyWriter(cursor, 'detalle_devoluciones', [
+        'id', 'devolucion_id', 'producto_id', 'cantidad', 'producto_reemplazo_id', 'observacion'
+    ], lote=None)
+
+    total_pedidos = len(clientes_pedido) - 1
+    # Se eligen los pedidos de antemano para numerar las devoluciones por día
+    origenes = sorted(rnd.randint(1, total_pedidos) for _ in range(total))
+    correlativos = {}
+    detalle_id = 0
+
+    for devolucion_id, pedido_id in enumerate(origenes, start=1):
+        fecha = datetime.fromtimestamp(fechas_pedido[pedido_id]) + timedelta(
+            days=rnd.randint(1, 3), hours=rnd.randint(0, 4)
+        )
+        if fecha > ahora:
+            fecha = ahora
+        fecha_str = fecha.strftime('%Y%m%d')
+        correlativos[fecha_str] = correlativos.get(fecha_str, 0) + 1
+
+        pendiente = (ahora - fecha).days <= 7 or rnd.random() < 0.05
+        devoluciones.agregar(
+            devolucion_id,
+            f'DEV-{fecha_str}-{correlativos[fecha_str]:03d}',
+            pedido_id,
+            clientes_pedido[pedido_id],
+            rnd.choice(usuarios),
+            fecha,
+            rnd.choice(MOTIVOS),
+            None,
+            'pendiente' if pendiente else 'compensado',
+            None,
+            None if pendiente else fecha + timedelta(days=2),
+            None
+        )
+
+        for _ in range(rnd.randint(1, 3)):
+            detalle_id += 1
+            detalles.agregar(
+                detalle_id,
+                devolucion_id,
+                rnd.randint(1, total_productos),
+                float(rnd.randint(1, 5)),
+                rnd.randint(1, total_productos) if rnd.random() < 0.5 else None,
+                None
+            )
+
+        if detalles.filas >= TAMANO_LOTE:
+            devoluciones.enviar()
+            detalles.enviar()
+
+    devoluciones.enviar()
+    detalles.enviar()
+    return detalles.total
+
+
+def _actualizar_secuencias(cursor):
+    """Alinear las secuencias SERIAL con los ids insertados explícitamente"""
+    for tabla in ['usuarios', 'clientes', 'productos', 'pedidos', 'detalle_pedidos',
+                  'devoluciones', 'detalle_devoluciones']:
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {tabla}), 0) + 1, false)"
+        )
+
+
+def generar(clientes, productos, pedidos, detalles, devoluciones, dias, semilla, reiniciar=True):
+    """Generar el conjunto de datos completo; devuelve los volúmenes creados"""
+    rnd = random.Random(semilla)
+    # Fecha de referencia fija para que la semilla reproduzca los mismos datos
+    ahora = datetime(2024, 12, 31, 20, 0, 0)
+
+    app = create_app()
+    with app.app_context():
+        if reiniciar:
+            print("Recreando esquema...")
+            _reiniciar_esquema()
+
+        conexion = db.engine.raw_connection()
+        try:
+            cursor = conexion.cursor()
+            inicio = time.perf_counter()
+
+            usuarios = _generar_usuarios(cursor, ahora)
+            print(f"Clientes: {clientes}")
+            _generar_clientes(cursor, rnd, clientes, ahora)
+            print(f"Productos: {productos}")
+            precios = _generar_productos(cursor, rnd, productos, ahora)
+            print(f"Pedidos: {pedidos} (~{detalles} detalles por pedido)")
+            clientes_pedido, fechas_pedido, total_detalles = _generar_pedidos(
+                cursor, rnd, pedidos, detalles, clientes, precios, usuarios, dias, ahora
+            )
+            print(f"Devoluciones: {devoluciones}")
+            total_detalles_dev = _generar_devoluciones(
+                cursor, rnd, devoluciones, clientes_pedido, fechas_pedido,
+                productos, usuarios, ahora
+            ) if devoluciones else 0
+
+            _actualizar_secuencias(cursor)
+            conexion.commit()
+
+            cursor.execute('ANALYZE')
+            conexion.commit()
+            duracion = time.perf_counter() - inicio
+        finally:
+            conexion.close()
+
+    resultado = {
+        'semilla': semilla,
+        'clientes': clientes,
+        'productos': productos,
+        'pedidos': pedidos,
+        'detalle_pedidos': total_detalles,
+        'devoluciones': devoluciones,
+        'detalle_devoluciones': total_detalles_dev,
+        'dias': dias,
+        'segundos': round(duracion, 1)
+    }
+    print(f"\nDatos generados en {resultado['segundos']} s")
+    return resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generar datos sintéticos para benchmarks')
+    parser.add_argument('--clientes', type=int, default=5000)
+    parser.add_argument('--productos', type=int, default=2000)
+    parser.add_argument('--pedidos', type=int, default=1000000)
+    parser.add_argument('--detalles', type=int, default=5,
+                        help='Promedio de líneas por pedido')
+    parser.add_argument('--devoluciones', type=int, default=20000)
+    parser.add_argument('--dias', type=int, default=730,
+                        help='Días de historial sobre los que se reparten los pedidos')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--sin-reiniciar', action='store_true',
+                        help='No eliminar el esquema existente')
+    args = parser.parse_args(argv)
+
+    generar(
+        clientes=args.clientes,
+        productos=args.productos,
+        pedidos=args.pedidos,
+        detalles=args.detalles,
+        devoluciones=args.devoluciones,
+        dias=args.dias,
+        semilla=args.semilla,
+        reiniciar=not args.sin_reiniciar
+    )
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except Exception as e:
+        print("\nError al generar datos: {}".format(str(e)))
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,92 @@
+"""
+Escenario de carga con Locust que imita un día de trabajo.
+
+Uso (desde backend/, con el servidor corriendo sobre la base de benchmarks):
+    locust -f bench/locustfile.py --host http://localhost:5000 \\
+        --headless -u 50 -r 5 -t 2m --json > bench/resultados/locust.json
+"""
+import os
+import random
+
+from locust import HttpUser, between, task
+
+from bench.generar_datos import ADMIN_EMAIL, ADMIN_PASSWORD
+
+TOTAL_CLIENTES = int(os.environ.get('BENCH_CLIENTES', 5000))
+TOTAL_PRODUCTOS = int(os.environ.get('BENCH_PRODUCTOS', 2000))
+TOTAL_PEDIDOS = int(os.environ.get('BENCH_PEDIDOS', 1000000))
+FECHA_RESUMEN = os.environ.get('BENCH_FECHA', '2024-12-31')
+
+
+class Vendedor(HttpUser):
+    """Vendedor que consulta listados, revisa clientes y registra pedidos"""
+    wait_time = between(1, 3)
+
+    def on_start(self):
+        self.client.post('/api/auth/login', json={
+            'email': os.environ.get('BENCH_EMAIL', ADMIN_EMAIL),
+            'password': os.environ.get('BENCH_PASSWORD', ADMIN_PASSWORD)
+        })
+
+    @task(10)
+    def listar_pedidos(self):
+        self.client.get(f'/api/pedidos/?page={random.randint(1, 50)}&per_page=20',
+                        name='/api/pedidos/')
+
+    @task(5)
+    def detalle_pedido(self):
+        self.client.get(f'/api/pedidos/{random.randint(1, TOTAL_PEDIDOS)}',
+                        name='/api/pedidos/[id]')
+
+    @task(5)
+    def detalle_cliente(self):
+        cliente_id = random.randint(1, TOTAL_CLIENTES)
+        self.client.get(f'/api/clientes/{cliente_id}', name='/api/clientes/[id]')
+        self.client.get(f'/api/devoluciones/cliente/{cliente_id}/pendientes-alerta',
+                        name='/api/devoluciones/cliente/[id]/pendientes-alerta')
+
+    @task(3)
+    def selectores(self):
+        self.client.get('/api/clientes/todos')
+        self.client.get('/api/productos/todos')
+
+    @task(2)
+    def crear_pedido(self):
+        productos = random.sample(range(1, TOTAL_PRODUCTOS + 1), 5)
+        self.client.post('/api/pedidos/', json={
+            'cliente_id': random.randint(1, TOTAL_CLIENTES),
+            'detalles': [{'producto_id': p, 'cantidad': random.randint(1, 10)} for p in productos]
+        })
+
+
+class Supervisor(HttpUser):
+    """Supervisor que revisa reportes, estadísticas y PDFs"""
+    wait_time = between(3, 8)
+    weight = 1
+
+    def on_start(self):
+        self.client.post('/api/auth/login', json={
+            'email': os.environ.get('BENCH_EMAIL', ADMIN_EMAIL),
+            'password': os.environ.get('BENCH_PASSWORD', ADMIN_PASSWORD)
+        })
+
+    @task(4)
+    def resumen_dia(self):
+        self.client.get(f'/api/pedidos/resumen-dia?fecha={FECHA_RESUMEN}',
+                        name='/api/pedidos/resumen-dia')
+
+    @task(4)
+    def estadisticas(self):
+        self.client.get('/api/pedidos/estadisticas')
+        self.client.get('/api/devoluciones/estadisticas')
+        self.client.get('/api/productos/mas-vendidos')
+
+    @task(1)
+    def pdf_resumen(self):
+        self.client.get(f'/api/pedidos/resumen-dia/pdf?fecha={FECHA_RESUMEN}',
+                        name='/api/pedidos/resumen-dia/pdf')
+
+    @task(1)
+    def pdf_pedido(self):
+        self.client.get(f'/api/pedidos/{random.randint(1, TOTAL_PEDIDOS)}/pdf',
+                        name='/api/pedidos/[id]/pdf')
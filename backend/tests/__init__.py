@@ -0,0 +1 @@
+# Pruebas de integración de Distribuidora Carolina (necesitan PostgreSQL, ver conftest.py)
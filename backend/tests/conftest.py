@@ -0,0 +1,111 @@
+"""
+Fixtures de las pruebas de integración.
+
+Necesitan PostgreSQL: se usa la base DB_NAME (por defecto distribuidora_test)
+y pytest (bench/requirements.txt). Las tablas se crean al iniciar la
+app y se vacían después de cada prueba. Desde backend/:
+
+    createdb distribuidora_test
+    pytest tests
+"""
+import os
+import tempfile
+
+# Config lee el entorno al importarse: fijar los valores de prueba antes de importar la app
+os.environ.setdefault('DB_NAME', 'distribuidora_test')
+os.environ.setdefault('BCRYPT_COSTE', '4')
+os.environ.setdefault('RATE_LIMIT', 'false')
+os.environ.setdefault('CACHE_RESPUESTAS', 'false')
+os.environ.setdefault('CACHE_RESPUESTAS_COMPARTIDA', 'false')
+os.environ.setdefault('CACHE_DIR', tempfile.mkdtemp(prefix='distribuidora_cache_'))
+
+import pytest
+from sqlalchemy import text
+
+from app import create_app
+from app.database import db
+from app.models.archivo import TABLAS_ARCHIVO
+from app.models.cliente import Cliente
+from app.models.producto import Producto
+from app.models.usuario import Usuario
+from app.utils.cache import cache, cache_pdf, cache_respuestas, cache_compartido
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture(autouse=True)
+def base_limpia(app):
+    """Vaciar tablas y cachés después de cada prueba"""
+    yield
+    with app.app_context():
+        tablas = [tabla.name for tabla in db.metadata.sorted_tables] + TABLAS_ARCHIVO
+        db.session.execute(text(f"TRUNCATE {', '.join(tablas)} RESTART IDENTITY CASCADE"))
+        db.session.commit()
+
+        cache.limpiar()
+        cache_respuestas.limpiar()
+        cache_compartido.limpiar()
+        cache_pdf.limpiar()
+
+
+class Fabrica:
+    """Crear filas de prueba directamente en la base; cada método devuelve el id"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _guardar(self, objeto):
+        with self.app.app_context():
+            db.session.add(objeto)
+            db.session.commit()
+            return objeto.id
+
+    def usuario(self, email='admin@prueba.com', rol='admin', password='clave123'):
+        with self.app.app_context():
+            usuario = Usuario(nombre='Usuario de prueba', email=email, rol=rol)
+            usuario.set_password(password)
+        return self._guardar(usuario)
+
+    def cliente(self, nombre='Tienda de prueba', **campos):
+        return self._guardar(Cliente(nombre=nombre, **campos))
+
+    def producto(self, nombre='Producto de prueba', precio_venta=10, stock_actual=100, **campos):
+        return self._guardar(Producto(nombre=nombre, precio_venta=precio_venta,
+                                      stock_actual=stock_actual, **campos))
+
+
+@pytest.fixture
+def fabrica(app):
+    return Fabrica(app)
+
+
+@pytest.fixture
+def cliente_http(app, fabrica):
+    """Cliente HTTP con sesión de administrador"""
+    usuario_id = fabrica.usuario()
+    client = app.test_client()
+    with client.session_transaction() as sesion:
+        sesion['user_id'] = usuario_id
+        sesion['user_name'] = 'Usuario de prueba'
+        sesion['user_role'] = 'admin'
+    return client
+
+
+@pytest.fixture
+def crear_pedido(cliente_http):
+    """Crear un pedido por la API; detalles como [(producto_id, cantidad), ...]"""
+    def crear(cliente_id, detalles, **campos):
+        response = cliente_http.post('/api/pedidos/', json={
+            'cliente_id': cliente_id,
+            'detalles': [{'producto_id': producto_id, 'cantidad': cantidad}
+                         for producto_id, cantidad in detalles],
+            **campos
+        })
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()['pedido']
+    return crear
@@ -0,0 +1,107 @@
+"""Pedidos archivados (pedidos_archivo, detalle_pedidos_archivo)"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from app.commands import consultas_mes_actual, lecturas_plan
+from app.database import db
+from app.models.archivo import archivar_pedidos, TABLAS_ARCHIVO
+
+FECHA_ANTIGUA = datetime(2020, 3, 10, 9, 30)
+
+
+@pytest.fixture
+def archivar(app, cliente_http):
+    """Entregar un pedido, moverlo a FECHA_ANTIGUA y archivarlo"""
+    def archivar_pedido(pedido):
+        response = cliente_http.patch(f"/api/pedidos/{pedido['id']}/cambiar-estado", json={'estado': 'entregado'})
+        assert response.status_code == 200
+
+        with app.app_context():
+            db.session.execute(text('UPDATE pedidos SET fecha_pedido = :fecha WHERE id = :id'),
+                               {'fecha': FECHA_ANTIGUA, 'id': pedido['id']})
+            assert archivar_pedidos(datetime(2020, 1, 1), datetime(2021, 1, 1)) == 1
+            db.session.commit()
+    return archivar_pedido
+
+
+def test_no_elimina_producto_con_pedidos_archivados(fabrica, cliente_http, crear_pedido, archivar):
+    producto_id = fabrica.producto()
+    archivar(crear_pedido(fabrica.cliente(), [(producto_id, 1)]))
+
+    response = cliente_http.delete(f'/api/productos/{producto_id}')
+    assert response.status_code == 400
+    assert response.get_json()['pedidos_relacionados'] == 1
+
+
+def test_no_elimina_cliente_con_pedidos_archivados(fabrica, cliente_http, crear_pedido, archivar):
+    cliente_id = fabrica.cliente()
+    archivar(crear_pedido(cliente_id, [(fabrica.producto(), 1)]))
+
+    response = cliente_http.delete(f'/api/clientes/{cliente_id}')
+    assert response.status_code == 400
+    assert response.get_json()['pedidos'] == 1
+
+
+def test_elimina_producto_sin_pedidos(fabrica, cliente_http):
+    producto_id = fabrica.producto()
+
+    response = cliente_http.delete(f'/api/productos/{producto_id}')
+    assert response.status_code == 200
+
+
+def test_pedido_archivado_se_sigue_leyendo(fabrica, cliente_http, crear_pedido, archivar):
+    cliente_id = fabrica.cliente()
+    producto_id = fabrica.producto(precio_venta=10)
+    pedido = crear_pedido(cliente_id, [(producto_id, 3)])
+    archivar(pedido)
+
+    datos = cliente_http.get(f"/api/pedidos/{pedido['id']}").get_json()['pedido']
+    assert datos['archivado'] is True
+    assert datos['estado'] == 'entregado'
+    assert datos['fecha_pedido'] == '10/03/2020 09:30'
+    assert [(d['producto_id'], d['cantidad'], d['subtotal']) for d in datos['detalles']] == [(producto_id, 3.0, 30.0)]
+
+    historial = cliente_http.get(f'/api/clientes/{cliente_id}/historial-pedidos').get_json()
+    assert [p['id'] for p in historial['pedidos']] == [pedido['id']]
+
+
+def test_reportes_incluyen_pedidos_archivados(fabrica, cliente_http, crear_pedido, archivar):
+    cliente_id = fabrica.cliente(nombre='Cliente archivado')
+    producto_id = fabrica.producto(precio_venta=10)
+    archivar(crear_pedido(cliente_id, [(producto_id, 3)]))
+    crear_pedido(cliente_id, [(producto_id, 1)])
+
+    estadisticas = cliente_http.get('/api/pedidos/estadisticas').get_json()
+    assert estadisticas['total_pedidos'] == 2
+    assert estadisticas['entregados'] == 1
+    assert estadisticas['pendientes'] == 1
+    assert estadisticas['total_vendido'] == 30.0
+
+    mas_vendidos = cliente_http.get('/api/productos/mas-vendidos').get_json()['productos']
+    assert [(p['id'], p['total_vendido']) for p in mas_vendidos] == [(producto_id, 4.0)]
+
+    producto = cliente_http.get(f'/api/productos/{producto_id}').get_json()
+    assert producto['estadisticas'] == {'veces_vendido': 2, 'total_vendido': 4.0}
+
+    resumen = cliente_http.get('/api/pedidos/resumen-dia?fecha=2020-03-10').get_json()
+    assert resumen['total_pedidos'] == 1
+    assert resumen['total_general'] == 30.0
+    assert resumen['resumen'][0]['cliente_nombre'] == 'Cliente archivado'
+    assert resumen['resumen'][0]['productos'][0]['cantidad'] == 3.0
+
+
+def test_consultas_del_mes_no_recorren_el_archivo(app, fabrica, crear_pedido, archivar):
+    """Lo mismo que flask jobs verificar-archivo, sin depender del volumen de datos"""
+    archivar(crear_pedido(fabrica.cliente(), [(fabrica.producto(), 1)]))
+
+    with app.app_context():
+        # Con tablas chicas el planificador prefiere Seq Scan aunque haya índice:
+        # desactivarlo deja Seq Scan solo donde ningún índice sirve al filtro
+        db.session.execute(text('SET LOCAL enable_seqscan = off'))
+
+        for nombre, (sql, params) in consultas_mes_actual().items():
+            lecturas = lecturas_plan(sql, params)
+            assert any(tabla in TABLAS_ARCHIVO for tabla, _ in lecturas), nombre
+            assert [(tabla, tipo) for tabla, tipo in lecturas if tipo == 'Seq Scan'] == [], nombre
@@ -0,0 +1,46 @@
+"""Caché de respuestas (@cached) sobre endpoints que leen de la réplica"""
+import time
+
+import pytest
+from flask import g, jsonify, session
+
+from app.utils.decorators import cached, lectura_replica
+
+
+@pytest.fixture
+def origen(app, monkeypatch):
+    """Endpoint cacheado que responde de dónde leyó; sin consultas, la réplica no existe"""
+    monkeypatch.setitem(app.config, 'CACHE_RESPUESTAS', True)
+    monkeypatch.setitem(app.config, 'SQLALCHEMY_BINDS',
+                        {**app.config.get('SQLALCHEMY_BINDS', {}), 'replica': 'postgresql:///replica'})
+
+    @cached(tags=['pedidos'])
+    @lectura_replica
+    def endpoint():
+        return jsonify({'replica': g.leer_de_replica})
+
+    def pedir(recien_escribio=False):
+        with app.test_request_context('/api/pedidos/estadisticas'):
+            if recien_escribio:
+                session['ultima_escritura'] = time.time()
+            return endpoint()
+    return pedir
+
+
+def test_quien_acaba_de_escribir_no_recibe_la_respuesta_de_la_replica(origen):
+    replica = origen()
+    assert replica.get_json() == {'replica': True}
+    assert replica.headers['X-Origen-Datos'] == 'replica'
+
+    primaria = origen(recien_escribio=True)
+    assert primaria.headers['X-Cache'] == 'MISS'
+    assert primaria.get_json() == {'replica': False}
+    assert primaria.headers['X-Origen-Datos'] == 'primaria'
+
+
+def test_respuesta_cacheada_informa_el_origen_de_la_peticion(origen):
+    origen(recien_escribio=True)
+
+    cacheada = origen(recien_escribio=True)
+    assert cacheada.headers['X-Cache'] == 'HIT'
+    assert cacheada.headers.getlist('X-Origen-Datos') == ['primaria']
@@ -0,0 +1,38 @@
+"""Pool de hash de contraseñas saturado: 503 con Retry-After"""
+import time
+
+import pytest
+
+from app.models import usuario as modelo_usuario
+from app.utils.contrasenas import HashSaturado, en_pool
+
+
+@pytest.fixture
+def hash_lento(app, monkeypatch):
+    """El hash tarda más que HASH_TIEMPO_MAXIMO"""
+    monkeypatch.setitem(app.config, 'HASH_TIEMPO_MAXIMO', 0.05)
+    monkeypatch.setattr(modelo_usuario, 'generar_hash', lambda password, coste: time.sleep(0.3))
+
+
+def test_tiempo_agotado_es_hash_saturado(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'HASH_TIEMPO_MAXIMO', 0.05)
+    with app.app_context():
+        with pytest.raises(HashSaturado):
+            en_pool(time.sleep, 0.3)
+
+
+def test_crear_usuario_con_hash_saturado_responde_503(cliente_http, hash_lento):
+    response = cliente_http.post('/api/usuarios/', json={
+        'nombre': 'Vendedor', 'email': 'vendedor@prueba.com', 'password': 'clave123'
+    })
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '2'
+    assert response.get_json() == {'error': 'Servidor ocupado, intente nuevamente en unos segundos'}
+
+
+def test_cambiar_password_con_hash_saturado_responde_503(cliente_http, hash_lento):
+    response = cliente_http.patch('/api/usuarios/cambiar-password', json={
+        'password_actual': 'clave123', 'password_nueva': 'nueva123'
+    })
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '2'
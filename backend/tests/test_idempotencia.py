@@ -0,0 +1,100 @@
+"""Idempotency-Key en la creación de pedidos"""
+import hashlib
+import json
+
+import pytest
+from sqlalchemy import text
+
+from app.database import db
+from app.models.idempotencia import ClaveIdempotencia
+from app.models.pedido import Pedido
+
+ENDPOINT = 'pedidos.crear_pedido'
+
+
+@pytest.fixture
+def usuario_id(cliente_http):
+    with cliente_http.session_transaction() as sesion:
+        return sesion['user_id']
+
+
+@pytest.fixture
+def cuerpo(fabrica):
+    return json.dumps({'cliente_id': fabrica.cliente(), 'detalles': [{'producto_id': fabrica.producto(), 'cantidad': 1}]})
+
+
+def enviar(cliente_http, cuerpo, clave='clave-1'):
+    return cliente_http.post('/api/pedidos/', data=cuerpo, content_type='application/json',
+                             headers={'Idempotency-Key': clave})
+
+
+def reservar(app, usuario_id, cuerpo, antiguedad_segundos=0):
+    """Reserva sin respuesta, como la deja un worker que terminó antes de confirmar"""
+    with app.app_context():
+        ClaveIdempotencia.reservar(usuario_id, 'clave-1', ENDPOINT, hashlib.sha256(cuerpo.encode('utf-8')).hexdigest())
+        reserva = db.session.execute(text(
+            "UPDATE claves_idempotencia SET fecha_creacion = fecha_creacion - make_interval(secs => :segundos) "
+            "RETURNING fecha_creacion"
+        ), {'segundos': antiguedad_segundos}).scalar()
+        db.session.commit()
+        return reserva
+
+
+def contar_pedidos(app):
+    with app.app_context():
+        return Pedido.query.count()
+
+
+def test_reintento_repite_la_respuesta_guardada(app, cliente_http, cuerpo, usuario_id):
+    original = enviar(cliente_http, cuerpo)
+    assert original.status_code == 201
+
+    with app.app_context():
+        guardada = db.session.get(ClaveIdempotencia, (usuario_id, 'clave-1'))
+        assert guardada.codigo_estado == 201
+
+    reintento = enviar(cliente_http, cuerpo)
+    assert reintento.status_code == 201
+    assert reintento.headers['Idempotent-Replayed'] == 'true'
+    assert reintento.get_json() == original.get_json()
+    assert contar_pedidos(app) == 1
+
+
+def test_reserva_reciente_sin_respuesta_responde_409(app, cliente_http, cuerpo, usuario_id):
+    reservar(app, usuario_id, cuerpo)
+
+    response = enviar(cliente_http, cuerpo)
+    assert response.status_code == 409
+    assert contar_pedidos(app) == 0
+
+
+def test_reserva_abandonada_se_vuelve_a_tomar(app, cliente_http, cuerpo, usuario_id):
+    reservar(app, usuario_id, cuerpo, antiguedad_segundos=app.config['IDEMPOTENCIA_RESERVA_SEGUNDOS'] + 5)
+
+    response = enviar(cliente_http, cuerpo)
+    assert response.status_code == 201
+    assert contar_pedidos(app) == 1
+
+
+def test_reserva_tomada_por_otro_no_guarda_respuesta(app, cuerpo, usuario_id):
+    antigua = reservar(app, usuario_id, cuerpo, antiguedad_segundos=app.config['IDEMPOTENCIA_RESERVA_SEGUNDOS'] + 5)
+
+    with app.app_context():
+        existente, nueva = ClaveIdempotencia.reservar(usuario_id, 'clave-1', ENDPOINT, 'x' * 64)
+        assert existente is None
+
+        # La petición original termina tarde: su reserva ya no es la vigente
+        assert not ClaveIdempotencia.guardar_respuesta(usuario_id, 'clave-1', antigua, 201, '{}')
+        assert ClaveIdempotencia.guardar_respuesta(usuario_id, 'clave-1', nueva, 201, '{}')
+        db.session.commit()
+
+
+def test_sincronizacion_toma_reserva_abandonada(app, cliente_http, cuerpo, usuario_id):
+    reservar(app, usuario_id, cuerpo, antiguedad_segundos=app.config['IDEMPOTENCIA_RESERVA_SEGUNDOS'] + 5)
+
+    response = cliente_http.post('/api/sincronizacion/', json={
+        'operaciones': [{'clave': 'clave-1', 'tipo': 'pedido', 'cuerpo': cuerpo}]
+    })
+    assert response.status_code == 200
+    assert response.get_json()['resultados'][0]['estado'] == 'aplicada'
+    assert contar_pedidos(app) == 1
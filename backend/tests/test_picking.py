@@ -0,0 +1,30 @@
+"""Lista de preparación (/api/pedidos/picking)"""
+
+
+def producto_picking(cliente_http, producto_id):
+    data = cliente_http.get('/api/pedidos/picking').get_json()
+    return data, next(p for p in data['productos'] if p['producto_id'] == producto_id)
+
+
+def test_stock_justo_no_tiene_faltante(fabrica, cliente_http, crear_pedido):
+    cliente_id = fabrica.cliente()
+    producto_id = fabrica.producto(stock_actual=5)
+    crear_pedido(cliente_id, [(producto_id, 3)])
+    crear_pedido(cliente_id, [(producto_id, 2)])
+
+    data, producto = producto_picking(cliente_http, producto_id)
+    assert producto['cantidad'] == 5
+    assert producto['stock_actual'] == 0
+    assert producto['faltante'] == 0
+    assert data['productos_con_faltante'] == 0
+
+
+def test_faltante_es_lo_que_el_stock_no_cubre(fabrica, cliente_http, crear_pedido):
+    cliente_id = fabrica.cliente()
+    producto_id = fabrica.producto(stock_actual=5)
+    crear_pedido(cliente_id, [(producto_id, 7)])
+
+    data, producto = producto_picking(cliente_http, producto_id)
+    assert producto['stock_actual'] == -2
+    assert producto['faltante'] == 2
+    assert data['productos_con_faltante'] == 1
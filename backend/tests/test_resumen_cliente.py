@@ -0,0 +1,55 @@
+"""Resumen materializado de clientes (resumen_clientes) tras escribir pedidos"""
+import pytest
+
+from app.database import db
+from app.models.resumen_cliente import ResumenCliente
+
+
+@pytest.fixture(autouse=True)
+def resumen_materializado(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'CLIENTES_RESUMEN_MATERIALIZADO', True)
+
+
+def leer_resumen(app, cliente_id):
+    """Fila de resumen_clientes tal como quedó guardada"""
+    with app.app_context():
+        return db.session.get(ResumenCliente, cliente_id).to_dict()
+
+
+def test_cancelar_pedido_actualiza_resumen(app, fabrica, cliente_http, crear_pedido):
+    cliente_id = fabrica.cliente()
+    producto_id = fabrica.producto(precio_venta=10)
+    pedido = crear_pedido(cliente_id, [(producto_id, 2)])
+
+    response = cliente_http.patch(f"/api/pedidos/{pedido['id']}/cambiar-estado", json={'estado': 'entregado'})
+    assert response.status_code == 200
+    assert leer_resumen(app, cliente_id)['total_vendido'] == 20.0
+
+    response = cliente_http.patch(f"/api/pedidos/{pedido['id']}/cambiar-estado", json={'estado': 'cancelado'})
+    assert response.status_code == 200
+
+    resumen = leer_resumen(app, cliente_id)
+    assert resumen['total_pedidos'] == 1
+    assert resumen['total_vendido'] == 0.0
+
+    estadisticas = cliente_http.get(f'/api/clientes/{cliente_id}').get_json()['estadisticas']
+    assert estadisticas['total_vendido'] == 0.0
+
+
+def test_eliminar_pedido_actualiza_resumen(app, fabrica, cliente_http, crear_pedido):
+    cliente_id = fabrica.cliente()
+    producto_id = fabrica.producto()
+    primero = crear_pedido(cliente_id, [(producto_id, 1)])
+    segundo = crear_pedido(cliente_id, [(producto_id, 1)])
+    assert leer_resumen(app, cliente_id)['ultimo_pedido_id'] == segundo['id']
+
+    response = cliente_http.delete(f"/api/pedidos/{segundo['id']}")
+    assert response.status_code == 200
+
+    resumen = leer_resumen(app, cliente_id)
+    assert resumen['total_pedidos'] == 1
+    assert resumen['ultimo_pedido_id'] == primero['id']
+
+    estadisticas = cliente_http.get(f'/api/clientes/{cliente_id}').get_json()['estadisticas']
+    assert estadisticas['total_pedidos'] == 1
+    assert estadisticas['ultimo_pedido']['id'] == primero['id']
@@ -0,0 +1,54 @@
+"""Caché del PDF del resumen del día"""
+import pickle
+import time
+from datetime import timedelta
+
+import pytest
+from flask import g
+
+from app.database import get_bolivia_time
+from app.routes import pedidos
+from app.utils.cache import cache_pdf
+
+
+@pytest.fixture
+def ayer():
+    return get_bolivia_time().date() - timedelta(days=1)
+
+
+@pytest.fixture(autouse=True)
+def datos_fijos(monkeypatch):
+    """Sin consultas: con leer_de_replica no hay réplica configurada a la que enviarlas"""
+    monkeypatch.setattr(pedidos, 'datos_resumen_dia', lambda fecha: {
+        'fecha': fecha.strftime('%d/%m/%Y'),
+        'resumen': [],
+        'total_pedidos': 0,
+        'total_clientes': 0,
+        'total_general': 0
+    })
+
+
+def test_pdf_de_dia_cerrado_vence(app, ayer):
+    with app.test_request_context():
+        pedidos.pdf_resumen_dia(ayer)
+
+        with open(cache_pdf._ruta(('resumen_dia', ayer)), 'rb') as archivo:
+            _, expira = pickle.load(archivo)
+
+    assert expira == pytest.approx(time.time() + app.config['RESUMEN_PDF_HORAS'] * 3600, abs=60)
+
+
+def test_pdf_desde_replica_no_se_guarda(app, ayer):
+    with app.test_request_context():
+        g.leer_de_replica = True
+        pedidos.pdf_resumen_dia(ayer)
+
+        assert not cache_pdf.contiene(('resumen_dia', ayer))
+
+
+def test_pdf_de_hoy_no_se_guarda(app):
+    hoy = get_bolivia_time().date()
+    with app.test_request_context():
+        pedidos.pdf_resumen_dia(hoy)
+
+        assert not cache_pdf.contiene(('resumen_dia', hoy))
@@ -0,0 +1,66 @@
+"""Serie de ventas (/api/pedidos/series)"""
+import pytest
+
+
+@pytest.fixture
+def cache_activa(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'CACHE_RESPUESTAS', True)
+
+
+def serie(cliente_http, **filtros):
+    response = cliente_http.get('/api/pedidos/series', query_string=filtros)
+    assert response.status_code == 200, response.get_json()
+    return response
+
+
+def test_pedido_nuevo_invalida_la_serie_cacheada(fabrica, cliente_http, crear_pedido, cache_activa):
+    cliente_id = fabrica.cliente()
+    producto_id = fabrica.producto(precio_venta=10)
+    crear_pedido(cliente_id, [(producto_id, 2)])
+
+    assert serie(cliente_http).get_json()['total'] == 20.0
+    assert serie(cliente_http).headers['X-Cache'] == 'HIT'
+
+    crear_pedido(cliente_id, [(producto_id, 1)])
+
+    response = serie(cliente_http)
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json()['total'] == 30.0
+
+
+def test_serie_descuenta_el_descuento_del_pedido(fabrica, cliente_http, crear_pedido):
+    cliente_id = fabrica.cliente()
+    producto_a = fabrica.producto(nombre='Producto A', precio_venta=10)
+    producto_b = fabrica.producto(nombre='Producto B', precio_venta=10)
+    pedido = crear_pedido(cliente_id, [(producto_a, 3), (producto_b, 1)], descuento=8)
+    assert pedido['total'] == 32.0
+
+    datos = serie(cliente_http).get_json()
+    assert datos['total'] == 32.0
+    assert datos['cantidad'] == 4.0
+    assert datos['pedidos'] == 1
+
+    # El descuento se reparte en proporción al subtotal de cada línea (30 y 10 de 40)
+    assert serie(cliente_http, producto_id=producto_a).get_json()['total'] == 24.0
+    assert serie(cliente_http, producto_id=producto_b).get_json()['total'] == 8.0
+
+
+def test_serie_coincide_con_estadisticas(fabrica, cliente_http, crear_pedido):
+    cliente_id = fabrica.cliente()
+    producto_id = fabrica.producto(precio_venta=10)
+    for descuento in (0, 5):
+        pedido = crear_pedido(cliente_id, [(producto_id, 2)], descuento=descuento)
+        response = cliente_http.patch(f"/api/pedidos/{pedido['id']}/cambiar-estado", json={'estado': 'entregado'})
+        assert response.status_code == 200
+
+    estadisticas = cliente_http.get('/api/pedidos/estadisticas').get_json()
+    assert serie(cliente_http).get_json()['total'] == estadisticas['total_vendido'] == 35.0
+
+
+def test_serie_materializada_descuenta_el_descuento(app, fabrica, cliente_http, crear_pedido, monkeypatch):
+    monkeypatch.setitem(app.config, 'VENTAS_DIARIAS_MATERIALIZADO', True)
+    crear_pedido(fabrica.cliente(), [(fabrica.producto(precio_venta=10), 4)], descuento=8)
+
+    datos = serie(cliente_http).get_json()
+    assert datos['total'] == 32.0
+    assert datos['pedidos'] == 1
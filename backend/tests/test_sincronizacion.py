@@ -0,0 +1,31 @@
+"""Cola de operaciones sin conexión (/api/sincronizacion)"""
+import json
+
+from app.models.pedido import Pedido
+
+
+def operacion(clave, cuerpo):
+    return {'clave': clave, 'tipo': 'pedido', 'cuerpo': json.dumps(cuerpo)}
+
+
+def test_operacion_con_error_no_deshace_el_lote(app, fabrica, cliente_http):
+    cliente_id = fabrica.cliente()
+    producto_id = fabrica.producto()
+    detalles = [{'producto_id': producto_id, 'cantidad': 1}]
+
+    response = cliente_http.post('/api/sincronizacion/', json={'operaciones': [
+        operacion('fecha-mal', {'cliente_id': cliente_id, 'detalles': detalles, 'fecha_entrega': '10/03/2020'}),
+        operacion('lista', []),
+        operacion('valida', {'cliente_id': cliente_id, 'detalles': detalles})
+    ]})
+    assert response.status_code == 200
+
+    data = response.get_json()
+    assert [(r['clave'], r['estado']) for r in data['resultados']] == [
+        ('fecha-mal', 'invalida'), ('lista', 'invalida'), ('valida', 'aplicada')
+    ]
+    assert data['aplicadas'] == 1
+    assert data['conflictos'] == 2
+
+    with app.app_context():
+        assert Pedido.query.count() == 1
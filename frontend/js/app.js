@@ -73,6 +73,35 @@ function verificarAuth() {
     return hasAuth;
 }
 
+// Generar un UUID v4 (crypto.randomUUID solo existe en contextos seguros)
+function generarUUID() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    const bytes = crypto.getRandomValues(new Uint8Array(16));
+    bytes[6] = (bytes[6] & 0x0f) | 0x40;
+    bytes[8] = (bytes[8] & 0x3f) | 0x80;
+    const hex = Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+    return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+}
+
+// Claves Idempotency-Key pendientes por operación: reintentar el mismo cuerpo
+// reutiliza la clave, así el servidor no vuelve a crear el registro
+const clavesIdempotencia = {};
+
+function claveIdempotencia(operacion, cuerpo) {
+    const pendiente = clavesIdempotencia[operacion];
+    if (pendiente && pendiente.cuerpo === cuerpo) {
+        return pendiente.clave;
+    }
+    clavesIdempotencia[operacion] = { cuerpo, clave: generarUUID() };
+    return clavesIdempotencia[operacion].clave;
+}
+
+function liberarClaveIdempotencia(operacion) {
+    delete clavesIdempotencia[operacion];
+}
+
 // Función para hacer peticiones fetch con manejo de errores
 async function fetchAPI(endpoint, options = {}) {
     console.log(`📡 fetchAPI: ${endpoint}`);
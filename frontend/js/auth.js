@@ -89,7 +89,13 @@ async function verificarAuth() {
         const response = await fetchAPI('/api/auth/validar');
         
         console.log('📥 Validación recibida:', response);
-        
+
+        // Sin conexión: seguir con la sesión ya validada (modo offline)
+        if (response.status === 0 && sessionStorage.getItem('usuario')) {
+            console.log('📴 Sin conexión, usando la sesión guardada');
+            return true;
+        }
+
         if (response.success && response.data.valido) {
             console.log('✅ Usuario autenticado:', response.data.usuario);
             sessionStorage.setItem('usuario', JSON.stringify(response.data.usuario));
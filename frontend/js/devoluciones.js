@@ -272,12 +272,24 @@ async function guardarDevolucion() {
     };
 
     try {
+        const body = JSON.stringify(data);
         const response = await fetchAPI('/api/devoluciones', {
             method: 'POST',
-            body: JSON.stringify(data)
+            headers: { 'Idempotency-Key': claveIdempotencia('crearDevolucion', body) },
+            body: body
         });
 
+        // Sin conexión: encolar con la misma clave para enviarlo después
+        if (response.status === 0) {
+            await encolarOperacion('devolucion', claveIdempotencia('crearDevolucion', body), body);
+            liberarClaveIdempotencia('crearDevolucion');
+            mostrarMensaje('Sin conexión: la devolución se guardó y se enviará al recuperar la señal', 'info');
+            cerrarModal('modalNuevaDevolucion');
+            return;
+        }
+
         if (response.success) {
+            liberarClaveIdempotencia('crearDevolucion');
             mostrarMensaje('Devolución registrada exitosamente', 'success');
             cerrarModal('modalNuevaDevolucion');
             cargarDevoluciones();
@@ -0,0 +1,173 @@
+// Modo sin conexión: registro del service worker y cola de operaciones en IndexedDB.
+// Los pedidos y devoluciones que no se pudieron enviar quedan en la cola con su
+// clave UUID (la misma Idempotency-Key del intento original) y se envían en lote
+// a /api/sincronizacion al recuperar la conexión.
+
+const DB_OFFLINE = 'carolina-offline';
+const STORE_COLA = 'operaciones';
+const LOTE_SINCRONIZACION = 50;
+
+let sincronizando = false;
+
+// Abrir (o crear) la base IndexedDB
+function abrirDBOffline() {
+    return new Promise((resolve, reject) => {
+        const solicitud = indexedDB.open(DB_OFFLINE, 1);
+        solicitud.onupgradeneeded = () => {
+            solicitud.result.createObjectStore(STORE_COLA, { keyPath: 'clave' });
+        };
+        solicitud.onsuccess = () => resolve(solicitud.result);
+        solicitud.onerror = () => reject(solicitud.error);
+    });
+}
+
+// Ejecutar una operación sobre la cola y esperar a que termine la transacción
+async function usarCola(modo, operacion) {
+    const db = await abrirDBOffline();
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction(STORE_COLA, modo);
+        const solicitud = operacion(tx.objectStore(STORE_COLA));
+        tx.oncomplete = () => { db.close(); resolve(solicitud ? solicitud.result : undefined); };
+        tx.onerror = () => { db.close(); reject(tx.error); };
+    });
+}
+
+// Guardar una operación para enviarla después
+// tipo: 'pedido' o 'devolucion'; cuerpo: JSON tal como se envió al endpoint
+async function encolarOperacion(tipo, clave, cuerpo) {
+    await usarCola('readwrite', store => store.put({
+        clave,
+        tipo,
+        cuerpo,
+        fecha: new Date().toISOString(),
+        estado: 'pendiente'
+    }));
+    actualizarIndicadorOffline();
+}
+
+async function listarOperaciones() {
+    const operaciones = await usarCola('readonly', store => store.getAll());
+    return operaciones.sort((a, b) => a.fecha.localeCompare(b.fecha));
+}
+
+async function eliminarOperacion(clave) {
+    await usarCola('readwrite', store => store.delete(clave));
+}
+
+async function marcarConflicto(operacion, resultado) {
+    await usarCola('readwrite', store => store.put({
+        ...operacion,
+        estado: 'conflicto',
+        error: resultado.error || 'Operación rechazada'
+    }));
+}
+
+// Enviar las operaciones pendientes en lotes
+async function sincronizarCola() {
+    if (sincronizando || !navigator.onLine) return;
+    sincronizando = true;
+
+    try {
+        const pendientes = (await listarOperaciones()).filter(op => op.estado === 'pendiente');
+        let aplicadas = 0;
+        let conflictos = 0;
+
+        for (let i = 0; i < pendientes.length; i += LOTE_SINCRONIZACION) {
+            const lote = pendientes.slice(i, i + LOTE_SINCRONIZACION);
+            const response = await fetchAPI('/api/sincronizacion', {
+                method: 'POST',
+                body: JSON.stringify({
+                    operaciones: lote.map(op => ({ clave: op.clave, tipo: op.tipo, cuerpo: op.cuerpo }))
+                })
+            });
+
+            // Sin conexión o sesión vencida: se reintenta más tarde
+            if (!response.success) break;
+
+            for (const resultado of response.data.resultados) {
+                const operacion = lote.find(op => op.clave === resultado.clave);
+                if (!operacion) continue;
+
+                if (resultado.estado === 'aplicada') {
+                    await eliminarOperacion(operacion.clave);
+                    aplicadas++;
+                } else if (resultado.estado === 'conflicto' || resultado.estado === 'invalida') {
+                    await marcarConflicto(operacion, resultado);
+                    conflictos++;
+                }
+                // 'en_proceso': queda pendiente para el próximo intento
+            }
+        }
+
+        if (aplicadas > 0) {
+            mostrarMensaje(`${aplicadas} operación(es) guardadas sin conexión fueron enviadas`, 'success');
+        }
+        if (conflictos > 0) {
+            mostrarMensaje(`${conflictos} operación(es) sin conexión fueron rechazadas (stock o productos)`, 'error');
+        }
+    } catch (error) {
+        console.error('❌ Error al sincronizar la cola offline:', error);
+    } finally {
+        sincronizando = false;
+        actualizarIndicadorOffline();
+    }
+}
+
+// Descartar una operación rechazada después de revisarla
+async function descartarOperacion(clave) {
+    await eliminarOperacion(clave);
+    actualizarIndicadorOffline();
+}
+
+// Indicador flotante con las operaciones pendientes y rechazadas
+async function actualizarIndicadorOffline() {
+    let operaciones = [];
+    try {
+        operaciones = await listarOperaciones();
+    } catch (error) {
+        return;
+    }
+
+    let indicador = document.getElementById('indicadorOffline');
+    if (operaciones.length === 0 && navigator.onLine) {
+        if (indicador) indicador.remove();
+        return;
+    }
+
+    if (!indicador) {
+        indicador = document.createElement('div');
+        indicador.id = 'indicadorOffline';
+        indicador.className = 'indicador-offline';
+        document.body.appendChild(indicador);
+    }
+
+    const pendientes = operaciones.filter(op => op.estado === 'pendiente').length;
+    const rechazadas = operaciones.filter(op => op.estado === 'conflicto');
+
+    indicador.innerHTML = `
+        <strong>${navigator.onLine ? '🟢 En línea' : '🔴 Sin conexión'}</strong>
+        ${pendientes ? `<div>${pendientes} operación(es) por enviar</div>` : ''}
+        ${rechazadas.map(op => `
+            <div class="indicador-offline-conflicto">
+                ${op.tipo === 'pedido' ? 'Pedido' : 'Devolución'} del ${new Date(op.fecha).toLocaleString('es-BO')}:
+                ${op.error}
+                <button type="button" onclick="descartarOperacion('${op.clave}')">Descartar</button>
+            </div>
+        `).join('')}
+    `;
+}
+
+if ('serviceWorker' in navigator) {
+    window.addEventListener('load', () => {
+        navigator.serviceWorker.register('/sw.js').catch(error => {
+            console.error('❌ Error al registrar el service worker:', error);
+        });
+    });
+}
+
+window.addEventListener('online', sincronizarCola);
+window.addEventListener('offline', actualizarIndicadorOffline);
+document.addEventListener('DOMContentLoaded', () => {
+    actualizarIndicadorOffline();
+    sincronizarCola();
+});
@@ -510,12 +510,24 @@ async function guardarPedido() {
     };
 
     try {
+        const body = JSON.stringify(data);
         const response = await fetchAPI('/api/pedidos', {
             method: 'POST',
-            body: JSON.stringify(data)
+            headers: { 'Idempotency-Key': claveIdempotencia('crearPedido', body) },
+            body: body
         });
 
+        // Sin conexión: encolar con la misma clave para enviarlo después
+        if (response.status === 0) {
+            await encolarOperacion('pedido', claveIdempotencia('crearPedido', body), body);
+            liberarClaveIdempotencia('crearPedido');
+            mostrarMensaje('Sin conexión: el pedido se guardó y se enviará al recuperar la señal', 'info');
+            cerrarModal('modalNuevoPedido');
+            return;
+        }
+
         if (response.success) {
+            liberarClaveIdempotencia('crearPedido');
             mostrarMensaje('Pedido creado exitosamente', 'success');
             cerrarModal('modalNuevoPedido');
             cargarPedidos();
@@ -0,0 +1,131 @@
+// Service worker: app shell en caché para abrir las páginas sin conexión.
+// Los pedidos y devoluciones tomados sin conexión se encolan en IndexedDB
+// (js/offline.js) y se envían al volver la señal; aquí solo se cachean GET.
+
+const CACHE_SHELL = 'carolina-shell-v1';
+const CACHE_DATOS = 'carolina-datos-v1';
+
+const SHELL = [
+    '/',
+    '/index.html',
+    '/login.html',
+    '/dashboard.html',
+    '/pedidos.html',
+    '/devoluciones.html',
+    '/clientes.html',
+    '/productos.html',
+    '/resumen-dia.html',
+    '/usuarios.html',
+    '/manifest.webmanifest',
+    'css/style.css',
+    'css/responsive.css',
+    'js/app.js',
+    'js/auth.js',
+    'js/offline.js',
+    'js/pedidos.js',
+    'js/devoluciones.js',
+    'js/clientes.js',
+    'js/productos.js',
+    'js/resumen-dia.js',
+    'js/usuarios.js'
+];
+
+// Catálogos que necesitan los formularios de pedido y devolución sin conexión
+const API_CATALOGOS = [
+    '/api/clientes/todos',
+    '/api/productos/todos',
+    '/api/devoluciones/motivos'
+];
+
+// Con frontend/dist (flask estaticos compilar) JS y CSS tienen huella en el
+// nombre: manifest.json traduce cada ruta a la servida en producción
+async function rutasShell() {
+    let manifiesto = {};
+    try {
+        const response = await fetch('/manifest.json', { cache: 'no-store' });
+        if (response.ok) {
+            manifiesto = await response.json();
+        }
+    } catch (error) {
+        // Sin manifest.json (desarrollo) se usan las rutas originales
+    }
+    return SHELL.map(ruta => ruta.startsWith('/') ? ruta : '/' + (manifiesto[ruta] || ruta));
+}
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        rutasShell()
+            .then(rutas => caches.open(CACHE_SHELL).then(cache => cache.addAll(rutas)))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(nombres => Promise.all(
+                nombres
+                    .filter(nombre => nombre !== CACHE_SHELL && nombre !== CACHE_DATOS)
+                    .map(nombre => caches.delete(nombre))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+// Red primero y, si falla, la copia guardada
+async function redPrimero(request, nombreCache) {
+    const cache = await caches.open(nombreCache);
+    try {
+        const response = await fetch(request);
+        if (response.ok) {
+            cache.put(request, response.clone());
+        }
+        return response;
+    } catch (error) {
+        const guardada = await cache.match(request, { ignoreSearch: request.mode === 'navigate' });
+        if (guardada) {
+            return guardada;
+        }
+        if (request.mode === 'navigate') {
+            return cache.match('/index.html');
+        }
+        throw error;
+    }
+}
+
+// Caché primero: los archivos con huella no cambian nunca
+async function cachePrimero(request) {
+    const guardada = await caches.match(request);
+    if (guardada) {
+        return guardada;
+    }
+    const response = await fetch(request);
+    if (response.ok) {
+        const cache = await caches.open(CACHE_SHELL);
+        cache.put(request, response.clone());
+    }
+    return response;
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+
+    if (request.method !== 'GET' || url.origin !== self.location.origin) {
+        return;
+    }
+
+    if (url.pathname.startsWith('/api/')) {
+        if (API_CATALOGOS.includes(url.pathname)) {
+            event.respondWith(redPrimero(request, CACHE_DATOS));
+        }
+        return;
+    }
+
+    if (/\.[0-9a-f]{10}\.(?:js|css)$/.test(url.pathname)) {
+        event.respondWith(cachePrimero(request));
+    } else {
+        // HTML y archivos sin huella: red primero para ver siempre la última versión
+        event.respondWith(redPrimero(request, CACHE_SHELL));
+    }
+});